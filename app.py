@@ -1,322 +1,114 @@
+import os
 import streamlit as st
 import pandas as pd
-from datetime import datetime, time
-import plotly.express as px
-from decimal import Decimal, getcontext
+import numpy as np
+from datetime import date, time
+from functools import lru_cache
 import streamlit.components.v1 as components
+from cost_engine import compute_costs_exact, exact_totals, included_mask, round_half_even, DAYS_PER_MONTH, DAYS_PER_YEAR, INPUT_COLUMNS
+from device_io import read_devices, DEFAULT_RATE_PEAK, DEFAULT_RATE_LOW
+from incremental_pricing import IncrementalPricer, changed_positions, has_row_changes
+from device_store import DeviceStore, MAX_COUNT
+from tou_tariff import (compute_costs_tou, empty_band, read_slot_prices, two_band_prices, window_mask,
+                        DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END)
+from load_shift import shift_load
+from cost_chart import aggregate_slices, chart_key, pie_figure
+from breakdown_table import COST_BANDS, PAGE_SIZES, filter_rows, page_count, page_rows, sort_rows
+from device_defaults import DEVICE_DEFAULTS, DEVICE_TYPES
+from static_assets import APP_CSS, COFFEE_BUTTON_HTML
+from profiling import RunProfiler, log_path_from_env
+
+# Optional features (meter data, rate sweep, Monte Carlo, calculation details) and the modules needed
+# only once there is a list or a portfolio (validation, export, portfolio, seasonal calendar) are
+# imported where they are first used, keeping them off the cold-start path
+
+# Setting this environment variable points the Portfolio panel at a database (see portfolio.py)
+PORTFOLIO_ENV_VAR = "ENERGY_APP_PORTFOLIO"
 
 # Set page config
 st.set_page_config(page_title="Energy Usage Calculator", layout="wide")
 
 st.title("Energy Usage Calculator")
 
-# Default Device Profiles
-DEVICE_DEFAULTS = {
-    "Other": {
-        "Power Heavy": 100.0, "Power Light": 10.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 0.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (LED) 32 inch": {
-        "Power Heavy": 45.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (LED) 55 inch": {
-        "Power Heavy": 80.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (LED) 65 inch": {
-        "Power Heavy": 110.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (LED) 75 inch": {
-        "Power Heavy": 145.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (OLED) 32 inch": {
-        "Power Heavy": 55.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (OLED) 55 inch": {
-        "Power Heavy": 100.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (OLED) 65 inch": {
-        "Power Heavy": 160.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (OLED) 75 inch": {
-        "Power Heavy": 220.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (Micro LED) 32 inch": {
-        "Power Heavy": 50.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (Micro LED) 55 inch": {
-        "Power Heavy": 90.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (Micro LED) 65 inch": {
-        "Power Heavy": 140.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Television (Micro LED) 75 inch": {
-        "Power Heavy": 190.0, "Power Light": 1.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 3.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Computer (Gaming)": {
-        "Power Heavy": 400.0, "Power Light": 50.0,
-        "Alloc Heavy": 80.0, "Alloc Light": 20.0,
-        "Hours Peak": 8.0, "Hours Low": 1.0,
-        "Days": 5.0, "Weeks": 52.0
-    },
-    "Computer (Mac Mini M4)": {
-        "Power Heavy": 30.0, "Power Light": 5.0,
-        "Alloc Heavy": 10.0, "Alloc Light": 90.0,
-        "Hours Peak": 8.0, "Hours Low": 1.0,
-        "Days": 5.0, "Weeks": 52.0
-    },
-    "Computer (Desktop)": {
-        "Power Heavy": 200.0, "Power Light": 50.0,
-        "Alloc Heavy": 10.0, "Alloc Light": 90.0,
-        "Hours Peak": 8.0, "Hours Low": 1.0,
-        "Days": 5.0, "Weeks": 52.0
-    },
-    "Light (Incandescent)": {
-        "Power Heavy": 60.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 5.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Light (Halogen)": {
-        "Power Heavy": 45.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 5.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Light (LED Spotlight)": {
-        "Power Heavy": 5.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 5.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Light (LED Bulb)": {
-        "Power Heavy": 9.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 5.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Light (LED ceiling light)": {
-        "Power Heavy": 18.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 5.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Electric Radiator": {
-        "Power Heavy": 1500.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 4.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 26.0
-    },
-    "Fan Heater": {
-        "Power Heavy": 2000.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 2.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 20.0
-    },
-    "Air Conditioner (Heating)": {
-        "Power Heavy": 1200.0, "Power Light": 10.0,
-        "Alloc Heavy": 80.0, "Alloc Light": 20.0,
-        "Hours Peak": 4.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 20.0
-    },
-    "Air Conditioner (Cooling)": {
-        "Power Heavy": 1200.0, "Power Light": 10.0,
-        "Alloc Heavy": 80.0, "Alloc Light": 20.0,
-        "Hours Peak": 4.0, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 12.0
-    },
-    "Air Source Heat Pump (Low Annual)": {
-        "Power Heavy": 460.0, "Power Light": 10.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 11.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Air Source Heat Pump (High Annual)": {
-        "Power Heavy": 910.0, "Power Light": 10.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 11.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Air Source Heat Pump (Winter -3 to 0 C)": {
-        "Power Heavy": 2500.0, "Power Light": 10.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 11.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 4.0
-    },
-    "Air Source Heat Pump (Winter 0 to 7 C)": {
-        "Power Heavy": 1500.0, "Power Light": 10.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 11.0, "Hours Low": 1.0,
-        "Days": 7.0, "Weeks": 8.0
-    },
-    "Sky Q box": {
-        "Power Heavy": 21.0, "Power Light": 17.0,
-        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
-        "Hours Peak": 5.0, "Hours Low": 19.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Sky Q mini": {
-        "Power Heavy": 11.0, "Power Light": 4.0,
-        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
-        "Hours Peak": 5.0, "Hours Low": 19.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Sky Stream Puck": {
-        "Power Heavy": 4.0, "Power Light": 0.5,
-        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
-        "Hours Peak": 5.0, "Hours Low": 19.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Virgin Media 360 Box": {
-        "Power Heavy": 12.0, "Power Light": 1.6,
-        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
-        "Hours Peak": 5.0, "Hours Low": 19.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Apple TV": {
-        "Power Heavy": 5.0, "Power Light": 0.5,
-        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
-        "Hours Peak": 4.0, "Hours Low": 20.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Induction Hob": {
-        "Power Heavy": 2000.0, "Power Light": 0.0,
-        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
-        "Hours Peak": 0.5, "Hours Low": 0.0,
-        "Days": 7.0, "Weeks": 52.0
-    },
-    "Electric Oven (Fan)": {
-        "Power Heavy": 2500.0, "Power Light": 0.0,
-        "Alloc Heavy": 30.0, "Alloc Light": 70.0,
-        "Hours Peak": 0.7, "Hours Low": 0.0,
-        "Days": 5.0, "Weeks": 52.0
-    },
-    "Electric Oven (Conventional)": {
-        "Power Heavy": 2500.0, "Power Light": 0.0,
-        "Alloc Heavy": 45.0, "Alloc Light": 55.0,
-        "Hours Peak": 0.8, "Hours Low": 0,
-        "Days": 5.0, "Weeks": 52.0
-    },
-    "Washing Machine": {
-        "Power Heavy": 2000.0, "Power Light": 200.0,
-        "Alloc Heavy": 20.0, "Alloc Light": 80.0,
-        "Hours Peak": 0.5, "Hours Low": 0.5,
-        "Days": 3.0, "Weeks": 52.0
-    },
-    "Tumble Dryer": {
-        "Power Heavy": 2500.0, "Power Light": 200.0,
-        "Alloc Heavy": 90.0, "Alloc Light": 10.0,
-        "Hours Peak": 1.0, "Hours Low": 0.0,
-        "Days": 3.0, "Weeks": 40.0
-    },
-    "Dishwasher": {
-        "Power Heavy": 1800.0, "Power Light": 100.0,
-        "Alloc Heavy": 30.0, "Alloc Light": 70.0,
-        "Hours Peak": 0.0, "Hours Low": 1.5,
-        "Days": 5.0, "Weeks": 52.0
-    }
-}
-
 # Initialize session state for devices and rates
-if 'devices' not in st.session_state:
-    st.session_state.devices = []
+if 'device_store' not in st.session_state:
+    st.session_state.device_store = DeviceStore()
+store = st.session_state.device_store
+if 'pricer' not in st.session_state:
+    st.session_state.pricer = IncrementalPricer()
 if 'rate_peak' not in st.session_state:
-    st.session_state.rate_peak = 0.2361
+    st.session_state.rate_peak = DEFAULT_RATE_PEAK
 if 'rate_low' not in st.session_state:
-    st.session_state.rate_low = 0.07
+    st.session_state.rate_low = DEFAULT_RATE_LOW
+
+# Stage timings; off unless the sidebar checkbox is ticked or a profile log is configured
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = RunProfiler(log_path=log_path_from_env())
+profiler = st.session_state.profiler
+if 'profile_enabled' not in st.session_state:
+    st.session_state.profile_enabled = profiler.log_path is not None
+profiler.begin(st.session_state.profile_enabled)
 
-# Sidebar - Buy Me a Coffee
 # Sidebar - Buy Me a Coffee
 with st.sidebar:
-    components.html(
-        """
-        <div style="transform: scale(0.9); transform-origin: top left;">
-            <script type="text/javascript" src="https://cdnjs.buymeacoffee.com/1.0.0/button.prod.min.js" data-name="bmc-button" data-slug="stevefernandes" data-color="#FFDD00" data-emoji="☕"  data-font="Cookie" data-text="Buy me a coffee" data-outline-color="#000000" data-font-color="#000000" data-coffee-color="#ffffff" ></script>
-        </div>
-        """,
-        height=60
-    )
+    components.html(COFFEE_BUTTON_HTML, height=60)
 
 # Sidebar - Data Management
 st.sidebar.header("Data Management")
 
 # Save
-if st.session_state.devices:
-    # Embed rates into the CSV
-    save_df = pd.DataFrame(st.session_state.devices)
-    save_df['Rate Peak'] = st.session_state.get('rate_peak', 0.30) # Access state safely or use widget var if defined? 
-    # Actually, widget vars are defined later now. So stick to session state or define defaults.
-    # To be safe: use st.session_state.get() since we haven't rendered widgets yet.
-    # Or cleaner: Just define defaults for fallback.
-    save_df['Rate Low'] = st.session_state.get('rate_low', 0.10)
-    
-    csv_data = save_df.to_csv(index=False)
-    st.sidebar.download_button(
-        label="Save List to CSV",
-        data=csv_data,
-        file_name="devices.csv",
-        mime="text/csv"
-    )
+# Filled in once the device editor has run, so the file includes this run's edits
+save_slot = st.sidebar.empty()
+
+save_format = st.sidebar.selectbox("Save Format", ["csv", "parquet", "arrow"], key="save_format",
+                                   format_func=lambda fmt: {"csv": "CSV", "parquet": "Parquet", "arrow": "Arrow"}[fmt],
+                                   help="Parquet and Arrow keep column types and store the rates once.")
+save_gzip = st.sidebar.checkbox("Compress (gzip)", key="save_gzip",
+                                help="Applies to the saved list and the cost report. Compressed lists load as they are.")
 
 # Load
-uploaded_file = st.sidebar.file_uploader("Load Devices CSV", type="csv")
+uploaded_file = st.sidebar.file_uploader("Load Devices (CSV, Parquet or Arrow)", type=["csv", "parquet", "arrow", "gz"])
 if uploaded_file is not None:
-    if st.sidebar.button("Load List from CSV"):
+    if st.sidebar.button("Load List"):
         try:
-            loaded_df = pd.read_csv(uploaded_file)
+            # Format is detected from the file content; rates come back separately
+            # so they don't pollute the device list
+            with profiler.span("load"):
+                loaded_df, rates = read_devices(uploaded_file)
+                if rates is not None:
+                    # Update session state for rates BEFORE widgets are created
+                    st.session_state.rate_peak, st.session_state.rate_low = rates
             
-            # Extract rates if present
-            if 'Rate Peak' in loaded_df.columns and 'Rate Low' in loaded_df.columns:
-                # Update session state for rates BEFORE widgets are created
-                st.session_state.rate_peak = float(loaded_df.iloc[0]['Rate Peak'])
-                st.session_state.rate_low = float(loaded_df.iloc[0]['Rate Low'])
-                
-                # Drop the columns so they don't pollute the device list
-                loaded_df = loaded_df.drop(columns=['Rate Peak', 'Rate Low'])
-            
-            st.session_state.devices = loaded_df.to_dict('records')
+                store.replace(loaded_df)
             st.sidebar.success("Loaded devices and rates successfully!")
             st.rerun()
         except Exception as e:
             st.sidebar.error(f"Error loading file: {e}")
 
+# Open a household from a portfolio database (see portfolio.py)
+with st.sidebar.expander("Portfolio"):
+    portfolio_path = st.text_input("Portfolio Database", value=os.environ.get(PORTFOLIO_ENV_VAR, "portfolio.db"),
+                                   key="portfolio_path")
+    if os.path.isfile(portfolio_path):
+        try:
+            from portfolio import PortfolioStore
+            # Read-only: the path is typed by the user, so nothing may be written to it
+            with PortfolioStore(portfolio_path, read_only=True) as portfolio:
+                households = portfolio.household_names()
+                household = st.selectbox(f"Household ({len(households):,})", households, index=None,
+                                         placeholder="Type to search", key="portfolio_household")
+                if household is not None and st.button("Open Household"):
+                    with profiler.span("load"):
+                        loaded_df, rate_peak, rate_low = portfolio.load_household(household)
+                        # Rates are set before their widgets are created, as for Load List
+                        st.session_state.rate_peak, st.session_state.rate_low = rate_peak, rate_low
+                        store.replace(loaded_df)
+                    st.rerun()
+        except Exception as e:
+            st.error(f"Error reading portfolio: {e}")
+    else:
+        st.caption("Build one with `python portfolio.py import portfolio.db households/`.")
+
 st.sidebar.markdown("---")
 
 # Sidebar for global settings (Rates)
@@ -324,123 +116,43 @@ st.sidebar.header("Electricity Rates (£/kWh)")
 # Use keys to allow updating from load logic. Defaults set in session_state above.
 cost_peak = st.sidebar.number_input("Peak Cost", min_value=0.0, format="%.4f", step=0.01, key="rate_peak")
 cost_low = st.sidebar.number_input("Off-Peak Cost", min_value=0.0, format="%.4f", step=0.01, key="rate_low")
+exact_mode = st.sidebar.checkbox("Exact fixed-point arithmetic", key="exact_mode",
+                                 help="Price with exact integer arithmetic instead of floating point.")
+
+# Half-hourly (time-of-use) tariff
+tariff_mode = st.sidebar.radio("Tariff", ["Peak / Off-Peak", "Half-Hourly"], key="tariff_mode", horizontal=True)
+slot_prices = None
+if tariff_mode == "Half-Hourly":
+    w1, w2 = st.sidebar.columns(2)
+    off_peak_start = w1.time_input("Off-Peak Start", DEFAULT_OFF_PEAK_START, step=1800, key="off_peak_start")
+    off_peak_end = w2.time_input("Off-Peak End", DEFAULT_OFF_PEAK_END, step=1800, key="off_peak_end")
+    prices_file = st.sidebar.file_uploader("Slot Prices CSV (48 or 1440 rows, £/kWh)", type="csv", key="slot_prices_file")
+    if prices_file is not None:
+        try:
+            slot_prices = read_slot_prices(prices_file)
+        except Exception as e:
+            st.sidebar.error(f"Error loading prices: {e}")
+    if slot_prices is None:
+        # Without a price file the peak/off-peak rates fill the slots
+        slot_prices = two_band_prices(cost_peak, cost_low, window_mask(off_peak_start, off_peak_end))
+    off_peak_mask = window_mask(off_peak_start, off_peak_end, len(slot_prices))
+    missing_band = empty_band(off_peak_mask)
+    if missing_band is not None:
+        other_band = "peak" if missing_band == "off-peak" else "off-peak"
+        st.sidebar.warning(f"The off-peak window leaves no {missing_band} slots; {missing_band} hours are spread "
+                           f"over the {other_band} slots instead.")
+    st.sidebar.caption("Exact arithmetic applies to the peak/off-peak tariff only.")
+
+st.sidebar.markdown("---")
+st.sidebar.checkbox("Profile Reruns", key="profile_enabled",
+                    help="Time each stage of the script and show the last reruns here.")
+# Filled at the end of the run with the stage timings
+profile_slot = st.sidebar.empty()
 
 
 # Main Interface
-# Custom CSS for the form
-st.markdown("""
-<style>
-    /* 1. Target ONLY the inner vertical block using direct child combinator */
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) {
-        background-color: #cccccc !important;
-        border: 1px solid #888 !important;
-        padding: 20px !important;
-        border-radius: 10px !important;
-        margin-top: 5px !important; /* Small gap from header */
-    }
-    
-    /* Make the inner content wrapper transparent so the grey shows through */
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) > div {
-        background-color: transparent !important;
-    }
-
-    /* Ensure label colors are correct in the box */
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stWidgetLabel"] p,
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] p,
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h1,
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h2,
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h3 {
-        font-weight: bold;
-        color: #000 !important;
-    }
-
-    /* Dark mode support */
-    @media (prefers-color-scheme: dark) {
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) {
-            background-color: #666666 !important; 
-            border: 1px solid #aaa !important;
-        }
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) > div {
-            background-color: transparent !important;
-        }
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stWidgetLabel"] p,
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] p,
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h1,
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h2,
-        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h3 {
-            color: #ffffff !important;
-        }
-    }
-    
-    /* REMOVE SPACING BETWEEN HEADER AND BOX - Adjusted for cleaner look */
-    /* Remove bottom padding from header but keep margin */
-    div:has(> h2#add-new-device) {
-        padding-bottom: 0 !important;
-    }
-    h2#add-new-device {
-        padding-bottom: 0 !important;
-    }
-    
-    /* Make table headers bold - Aggressive targeting */
-    [data-testid="stDataFrame"] th,
-    [data-testid="stDataEditor"] th,
-    [data-testid="stDataFrame"] [role="columnheader"],
-    [data-testid="stDataEditor"] [role="columnheader"],
-    [data-testid="stDataFrame"] div[class*="header"],
-    [data-testid="stDataEditor"] div[class*="header"] {
-        font-weight: 900 !important;
-        font-family: sans-serif !important;
-        color: black !important; /* ensure visibility in light mode */
-    }
-    
-    /* Dark mode override for headers */
-    @media (prefers-color-scheme: dark) {
-        [data-testid="stDataFrame"] th,
-        [data-testid="stDataEditor"] th,
-        [data-testid="stDataFrame"] [role="columnheader"],
-        [data-testid="stDataEditor"] [role="columnheader"] {
-             color: white !important;
-        }
-    }
-    
-    /* Plotly Legend Scrollbar Fix */
-    g.scrollbar rect.scrollbar-glyph {
-        fill: #888 !important;
-        fill-opacity: 0.8 !important;
-    }
-    g.scrollbar rect.scrollbar-channel {
-        fill: #eee !important;
-        fill-opacity: 0.1 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# Custom CSS for the button - Injected specifically to override Streamlit defaults
-st.markdown("""
-<style>
-    /* Target the submit button within the container */
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button {
-        background-color: #007bff !important;
-        color: white !important;
-        border: none !important;
-    }
-    
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button:hover {
-        background-color: #0056b3 !important;
-        color: white !important;
-    }
-
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button:active {
-           background-color: #004494 !important;
-           color: white !important;
-    }
-    
-    /* Ensure text color is white in both light and dark modes for this button */
-    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button p {
-        color: white !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for the form and its button (one block, built once per process)
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # Helper to look up device defaults
 def get_device_default(device_type):
@@ -465,15 +177,20 @@ def on_device_type_change():
     st.session_state.new_device_weeks = int(data["Weeks"])
 
 # Helper functions for time conversion
+# One shared time object per minute of the day, so the editor's time columns hold references rather than copies
+@lru_cache(maxsize=None)
+def clock_time(h, m):
+    return time(h, m)
+
 def float_to_time(h_float):
     h = int(h_float)
     m = int(round((h_float - h) * 60))
-    if h >= 24: return time(23, 59)
+    if h >= 24: return clock_time(23, 59)
     if m == 60:
         h += 1
         m = 0
-    if h >= 24: return time(23, 59)
-    return time(h, m)
+    if h >= 24: return clock_time(23, 59)
+    return clock_time(h, m)
 
 def time_to_float(t):
     return t.hour + (t.minute / 60.0)
@@ -509,8 +226,7 @@ with st.container(border=True):
     row1_col1, row1_col2 = st.columns([3, 1])
     
     # Device Type Dropdown
-    device_types = sorted([k for k in DEVICE_DEFAULTS.keys() if k != "Other"]) + ["Other"]
-    row1_col1.selectbox("Device Type", options=device_types, index=device_types.index("Other"), key="device_type_selector", on_change=on_device_type_change)
+    row1_col1.selectbox("Device Type", options=DEVICE_TYPES, index=DEVICE_TYPES.index("Other"), key="device_type_selector", on_change=on_device_type_change)
     
     # Quantity
     quantity = row1_col2.number_input("Quantity", min_value=1, value=1, step=1, format="%d")
@@ -548,240 +264,494 @@ with st.container(border=True):
         hours_peak = time_peak.hour + (time_peak.minute / 60.0)
         hours_low = time_low.hour + (time_low.minute / 60.0)
         
-        if not name:
-            st.error("Please enter a device name.")
-        elif abs((alloc_heavy + alloc_light) - 100.0) > 0.01:
-            st.error(f"Load allocations must sum to 100%. Current sum: {alloc_heavy + alloc_light}%")
-        elif (hours_peak + hours_low) > 24.0:
-             st.error(f"Total hours cannot exceed 24. Current total: {hours_peak + hours_low:.2f}")
+        # Store unscaled hours and separate frequency data
+        # Scaling will happen at calculation time
+        new_device = {
+            "Name": name,
+            "Count": int(quantity),
+            "Power Heavy": power_heavy,
+            "Power Light": power_light,
+            "Alloc Heavy": alloc_heavy,
+            "Alloc Light": alloc_light,
+            "Hours Peak": hours_peak,     # Stored unscaled
+            "Hours Low": hours_low,       # Stored unscaled
+            "Days": days_per_week,        # Store frequency
+            "Weeks": weeks_per_year,      # Store frequency
+            "Include": True
+        }
+        # The device list's rules, with the form's tighter allocation tolerance
+        from validation import describe, validate_devices
+        problems = describe(validate_devices(pd.DataFrame([new_device]), alloc_tolerance=0.01))
+        if problems:
+            for problem in problems:
+                st.error(problem)
         else:
-            # Store unscaled hours and separate frequency data
-            # Scaling will happen at calculation time
-            
             # Add single entry with Count
-            st.session_state.devices.append({
-                "Name": name,
-                "Count": int(quantity),
-                "Power Heavy": power_heavy,
-                "Power Light": power_light,
-                "Alloc Heavy": alloc_heavy,
-                "Alloc Light": alloc_light,
-                "Hours Peak": hours_peak,     # Stored unscaled
-                "Hours Low": hours_low,       # Stored unscaled
-                "Days": days_per_week,        # Store frequency
-                "Weeks": weeks_per_year,      # Store frequency
-                "Include": True
-            })
-            
+            store.append(new_device)
             st.success(f"Added {name} (x{quantity})")
 
+# Add temporary Time columns for display/editing
+def prepare_editor_frame(frame):
+    # We use apply to convert the float hours to datetime.time objects
+    if "Hours Peak" in frame.columns:
+        frame["Time Peak"] = frame["Hours Peak"].apply(float_to_time)
+    if "Hours Low" in frame.columns:
+        frame["Time Low"] = frame["Hours Low"].apply(float_to_time)
+    return frame
+
 # Display and Edit Devices
-if st.session_state.devices:
-    if st.session_state.devices:
-        st.subheader("Device List")
-        
-        df = pd.DataFrame(st.session_state.devices)
-        if "Include" not in df.columns:
-            df["Include"] = True
-        if "Count" not in df.columns:
-            df["Count"] = 1
-        if "Days" not in df.columns:
-            df["Days"] = 7.0
-        if "Weeks" not in df.columns:
-            df["Weeks"] = 52.0
-            
-        # Add temporary Time columns for display/editing
-        # We use apply to convert the float hours to datetime.time objects
-        if "Hours Peak" in df.columns:
-            df["Time Peak"] = df["Hours Peak"].apply(float_to_time)
-        if "Hours Low" in df.columns:
-            df["Time Low"] = df["Hours Low"].apply(float_to_time)
+# The editor is always given the committed base list (rebuilt only when its version changes),
+# so its identity is stable and edits are read from its deltas without a second run.
+if not store.base.empty:
+    st.subheader("Device List")
+    df = store.editor_frame(prepare_editor_frame)
     
-    edited_df = st.data_editor(
-        df,
-        num_rows="dynamic",
-        use_container_width=True,
-        column_config={
-            "Name": st.column_config.TextColumn("Device Name"),
-            "Count": st.column_config.NumberColumn("Count", min_value=1, step=1, format="%d"),
-            "Power Heavy": st.column_config.NumberColumn("High Power (W)", min_value=0.0, format="%.2f"),
-            "Power Light": st.column_config.NumberColumn("Low Power (W)", min_value=0.0, format="%.2f"),
-            "Alloc Heavy": st.column_config.NumberColumn("High Power %", min_value=0.0, max_value=100.0, format="%.2f"),
-            "Alloc Light": st.column_config.NumberColumn("Low Power %", min_value=0.0, max_value=100.0, format="%.2f"),
-            "Time Peak": st.column_config.TimeColumn("Peak Hours", format="HH:mm", step=60),
-            "Time Low": st.column_config.TimeColumn("Off-Peak Hours", format="HH:mm", step=60),
-            "Days": st.column_config.NumberColumn("Days/Week", min_value=0, max_value=7, step=1, format="%d"),
-            "Weeks": st.column_config.NumberColumn("Weeks/Year", min_value=0, max_value=52, step=1, format="%d"),
-            "Hours Peak": None, # Hide original float column
-            "Hours Low": None,  # Hide original float column
-            "Include": st.column_config.CheckboxColumn("Include", default=True),
-        },
-        key="device_editor"
-    )
+    with profiler.span("editor", len(df)):
+        edited_df = st.data_editor(
+            df,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                "Name": st.column_config.TextColumn("Device Name"),
+                "Count": st.column_config.NumberColumn("Count", min_value=1, max_value=MAX_COUNT, step=1, format="%d"),
+                "Power Heavy": st.column_config.NumberColumn("High Power (W)", min_value=0.0, format="%.2f"),
+                "Power Light": st.column_config.NumberColumn("Low Power (W)", min_value=0.0, format="%.2f"),
+                "Alloc Heavy": st.column_config.NumberColumn("High Power %", min_value=0.0, max_value=100.0, format="%.2f"),
+                "Alloc Light": st.column_config.NumberColumn("Low Power %", min_value=0.0, max_value=100.0, format="%.2f"),
+                "Time Peak": st.column_config.TimeColumn("Peak Hours", format="HH:mm", step=60),
+                "Time Low": st.column_config.TimeColumn("Off-Peak Hours", format="HH:mm", step=60),
+                "Days": st.column_config.NumberColumn("Days/Week", min_value=0, max_value=7, step=1, format="%d"),
+                "Weeks": st.column_config.NumberColumn("Weeks/Year", min_value=0, max_value=52, step=1, format="%d"),
+                "Hours Peak": None, # Hide original float column
+                "Hours Low": None,  # Hide original float column
+                "Include": st.column_config.CheckboxColumn("Include", default=True),
+            },
+            key="device_editor"
+        )
     
     # Process updates: Convert Time objects back to float hours for storage/calculation
-    if edited_df is not None:
-        # Recalculate floats from the edited Time columns
-        if "Time Peak" in edited_df.columns:
-            edited_df["Hours Peak"] = edited_df["Time Peak"].apply(lambda t: time_to_float(t) if t else 0.0)
-        if "Time Low" in edited_df.columns:
-            edited_df["Hours Low"] = edited_df["Time Low"].apply(lambda t: time_to_float(t) if t else 0.0)
-            
-        # Drop temporary columns for clean storage
-        storage_df = edited_df.drop(columns=["Time Peak", "Time Low"], errors="ignore")
+    with profiler.span("editor_sync", len(edited_df)):
+        editor_state = st.session_state.get("device_editor")
+        if has_row_changes(editor_state):
+            # Only rows the editor changed or added need their hours recalculated
+            changed = changed_positions(editor_state, len(df))
+            for time_col, hours_col in [("Time Peak", "Hours Peak"), ("Time Low", "Hours Low")]:
+                if time_col in edited_df.columns:
+                    hours = [time_to_float(t) if t else 0.0 for t in edited_df[time_col].iloc[changed]]
+                    edited_df.iloc[changed, edited_df.columns.get_loc(hours_col)] = hours
         
-        current_devices = storage_df.to_dict('records')
-        if current_devices != st.session_state.devices:
-            st.session_state.devices = current_devices
-            st.rerun()
+            # Drop temporary columns for clean storage
+            store.update(edited_df.drop(columns=["Time Peak", "Time Low"], errors="ignore"), dirty=True)
+        else:
+            store.update(None, dirty=False)
+    
+    if not store.current.empty:
+        # The file is only written when the button is clicked, from the list as it stands on this run
+        from export import device_list_export
+        save_data, save_name, save_mime = device_list_export(store.current, cost_peak, cost_low, save_format, save_gzip)
+        save_slot.download_button(
+            label="Save List",
+            data=save_data,
+            file_name=save_name,
+            mime=save_mime
+        )
 
-    # Validation: Ensure allocations sum to 100%
+    # Validation: every rule checked across the whole list at once; rows with errors are listed and
+    # left out of the costs, totals and analyses below while the rest are priced as usual
     if not edited_df.empty:
-        has_errors = False
-        for index, row in edited_df.iterrows():
-            try:
-                a_heavy = float(row.get('Alloc Heavy', 0))
-                a_light = float(row.get('Alloc Light', 0))
-                if abs((a_heavy + a_light) - 100.0) > 0.1:
-                    st.error(f"Device '{row.get('Name', 'Unknown')}': Heavy ({a_heavy}%) + Regular ({a_light}%) must sum to 100%.")
-                    has_errors = True
-            except Exception:
-                pass # Conversion issues handled in calc
-        
-        if has_errors:
-            st.stop()
+        with profiler.span("validation", len(edited_df)):
+            from validation import RULE_MESSAGES, invalid_rows, price_valid, validate_devices, zero_invalid
+            validation_errors = validate_devices(edited_df)
+            valid_rows = ~invalid_rows(validation_errors, len(edited_df))
+            valid_df = edited_df if valid_rows.all() else edited_df[valid_rows]
+            if not validation_errors.empty:
+                st.error(f"{len(edited_df) - len(valid_df):,} device(s) have invalid values and are left out of the totals "
+                         f"until they are fixed.")
+                with st.expander(f"Validation Errors ({len(validation_errors):,})"):
+                    error_view = validation_errors.head(1000).copy()
+                    error_view.insert(1, "Name", edited_df["Name"].to_numpy()[error_view["Row"].to_numpy() - 1])
+                    error_view["Problem"] = error_view["Rule"].map(RULE_MESSAGES)
+                    error_view["Value"] = [f"{v:g}" if isinstance(v, float) else str(v) for v in error_view["Value"]]
+                    st.dataframe(error_view, hide_index=True, use_container_width=True)
+                    if len(validation_errors) > len(error_view):
+                        st.caption(f"Showing the first {len(error_view):,} errors.")
 
     # Calculate Costs
     if not edited_df.empty:
-        results = []
-        for index, row in edited_df.iterrows():
-            try:
-                # Load Profile
-                p_heavy = Decimal(str(row['Power Heavy']))
-                p_light = Decimal(str(row['Power Light']))
-                a_heavy = Decimal(str(row['Alloc Heavy'])) / Decimal("100")
-                a_light = Decimal(str(row['Alloc Light'])) / Decimal("100")
-                
-                # Calculate Average Power in kW
-                # Avg Watts = (Heavy * %) + (Light * %)
-                avg_watts = (p_heavy * a_heavy) + (p_light * a_light)
-                avg_kw = avg_watts / Decimal("1000")
-                
-                # Time Profile
-                h_peak_raw = Decimal(str(row['Hours Peak']))
-                h_low_raw = Decimal(str(row['Hours Low']))
-                
-                # Frequency Scaling
-                days = Decimal(str(row.get('Days', 7.0)))
-                weeks = Decimal(str(row.get('Weeks', 52.0)))
-                scaling_factor = (days / Decimal("7.0")) * (weeks / Decimal("52.0"))
-                
-                # Effective Daily Hours (for cost calc only)
-                h_peak = h_peak_raw * scaling_factor
-                h_low = h_low_raw * scaling_factor
-                
-                # Count
-                count = Decimal(str(row.get('Count', 1)))
-
-                # Rates (£)
-                r_peak = Decimal(str(cost_peak))
-                r_low = Decimal(str(cost_low))
-                
-                # Cost Calculation (Per Unit)
-                unit_daily_kwh = (h_peak * avg_kw) + (h_low * avg_kw)
-                
-                unit_cost_peak = h_peak * avg_kw * r_peak
-                unit_cost_low = h_low * avg_kw * r_low
-                unit_daily_cost = unit_cost_peak + unit_cost_low
-                
-                # Total Cost (Scaled by Count)
-                daily_kwh = unit_daily_kwh * count
-                daily_cost = unit_daily_cost * count
-                monthly_cost = daily_cost * Decimal("30.4167")
-                annual_cost = daily_cost * Decimal("365")
-                
-                results.append({
-                    "Daily Cost": daily_cost,
-                    "Monthly Cost": monthly_cost,
-                    "Annual Cost": annual_cost,
-                    "Daily kWh": daily_kwh
-                })
-            except Exception as e:
-                # st.error(f"Error calculating row {index}: {e}") # Suppress individual row errors to avoid clutter
-                results.append({"Daily Cost": Decimal(0), "Monthly Cost": Decimal(0), "Annual Cost": Decimal(0), "Daily kWh": Decimal(0)})
-
-        cost_df = pd.DataFrame(results)
-        # Fix index alignment: Ensure cost_df matches edited_df indices
-        # If edited_df has gaps (e.g. from deletion), default RangeIndex of cost_df causes concat errors.
-        if not cost_df.empty:
-            cost_df.index = edited_df.index
+        with profiler.span("pricing", len(edited_df)):
+            # Index matches edited_df
+            if slot_prices is not None:
+                # Usage spread over the day's slots and priced as one matrix-vector product
+                cost_df = compute_costs_tou(edited_df, slot_prices, off_peak_mask)
+            elif exact_mode:
+                # Rows with errors never reach the exact engine
+                cost_df = price_valid(compute_costs_exact, edited_df, valid_rows, cost_peak, cost_low)
+            else:
+                # Only rows changed since the committed list are priced; totals are adjusted by the difference
+                priced = st.session_state.pricer.price(edited_df, cost_peak, cost_low,
+                                                       store.version, editor_state, base_df=store.base)
+                cost_df = priced.cost_df(edited_df.index)
+            # Rows with errors cost nothing; a new frame, as cost_df may share the pricer's
+            cost_df = zero_invalid(cost_df, valid_rows)
         
-        display_df = pd.concat([edited_df, cost_df], axis=1)
+        with profiler.span("display_build", len(edited_df)):
+            # The hour floats are not shown, so they are left out of the concat rather than copied and dropped
+            display_df = pd.concat([edited_df.drop(columns=["Hours Peak", "Hours Low"], errors="ignore"), cost_df], axis=1)
         
-        # 1-based indexing: Reset first to ensure clean sequence
-        display_df.reset_index(drop=True, inplace=True)
-        display_df.index = display_df.index + 1
+            # Round to the displayed precision the same way Decimal formatting would
+            for col in ["Daily Cost", "Monthly Cost", "Annual Cost"]:
+                display_df[col] = round_half_even(display_df[col], 2)
+            display_df["Daily kWh"] = round_half_even(display_df["Daily kWh"], 3)
         
-        # Format Hours columns to HH:MM strings for display
-        def format_display_time(val):
-            try:
-                t = float_to_time(float(val))
-                return t.strftime("%H:%M")
-            except:
-                return str(val)
-
-        if "Hours Peak" in display_df.columns:
-             display_df.drop(columns=["Hours Peak"], inplace=True)
-        if "Hours Low" in display_df.columns:
-             display_df.drop(columns=["Hours Low"], inplace=True)
+            # 1-based indexing
+            display_df.index = pd.RangeIndex(1, len(display_df) + 1)
             
-        # Rename columns for display
-        display_df = display_df.rename(columns={
-            "Power Heavy": "High Power (W)",
-            "Power Light": "Low Power (W)",
-            "Alloc Heavy": "High Power %",
-            "Alloc Light": "Low Power %",
-        })
+            # Rename columns for display
+            display_df = display_df.rename(columns={
+                "Power Heavy": "High Power (W)",
+                "Power Light": "Low Power (W)",
+                "Alloc Heavy": "High Power %",
+                "Alloc Light": "Low Power %",
+            })
         
 
 
-        format_mapping = {
-            "Daily Cost": "£{:.2f}", 
-            "Monthly Cost": "£{:.2f}", 
-            "Annual Cost": "£{:.2f}",
-            "High Power (W)": "{:.2f}",
-            "Low Power (W)": "{:.2f}",
-            "High Power %": "{:.2f}",
-            "Low Power %": "{:.2f}",
-            "Daily kWh": "{:.3f}"
-        }
-        
         st.subheader("Cost Breakdown")
-        st.dataframe(
-            display_df.style.format(format_mapping),
-            use_container_width=True
-        )
-
-        # Total Metrics - Filter by Include
-        # Align indices just in case, though they should match
-        active_mask = edited_df["Include"].fillna(True).astype(bool)
-        active_cost_df = cost_df[active_mask]
+        with profiler.span("breakdown_table", len(edited_df)):
+            # Filter, sort and page before display; only the visible page is sent to the table
+            t1, t2, t3, t4 = st.columns([3, 2, 2, 1])
+            name_query = t1.text_input("Filter by Name", key="breakdown_name")
+            cost_band = t2.selectbox("Annual Cost Band", list(COST_BANDS), key="breakdown_band")
+            sort_column = t3.selectbox("Sort by", ["List Order", "Name", "Daily Cost", "Monthly Cost", "Annual Cost", "Daily kWh"],
+                                       key="breakdown_sort")
+            sort_descending = t4.checkbox("Descending", key="breakdown_desc")
+            table_df = filter_rows(display_df, name_query, cost_band)
+            table_df = sort_rows(table_df, None if sort_column == "List Order" else sort_column, sort_descending)
         
-        total_daily = active_cost_df["Daily Cost"].sum()
-        total_monthly = active_cost_df["Monthly Cost"].sum()
-        total_annual = active_cost_df["Annual Cost"].sum()
+            p1, p2, p3 = st.columns([1, 1, 3])
+            page_size = p1.selectbox("Rows per Page", PAGE_SIZES, index=1, key="breakdown_page_size")
+            n_pages = page_count(len(table_df), page_size)
+            page = p2.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+            p3.caption(f"Showing {len(table_df):,} of {len(display_df):,} devices.")
         
-        total_daily_kwh = active_cost_df["Daily kWh"].sum()
-        total_monthly_kwh = total_daily_kwh * Decimal("30.4167")
-        total_annual_kwh = total_daily_kwh * Decimal("365")
+            st.dataframe(
+                page_rows(table_df, page, page_size),
+                use_container_width=True,
+                column_config={
+                    "Daily Cost": st.column_config.NumberColumn(format="£%.2f"),
+                    "Monthly Cost": st.column_config.NumberColumn(format="£%.2f"),
+                    "Annual Cost": st.column_config.NumberColumn(format="£%.2f"),
+                    "High Power (W)": st.column_config.NumberColumn(format="%.2f"),
+                    "Low Power (W)": st.column_config.NumberColumn(format="%.2f"),
+                    "High Power %": st.column_config.NumberColumn(format="%.2f"),
+                    "Low Power %": st.column_config.NumberColumn(format="%.2f"),
+                    "Daily kWh": st.column_config.NumberColumn(format="%.3f"),
+                }
+            )
+
+        # Total Metrics - Filter by Include
+        with profiler.span("totals", len(edited_df)):
+            if exact_mode and slot_prices is None:
+                # Sum the exact values and round once, rather than summing rounded rows
+                totals = exact_totals(valid_df, cost_peak, cost_low)
+                total_daily, total_monthly, total_annual = totals["Daily Cost"], totals["Monthly Cost"], totals["Annual Cost"]
+                total_daily_kwh, total_monthly_kwh, total_annual_kwh = totals["Daily kWh"], totals["Monthly kWh"], totals["Annual kWh"]
+            else:
+                if slot_prices is not None or not valid_rows.all():
+                    raw_totals = cost_df[included_mask(edited_df)].sum()
+                else:
+                    raw_totals = priced.totals_dict()
+                total_daily = round_half_even(raw_totals["Daily Cost"])
+                total_monthly = round_half_even(raw_totals["Monthly Cost"])
+                total_annual = round_half_even(raw_totals["Annual Cost"])
+            
+                raw_daily_kwh = raw_totals["Daily kWh"]
+                total_daily_kwh = round_half_even(raw_daily_kwh)
+                total_monthly_kwh = round_half_even(raw_daily_kwh * DAYS_PER_MONTH)
+                total_annual_kwh = round_half_even(raw_daily_kwh * DAYS_PER_YEAR)
         
         m1, m2, m3 = st.columns(3)
         m1.metric("Total Daily Cost", f"£{total_daily:,.2f} ({total_daily_kwh:,.2f} kWh)")
         m2.metric("Total Monthly Cost", f"£{total_monthly:,.2f} ({total_monthly_kwh:,.2f} kWh)")
         m3.metric("Total Annual Cost", f"£{total_annual:,.2f} ({total_annual_kwh:,.2f} kWh)")
+
+        # Full Cost Breakdown plus the totals, written only when the button is clicked
+        report_totals = {"Total (Included)": {"Daily Cost": total_daily, "Monthly Cost": total_monthly,
+                                              "Annual Cost": total_annual, "Daily kWh": total_daily_kwh}}
+        from export import cost_report_export
+        report_data, report_name, report_mime = cost_report_export(display_df, report_totals, save_gzip)
+        st.download_button("Download Cost Report", data=report_data, file_name=report_name, mime=report_mime,
+                           on_click="ignore")
+
+        with st.expander("Compare with Smart Meter Data"), profiler.span("meter_compare"):
+            st.caption("Upload a half-hourly meter export with Meter, Start and Consumption (kWh) columns. "
+                       "Readings are priced with the current tariff and scaled up to a full year.")
+            meter_file = st.file_uploader("Meter Readings CSV", type="csv", key="meter_file")
+            if meter_file is not None:
+                from meter_data import annual_metered_cost, read_meter_profile
+                try:
+                    slot_kwh, days_covered = read_meter_profile(meter_file)
+                except Exception as e:
+                    st.error(f"Error reading meter data: {e}")
+                else:
+                    if days_covered == 0:
+                        st.warning("No readings found in the file.")
+                    else:
+                        meter_prices = slot_prices if slot_prices is not None else two_band_prices(
+                            cost_peak, cost_low, window_mask(DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END))
+                        metered_kwh, metered_annual = annual_metered_cost(slot_kwh, days_covered, meter_prices)
+                        e1, e2, e3 = st.columns(3)
+                        e1.metric("Estimated Annual Cost", f"£{total_annual:,.2f} ({total_annual_kwh:,.2f} kWh)")
+                        e2.metric("Metered Annual Cost", f"£{metered_annual:,.2f} ({metered_kwh:,.2f} kWh)")
+                        e3.metric("Difference", f"£{metered_annual - float(total_annual):,.2f}",
+                                  f"{metered_kwh - float(total_annual_kwh):,.2f} kWh", delta_color="off")
+                        st.caption(f"Based on {days_covered:,.1f} days of readings.")
+
+        with st.expander("Rate Sensitivity"), profiler.span("rate_sweep"):
+            st.caption("Annual cost of the included devices across a grid of peak and off-peak rates. "
+                       "The dashed line marks rate pairs that cost the same as the break-even amount.")
+            s1, s2, s3 = st.columns(3)
+            peak_min = s1.number_input("Peak From", min_value=0.0, value=0.10, format="%.4f", step=0.01, key="sweep_peak_min")
+            peak_max = s1.number_input("Peak To", min_value=0.0, value=0.50, format="%.4f", step=0.01, key="sweep_peak_max")
+            low_min = s2.number_input("Off-Peak From", min_value=0.0, value=0.02, format="%.4f", step=0.01, key="sweep_low_min")
+            low_max = s2.number_input("Off-Peak To", min_value=0.0, value=0.30, format="%.4f", step=0.01, key="sweep_low_max")
+            grid_points = s3.number_input("Grid Points", min_value=2, max_value=2000, value=500, step=50, key="sweep_points")
+            # Unkeyed so that it follows the current total until the user overrides it
+            break_even = s3.number_input("Break-even Annual Cost (£)", min_value=0.0, value=float(total_annual),
+                                         format="%.2f")
+            if st.toggle("Show rate sweep", key="sweep_enabled"):
+                if peak_max <= peak_min or low_max <= low_min:
+                    st.warning("Each range needs its upper rate above its lower rate.")
+                else:
+                    from tariff_sweep import annual_cost_surface, household_band_kwh, sweep_figure
+                    # Band kWh are summed once; the whole grid is priced with one broadcast
+                    peak_kwh, low_kwh = household_band_kwh(valid_df)
+                    peak_rates = np.linspace(peak_min, peak_max, int(grid_points))
+                    low_rates = np.linspace(low_min, low_max, int(grid_points))
+                    surface = annual_cost_surface(peak_kwh, low_kwh, peak_rates, low_rates)
+                    st.plotly_chart(sweep_figure(peak_rates, low_rates, surface, break_even), use_container_width=True)
+                    if slot_prices is not None:
+                        st.caption("The sweep prices the peak/off-peak tariff, not the half-hourly slot prices.")
+
+        with st.expander("Tariff Timeline"), profiler.span("tariff_timeline"):
+            st.caption("Rates that change during the year, each applying from its date until the next row. "
+                       "Each month is priced at the rates in force on each of its days.")
+            if "timeline_df" not in st.session_state:
+                st.session_state.timeline_df = pd.DataFrame({
+                    "Effective From": [pd.Timestamp(date.today().year, 1, 1)],
+                    "Rate Peak": [cost_peak], "Rate Low": [cost_low],
+                })
+            timeline_df = st.data_editor(
+                st.session_state.timeline_df, num_rows="dynamic", hide_index=True, key="timeline_editor",
+                column_config={
+                    "Effective From": st.column_config.DateColumn(format="YYYY-MM-DD"),
+                    "Rate Peak": st.column_config.NumberColumn(min_value=0.0, format="%.4f"),
+                    "Rate Low": st.column_config.NumberColumn(min_value=0.0, format="%.4f"),
+                })
+            timeline_start = st.date_input("Price From", value=date(date.today().year, 1, 1), key="timeline_start")
+            try:
+                from tariff_timeline import TariffTimeline, monthly_costs
+                from tariff_sweep import household_band_kwh
+                timeline = TariffTimeline.from_frame(timeline_df)
+                timeline_months = monthly_costs(*household_band_kwh(valid_df), timeline, timeline_start)
+            except ValueError as e:
+                st.error(f"Timeline: {e}")
+            else:
+                timeline_annual = round_half_even(timeline_months["Cost"].sum())
+                # Months are priced by calendar day; the annual cost above is DAYS_PER_YEAR days
+                timeline_days = int(timeline_months["Days"].sum())
+                current_annual = round_half_even(float(total_annual) * timeline_days / DAYS_PER_YEAR)
+                l1, l2 = st.columns(2)
+                l1.metric("Cost over 12 Months", f"£{timeline_annual:,.2f}")
+                l2.metric("Difference from Current Rates", f"£{timeline_annual - current_annual:,.2f}",
+                          delta_color="off")
+                if timeline_days != DAYS_PER_YEAR:
+                    st.caption(f"These 12 months have {timeline_days} days and the annual cost above is for "
+                               f"{DAYS_PER_YEAR:.0f}, so the difference compares both over {timeline_days} days.")
+                st.dataframe(timeline_months.style.format({
+                    "Avg Rate Peak": "£{:.4f}", "Avg Rate Low": "£{:.4f}", "kWh": "{:,.2f}", "Cost": "£{:,.2f}",
+                }), hide_index=True, use_container_width=True)
+                if slot_prices is not None:
+                    st.caption("The timeline prices the peak/off-peak split, not the half-hourly slot prices.")
+
+        with st.expander("Load Shifting"), profiler.span("load_shift"):
+            st.caption("Moves each device's hours into the cheaper band while keeping its total hours per day.")
+            l1, l2 = st.columns(2)
+            min_peak_pct = l1.slider("Minimum Peak Share (%)", 0, 100, 0, key="shift_min_peak",
+                                     help="Share of each device's hours that must stay at peak. "
+                                          "A 'Min Peak Share' column (0-1) overrides it per device.")
+            limit_window = l2.checkbox("Limit off-peak hours to the off-peak window", key="shift_limit_window")
+            window_hours = None
+            if limit_window:
+                window_hours = l2.number_input("Off-Peak Window (hours)", min_value=0.0, max_value=24.0, value=7.0,
+                                               step=0.5, key="shift_window_hours")
+            # Only included devices that pass validation are shifted, and only their hours are written back
+            shift_rows = included_mask(edited_df) & valid_rows
+            shift_df = shift_load(edited_df[shift_rows], cost_peak, cost_low, min_peak_pct / 100.0, window_hours)
+            total_saving = round_half_even(shift_df["Annual Saving"].sum())
+            st.metric("Annual Saving", f"£{total_saving:,.2f}")
+            shift_view = shift_df[shift_df["Annual Saving"].abs() >= 0.005].sort_values("Annual Saving", ascending=False)
+            if shift_view.empty:
+                st.write("No device can be made cheaper under these constraints.")
+            else:
+                shift_view = shift_view.reset_index(drop=True)
+                shift_view.index = shift_view.index + 1
+                st.dataframe(shift_view.style.format({
+                    "Hours Peak": "{:.2f}", "Hours Low": "{:.2f}", "New Hours Peak": "{:.2f}", "New Hours Low": "{:.2f}",
+                    "Annual Cost": "£{:.2f}", "New Annual Cost": "£{:.2f}", "Annual Saving": "£{:.2f}",
+                }), use_container_width=True)
+                if st.button("Apply Shifted Hours", key="apply_shift"):
+                    shifted = store.current.copy()
+                    for column in ("Hours Peak", "Hours Low"):
+                        hours = shifted[column]
+                        hours = hours.astype(np.float64) if pd.api.types.is_numeric_dtype(hours) else hours.astype(object)
+                        hours.iloc[np.flatnonzero(shift_rows)] = shift_df[f"New {column}"].to_numpy()
+                        shifted[column] = hours
+                    store.replace(shifted)
+                    st.rerun()
+            if slot_prices is not None:
+                st.caption("Savings are priced with the peak/off-peak rates, not the half-hourly slot prices.")
+
+        with st.expander("Uncertainty (Monte Carlo)"), profiler.span("monte_carlo"):
+            st.caption("Treats power, load allocation and hours as uncertain around the entered values "
+                       "and reports P10/P50/P90 bands of annual cost.")
+            u1, u2, u3, u4 = st.columns(4)
+            power_sd = u1.slider("Power Spread (%)", 0, 50, 15, key="mc_power_sd") / 100.0
+            alloc_sd = u2.slider("Allocation Spread (points)", 0, 50, 10, key="mc_alloc_sd")
+            hours_sd = u3.slider("Hours Spread (%)", 0, 50, 25, key="mc_hours_sd") / 100.0
+            n_samples = u4.selectbox("Samples", [10_000, 100_000, 200_000, 500_000], index=1, key="mc_samples",
+                                     format_func=lambda n: f"{n:,}")
+            if st.toggle("Run simulation", key="mc_enabled"):
+                # Re-simulate only when the pricing inputs or settings change
+                mc_columns = [col for col in INPUT_COLUMNS + ["Include", "Name"] if col in valid_df.columns]
+                mc_key = (int(pd.util.hash_pandas_object(valid_df[mc_columns], index=False).sum()),
+                          cost_peak, cost_low, power_sd, alloc_sd, hours_sd, n_samples)
+                cached = st.session_state.get("mc_cache")
+                if cached is None or cached[0] != mc_key:
+                    from monte_carlo import simulate
+                    with st.spinner("Simulating..."):
+                        cached = (mc_key, simulate(valid_df, cost_peak, cost_low, n_samples, power_sd=power_sd,
+                                                   alloc_sd=alloc_sd, hours_sd=hours_sd))
+                    st.session_state.mc_cache = cached
+                mc_result = cached[1]
+                b1, b2, b3 = st.columns(3)
+                for col, (band, value) in zip((b1, b2, b3), mc_result.total_bands.items()):
+                    col.metric(f"Annual Cost {band}", f"£{value:,.2f}")
+                mc_view = mc_result.device_bands.reset_index(drop=True)
+                mc_view.index = mc_view.index + 1
+                st.dataframe(mc_view.style.format({"P10": "£{:.2f}", "P50": "£{:.2f}", "P90": "£{:.2f}"}),
+                             use_container_width=True)
+                st.caption(f"Total from {mc_result.n_samples:,} samples; per-device bands from "
+                           f"{mc_result.device_samples:,}. Priced with the peak/off-peak rates.")
         
-        with st.expander("Calculation Details (First Device)"):
+        with st.expander("Seasonal Calendar"), profiler.span("seasonal_calendar"):
+            st.caption("Places each device's weeks of use in its season (heaters in winter, cooling in summer, "
+                       "others spread evenly) instead of averaging them over the year. A Season column in a "
+                       "loaded list overrides the season of a row.")
+            from seasonal_calendar import (MONTH_NAMES, calendar_dates, daily_totals, device_month_totals,
+                                           device_seasons, month_frame, week_shares)
+            # Costs from this run's pricing mode; rows that are excluded or invalid cost nothing
+            calendar_included = included_mask(edited_df)
+            calendar_kwh = np.where(calendar_included, cost_df["Daily kWh"].to_numpy(), 0.0)
+            calendar_cost = np.where(calendar_included, cost_df["Daily Cost"].to_numpy(), 0.0)
+            calendar_seasons, calendar_shares = device_seasons(edited_df), week_shares(edited_df)
+            device_month_kwh, device_month_cost = device_month_totals(calendar_kwh, calendar_cost,
+                                                                      calendar_seasons, calendar_shares)
+            months = month_frame(device_month_kwh.sum(axis=0), device_month_cost.sum(axis=0))
+            peak = int(months["Cost"].to_numpy().argmax())
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Peak Month", MONTH_NAMES[peak])
+            c2.metric("Peak Month Cost", f"£{months['Cost'].iloc[peak]:,.2f} ({months['kWh'].iloc[peak]:,.2f} kWh)")
+            c3.metric("Lowest Month Cost", f"£{months['Cost'].min():,.2f}")
+            st.bar_chart(months["Cost"].rename("Cost (£)"), sort=False)
+            day_kwh, day_cost = daily_totals(calendar_kwh, calendar_cost, calendar_seasons, calendar_shares)
+            st.line_chart(pd.Series(day_cost[0], name="Daily Cost (£)", index=calendar_dates(date.today().year)))
+            peak_devices = pd.DataFrame({
+                "Name": edited_df["Name"].to_numpy(),
+                "Season": calendar_seasons,
+                f"{MONTH_NAMES[peak]} kWh": device_month_kwh[:, peak],
+                f"{MONTH_NAMES[peak]} Cost": device_month_cost[:, peak],
+            }, index=pd.RangeIndex(1, len(edited_df) + 1))
+            st.write(f"Largest costs in {MONTH_NAMES[peak]}")
+            st.dataframe(peak_devices.nlargest(10, f"{MONTH_NAMES[peak]} Cost").style.format(
+                {f"{MONTH_NAMES[peak]} kWh": "{:,.2f}", f"{MONTH_NAMES[peak]} Cost": "£{:,.2f}"}),
+                use_container_width=True)
+
+        with st.expander("Peak Demand"), profiler.span("peak_demand"):
+            st.caption("Minute-by-minute demand on a day when every included device runs: off-peak hours from the "
+                       "start of the off-peak window, peak hours from each device's usual start time, cycling "
+                       "between high and low power as its type does. A Start Time column (such as 07:30) in a "
+                       "loaded list sets when a row's peak hours begin.")
+            d1, d2 = st.columns(2)
+            fuse_amps = d1.selectbox("Supply Fuse (A)", [60, 80, 100], index=2, key="demand_fuse")
+            charger_kw = d2.number_input("EV Charger (kW)", min_value=0.0, value=7.4, step=0.1, format="%.1f",
+                                         key="demand_charger")
+            from demand_profile import demand_at, demand_curve, fuse_kw, minute_label, peak_demand
+            demand_window = ((off_peak_start, off_peak_end) if slot_prices is not None
+                             else (DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END))
+            try:
+                curve = demand_curve(valid_df, *demand_window)
+            except ValueError as e:
+                st.error(f"Peak Demand: {e}")
+            else:
+                peak_kw, peak_minute = peak_demand(curve)
+                capacity_kw = fuse_kw(fuse_amps)
+                k1, k2, k3 = st.columns(3)
+                k1.metric("Peak Demand", f"{peak_kw:,.2f} kW at {minute_label(peak_minute)}")
+                k2.metric("Fuse Capacity", f"{capacity_kw:,.1f} kW")
+                k3.metric("Headroom with Charger", f"{capacity_kw - peak_kw - charger_kw:,.2f} kW", delta_color="off")
+                if peak_kw + charger_kw > capacity_kw:
+                    st.warning(f"The peak plus a {charger_kw:g} kW charger exceeds a {fuse_amps} A fuse; "
+                               f"the charger would need to avoid {minute_label(peak_minute)} or be load-managed.")
+                st.line_chart(pd.Series(curve, name="Demand (kW)",
+                                        index=[minute_label(m) for m in range(len(curve))]))
+                at_peak = demand_at(valid_df, peak_minute, *demand_window)
+                peak_view = pd.DataFrame({"Name": valid_df["Name"].to_numpy(), "kW": at_peak})
+                peak_view = peak_view[included_mask(valid_df)].nlargest(10, "kW")
+                st.write(f"Largest loads at {minute_label(peak_minute)}")
+                st.dataframe(peak_view.style.format({"kW": "{:,.3f}"}), hide_index=True, use_container_width=True)
+
+        with st.expander("Solar and Battery"), profiler.span("solar_battery"):
+            st.caption("Simulates a year half-hour by half-hour: solar covers demand first and charges the "
+                       "battery, the battery covers peak slots, and it is topped up off-peak from the grid when "
+                       "stored off-peak energy is worth it after losses. Demand follows the seasonal calendar.")
+            p1, p2, p3, p4 = st.columns(4)
+            pv_kwp = p1.number_input("Solar (kWp)", min_value=0.0, value=4.0, step=0.5, key="solar_kwp")
+            battery_kwh = p2.number_input("Battery (kWh)", min_value=0.0, value=10.0, step=0.5, key="battery_kwh")
+            battery_kw = p3.number_input("Battery Power (kW)", min_value=0.0, value=5.0, step=0.5, key="battery_kw")
+            export_rate = p4.number_input("Export Rate", min_value=0.0, value=0.15, format="%.4f", step=0.01,
+                                          key="export_rate")
+            if st.toggle("Run simulation", key="solar_enabled"):
+                solar_window = ((off_peak_start, off_peak_end) if slot_prices is not None
+                                else (DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END))
+                solar_columns = [col for col in INPUT_COLUMNS + ["Include", "Name", "Season"] if col in valid_df.columns]
+                solar_key = (int(pd.util.hash_pandas_object(valid_df[solar_columns], index=False).sum()),
+                             cost_peak, cost_low, pv_kwp, battery_kwh, battery_kw, export_rate, solar_window)
+                cached = st.session_state.get("solar_cache")
+                if cached is None or cached[0] != solar_key:
+                    from solar_battery import household_profile, simulate as simulate_solar
+                    with st.spinner("Simulating..."):
+                        peak_kwh, low_kwh, day_factors = household_profile(valid_df)
+                        cached = (solar_key, simulate_solar(peak_kwh, low_kwh, day_factors[None, :], cost_peak,
+                                                            cost_low, pv_kwp, battery_kwh, battery_kw,
+                                                            off_peak_mask=window_mask(*solar_window),
+                                                            export_rate=export_rate).iloc[0])
+                    st.session_state.solar_cache = cached
+                solar = cached[1]
+                s1, s2, s3, s4 = st.columns(4)
+                s1.metric("Annual Cost Now", f"£{solar['Baseline Cost']:,.2f}")
+                s2.metric("With Solar", f"£{solar['PV Only Cost']:,.2f}", f"-£{solar['PV Saving']:,.2f}",
+                          delta_color="inverse")
+                s3.metric("With Solar and Battery", f"£{solar['PV + Battery Cost']:,.2f}",
+                          f"-£{solar['Battery Saving']:,.2f}", delta_color="inverse")
+                s4.metric("Self-Consumption", f"{solar['Self-Consumption %']:.1f}%")
+                st.caption(f"{solar['PV kWh']:,.0f} kWh generated, {solar['Export kWh']:,.0f} kWh exported and "
+                           f"{solar['Import kWh']:,.0f} kWh imported of {solar['Demand kWh']:,.0f} kWh used. "
+                           "Priced with the peak/off-peak rates; generation is a clear-sky profile.")
+
+        with st.expander("Calculation Details (First Device)"), profiler.span("calculation_details"):
             if not edited_df.empty:
+                from decimal import Decimal
                 r = edited_df.iloc[0]
                 
                 # Extract
@@ -824,19 +794,36 @@ if st.session_state.devices:
         st.markdown("---")
         st.subheader("Annual Cost Distribution")
         
-        # Prepare data for Pie Chart
-        # Use display_df which contains all the correct aligned data
-        # Filter for included devices
-        chart_df = display_df[display_df["Include"].fillna(True).astype(bool)].copy()
-        chart_df = chart_df[["Name", "Annual Cost"]]
-        chart_df["Annual Cost"] = chart_df["Annual Cost"].astype(float)
+        with profiler.span("pie_chart", len(edited_df)):
+            # Same-name devices are summed and small slices folded into "Other", so the figure
+            # stays small; it is only rebuilt when the names or costs change
+            min_share_pct = st.slider("Group slices below (% of total)", 0.0, 10.0, 2.0, step=0.5, key="pie_min_share")
+            included = included_mask(display_df)
+            chart_names = display_df.loc[included, "Name"]
+            chart_costs = display_df.loc[included, "Annual Cost"]
+            pie_key = (chart_key(chart_names, chart_costs), min_share_pct)
+            cached = st.session_state.get("pie_cache")
+            if cached is None or cached[0] != pie_key:
+                slices = aggregate_slices(chart_names, chart_costs, min_share_pct / 100.0)
+                cached = (pie_key, pie_figure(slices) if not slices.empty else None)
+                st.session_state.pie_cache = cached
         
-        if not chart_df.empty:
-            fig = px.pie(chart_df, values="Annual Cost", names="Name", 
-                         title="Share of Total Annual Cost")
-            fig.update_layout(height=900)
-            st.plotly_chart(fig, use_container_width=True)
+            if cached[1] is not None:
+                st.plotly_chart(cached[1], use_container_width=True)
 
-
-if not st.session_state.devices:
+if store.current.empty:
     st.info("No devices added yet.")
+
+# Stage timings for this run and the ones before it
+profiler.finish()
+if profiler.enabled:
+    with profile_slot.container():
+        st.caption("Stage timings (ms), most recent run last")
+        st.dataframe(profiler.history_frame().round(1), use_container_width=True)
+        from session_memory import session_memory_frame
+
+        # What this session keeps between reruns; shared buffers are counted once
+        memory_df = session_memory_frame(st.session_state.to_dict().items())
+        st.caption(f"Session memory: {memory_df['KB'].sum() / 1024:,.2f} MB")
+        st.dataframe(memory_df.head(10).round(1), use_container_width=True)
+
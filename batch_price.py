@@ -0,0 +1,227 @@
+"""Price saved household device lists from the command line.
+
+Each input is a list written by the app's "Save List" button (CSV, Parquet or Arrow). One summary
+row per household is streamed to a CSV or Parquet file as results arrive:
+
+    python batch_price.py households/ "archive/*.csv" -o summary.parquet
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import (COST_COLUMNS, DAYS_PER_MONTH, DAYS_PER_YEAR,
+                         compute_costs, compute_costs_exact, exact_totals, included_mask, round_half_even)
+from device_io import DEFAULT_RATE_LOW, DEFAULT_RATE_PEAK, DEVICE_LIST_EXTENSIONS, read_device_list
+from validation import check_rows, price_valid
+
+SUMMARY_COLUMNS = [
+    "Household", "File", "Devices", "Invalid Devices", "Rate Peak", "Rate Low",
+    "Daily Cost", "Monthly Cost", "Annual Cost",
+    "Daily kWh", "Monthly kWh", "Annual kWh", "Breakdown",
+]
+
+
+def household_totals(devices_df, cost_df, rate_peak, rate_low, exact=False, valid=None):
+    # Totals over included devices, as the app shows them; cost_df comes from the matching pricing mode.
+    # valid (a row mask from validation.check_rows) leaves the rows with errors out, as the app does.
+    if valid is None:
+        valid = np.ones(len(devices_df), dtype=bool)
+    if exact:
+        return exact_totals(devices_df if valid.all() else devices_df[valid], rate_peak, rate_low)
+    active = cost_df[COST_COLUMNS].to_numpy()[included_mask(devices_df) & valid]
+    daily_cost, monthly_cost, annual_cost, daily_kwh = active.sum(axis=0)
+    return {
+        "Daily Cost": float(round_half_even(daily_cost)),
+        "Monthly Cost": float(round_half_even(monthly_cost)),
+        "Annual Cost": float(round_half_even(annual_cost)),
+        "Daily kWh": float(round_half_even(daily_kwh)),
+        "Monthly kWh": float(round_half_even(daily_kwh * DAYS_PER_MONTH)),
+        "Annual kWh": float(round_half_even(daily_kwh * DAYS_PER_YEAR)),
+    }
+
+
+def device_breakdown(devices_df, cost_df, valid=None):
+    # One record per device with its rounded costs; Valid is False for rows left out for errors
+    if valid is None:
+        valid = np.ones(len(devices_df), dtype=bool)
+    costs = cost_df[COST_COLUMNS].to_numpy()
+    counts = pd.to_numeric(devices_df["Count"], errors="coerce").to_numpy(dtype=float)
+    return [
+        {
+            "Name": str(name),
+            "Count": int(count) if math.isfinite(count) else None,
+            "Include": bool(include),
+            "Valid": bool(ok),
+            "Daily Cost": daily,
+            "Monthly Cost": monthly,
+            "Annual Cost": annual,
+            "Daily kWh": kwh,
+        }
+        for name, count, include, ok, daily, monthly, annual, kwh in zip(
+            devices_df["Name"].tolist(),
+            counts.tolist(),
+            included_mask(devices_df).tolist(),
+            valid.tolist(),
+            round_half_even(costs[:, 0], 2).tolist(),
+            round_half_even(costs[:, 1], 2).tolist(),
+            round_half_even(costs[:, 2], 2).tolist(),
+            round_half_even(costs[:, 3], 3).tolist(),
+        )
+    ]
+
+
+def household_summary(devices_df, rate_peak, rate_low, exact=False):
+    # Totals over included devices plus a per-device breakdown, as the app shows them
+    valid, _ = check_rows(devices_df)
+    cost_df = price_valid(compute_costs_exact if exact else compute_costs, devices_df, valid, rate_peak, rate_low)
+    return {
+        "Devices": len(devices_df),
+        "Invalid Devices": int((~valid).sum()),
+        "Rate Peak": float(rate_peak),
+        "Rate Low": float(rate_low),
+        **household_totals(devices_df, cost_df, rate_peak, rate_low, exact, valid),
+        "Breakdown": json.dumps(device_breakdown(devices_df, cost_df, valid)),
+    }
+
+
+def price_file(path, rate_peak=DEFAULT_RATE_PEAK, rate_low=DEFAULT_RATE_LOW, exact=False):
+    # Runs in a worker process; errors are returned so one bad file cannot stop the run
+    try:
+        devices_df, file_peak, file_low = read_device_list(path, rate_peak, rate_low)
+        summary = household_summary(devices_df, file_peak, file_low, exact=exact)
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+    household = os.path.splitext(os.path.basename(path))[0]
+    return path, {"Household": household, "File": path, **summary}, None
+
+
+def expand_inputs(inputs, recursive=False, extensions=DEVICE_LIST_EXTENSIONS):
+    # Directories contribute their files with the given extensions; anything else is treated as a glob
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for ext in extensions:
+                name = "*" + ext
+                pattern = os.path.join(item, "**", name) if recursive else os.path.join(item, name)
+                paths.extend(sorted(glob.glob(pattern, recursive=recursive)))
+        else:
+            paths.extend(sorted(glob.glob(item, recursive=recursive)))
+    # Keep first occurrence when inputs overlap
+    return list(dict.fromkeys(paths))
+
+
+class CsvSummaryWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=SUMMARY_COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSummaryWriter:
+    def __init__(self, path, batch_size=1024):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._schema = pa.schema(
+            [("Household", pa.string()), ("File", pa.string()), ("Devices", pa.int64()), ("Invalid Devices", pa.int64())]
+            + [(col, pa.float64()) for col in SUMMARY_COLUMNS[4:-1]]
+            + [("Breakdown", pa.string())]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._batch_size = batch_size
+        self._rows = []
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self._batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path, fmt=None):
+    if fmt is None:
+        fmt = "parquet" if path.lower().endswith((".parquet", ".pq")) else "csv"
+    return ParquetSummaryWriter(path) if fmt == "parquet" else CsvSummaryWriter(path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Price saved device lists in parallel.")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of saved device lists")
+    parser.add_argument("-o", "--output", required=True, help="Summary file to write (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from the output extension)")
+    parser.add_argument("--recursive", action="store_true", help="Search directories and ** globs recursively")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Files handed to a worker at a time")
+    parser.add_argument("--rate-peak", type=float, default=DEFAULT_RATE_PEAK, help="Peak rate for files without embedded rates")
+    parser.add_argument("--rate-low", type=float, default=DEFAULT_RATE_LOW, help="Off-peak rate for files without embedded rates")
+    parser.add_argument("--exact", action="store_true", help="Use exact fixed-point arithmetic")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = expand_inputs(args.inputs, recursive=args.recursive)
+    if not paths:
+        print("No saved device lists matched the inputs.", file=sys.stderr)
+        return 1
+
+    worker = partial(price_file, rate_peak=args.rate_peak, rate_low=args.rate_low, exact=args.exact)
+    writer = open_writer(args.output, args.format)
+    priced = skipped = devices = invalid = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            for path, row, error in pool.map(worker, paths, chunksize=args.chunksize):
+                if error is not None:
+                    skipped += 1
+                    print(f"Skipped {path}: {error}", file=sys.stderr)
+                    continue
+                if row["Invalid Devices"]:
+                    print(f"{path}: {row['Invalid Devices']} device(s) with invalid values left out of the totals",
+                          file=sys.stderr)
+                writer.write(row)
+                priced += 1
+                devices += row["Devices"]
+                invalid += row["Invalid Devices"]
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    rate = priced / elapsed if elapsed > 0 else float("inf")
+    print(
+        f"Priced {priced} households ({devices} devices, {invalid} invalid) in {elapsed:.2f}s, "
+        f"{rate:,.1f} households/s; skipped {skipped}.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
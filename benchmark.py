@@ -0,0 +1,220 @@
+"""Benchmarks for the pricing, save/load and display paths.
+
+Synthetic households are built from the DEVICE_DEFAULTS profiles. Each stage
+is timed on each household size and the median of the repeats is written to a
+JSON file; `compare` reads two such files and flags stages that got slower.
+
+    python benchmark.py run -o before.json
+    python benchmark.py run -o after.json --sizes 10 1000 100000
+    python benchmark.py compare before.json after.json --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from breakdown_table import filter_rows, page_rows, sort_rows
+from cost_chart import aggregate_slices, pie_figure
+from cost_engine import compute_costs, compute_costs_exact, included_mask, round_half_even
+from device_defaults import DEVICE_DEFAULTS
+from demand_profile import demand_curve
+from device_io import read_devices, serialize_devices
+from seasonal_calendar import calendar_matrix, device_seasons, household_calendar, week_shares
+from solar_battery import household_profile, simulate
+from validation import validate_devices
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+
+# Stages that get slow in proportion to rows are skipped above these sizes
+STAGE_LIMITS = {
+    "styler_render": 10_000,
+    "calendar_matrix": 100_000,
+}
+
+FORMAT_MAPPING = {
+    "Daily Cost": "£{:.2f}", "Monthly Cost": "£{:.2f}", "Annual Cost": "£{:.2f}",
+    "High Power (W)": "{:.2f}", "Low Power (W)": "{:.2f}", "High Power %": "{:.2f}",
+    "Low Power %": "{:.2f}", "Daily kWh": "{:.3f}",
+}
+
+
+def synthetic_household(n, seed=0):
+    """n devices drawn from the default profiles, with counts, some excluded rows and varied hours."""
+    rng = np.random.default_rng(seed)
+    names = list(DEVICE_DEFAULTS)
+    profiles = pd.DataFrame.from_dict(DEVICE_DEFAULTS, orient="index")
+    pick = rng.integers(0, len(names), n)
+    devices_df = profiles.iloc[pick].reset_index(drop=True)
+    devices_df.insert(0, "Name", np.asarray(names, dtype=object)[pick])
+    # Vary hours by up to +/-25% while keeping the day at 24 hours or less
+    scale = rng.uniform(0.75, 1.25, n)
+    hours_peak = devices_df["Hours Peak"].to_numpy() * scale
+    hours_low = devices_df["Hours Low"].to_numpy() * scale
+    over = np.maximum((hours_peak + hours_low) / 24.0, 1.0)
+    devices_df["Hours Peak"] = np.round(hours_peak / over * 60) / 60
+    devices_df["Hours Low"] = np.round(hours_low / over * 60) / 60
+    devices_df["Count"] = rng.integers(1, 4, n)
+    devices_df["Include"] = rng.random(n) > 0.05
+    return devices_df
+
+
+def _display_frame(devices_df, cost_df):
+    # The app's Cost Breakdown frame: costs rounded for display, hour columns dropped, columns renamed
+    display_df = pd.concat([devices_df, cost_df], axis=1)
+    for col in ["Daily Cost", "Monthly Cost", "Annual Cost"]:
+        display_df[col] = round_half_even(display_df[col], 2)
+    display_df["Daily kWh"] = round_half_even(display_df["Daily kWh"], 3)
+    display_df.reset_index(drop=True, inplace=True)
+    display_df.index = display_df.index + 1
+    display_df = display_df.drop(columns=["Hours Peak", "Hours Low"])
+    return display_df.rename(columns={
+        "Power Heavy": "High Power (W)", "Power Light": "Low Power (W)",
+        "Alloc Heavy": "High Power %", "Alloc Light": "Low Power %",
+    })
+
+
+def stages(devices_df, rate_peak=0.2361, rate_low=0.07):
+    """Name -> zero-argument callable for every benchmarked stage of one household."""
+    cost_df = compute_costs(devices_df, rate_peak, rate_low)
+    display_df = _display_frame(devices_df, cost_df)
+    csv_bytes = serialize_devices(devices_df, rate_peak, rate_low, "csv")
+    parquet_bytes = serialize_devices(devices_df, rate_peak, rate_low, "parquet")
+    included = included_mask(display_df)
+
+    def table_page():
+        view = sort_rows(filter_rows(display_df, "", "All"), "Annual Cost", True)
+        return page_rows(view, 1, 50)
+
+    def solar():
+        peak_kwh, low_kwh, day_factors = household_profile(devices_df)
+        return simulate(peak_kwh, low_kwh, day_factors[None, :], rate_peak, rate_low, 4.0, 10.0, 5.0)
+
+    def pie():
+        slices = aggregate_slices(display_df["Name"][included], display_df["Annual Cost"][included])
+        return pie_figure(slices).to_json()
+
+    return {
+        "cost_float": lambda: compute_costs(devices_df, rate_peak, rate_low),
+        "cost_exact": lambda: compute_costs_exact(devices_df, rate_peak, rate_low),
+        "save_csv": lambda: serialize_devices(devices_df, rate_peak, rate_low, "csv"),
+        "save_parquet": lambda: serialize_devices(devices_df, rate_peak, rate_low, "parquet"),
+        "load_csv": lambda: read_devices(csv_bytes),
+        "load_parquet": lambda: read_devices(parquet_bytes),
+        "validation": lambda: validate_devices(devices_df),
+        "display_build": lambda: _display_frame(devices_df, cost_df),
+        "table_page": table_page,
+        "styler_render": lambda: display_df.style.format(FORMAT_MAPPING).to_html(),
+        "pie_chart": pie,
+        "demand_curve": lambda: demand_curve(devices_df),
+        "calendar": lambda: household_calendar(devices_df, rate_peak, rate_low),
+        "calendar_matrix": lambda: calendar_matrix(cost_df["Daily kWh"], cost_df["Daily Cost"],
+                                                   device_seasons(devices_df), week_shares(devices_df)),
+        "solar_battery": solar,
+    }
+
+
+def time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(sizes, repeats=3, only=None, seed=0, log=sys.stderr):
+    """Time every stage at every size; returns the report written by `run`."""
+    results = []
+    warmed = set()
+    for size in sizes:
+        devices_df = synthetic_household(size, seed)
+        for stage, fn in stages(devices_df).items():
+            if only and stage not in only:
+                continue
+            if size > STAGE_LIMITS.get(stage, size):
+                continue
+            if stage not in warmed:
+                # One untimed call so lazy imports and first-use caches are not counted
+                fn()
+                warmed.add(stage)
+            timings = time_call(fn, repeats if size < 1_000_000 else max(1, repeats // 2))
+            median = statistics.median(timings)
+            results.append({"stage": stage, "devices": size, "seconds": median, "repeats": len(timings),
+                            "min_seconds": min(timings)})
+            print(f"{stage:>16} {size:>9,} devices  {median * 1000:10.2f} ms", file=log)
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "results": results,
+    }
+
+
+def compare(before, after, threshold=0.1, min_seconds=0.001):
+    """Rows of (stage, devices, before, after, ratio, regressed) for stages in both reports.
+
+    A stage regresses when it is more than threshold slower and the slowdown
+    is at least min_seconds, so timer noise on tiny stages is not flagged.
+    """
+    old = {(r["stage"], r["devices"]): r["seconds"] for r in before["results"]}
+    rows = []
+    for r in after["results"]:
+        key = (r["stage"], r["devices"])
+        if key not in old:
+            continue
+        ratio = r["seconds"] / old[key] if old[key] > 0 else float("inf")
+        regressed = ratio > 1 + threshold and r["seconds"] - old[key] >= min_seconds
+        rows.append((r["stage"], r["devices"], old[key], r["seconds"], ratio, regressed))
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pricing, save/load and display paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Time every stage and write a JSON report")
+    run_parser.add_argument("-o", "--output", required=True, help="JSON file to write")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Household sizes (devices)")
+    run_parser.add_argument("--repeats", type=int, default=3, help="Timed repeats per stage (halved at 1M)")
+    run_parser.add_argument("--stages", nargs="+", help="Only these stages")
+    run_parser.add_argument("--seed", type=int, default=0)
+
+    compare_parser = commands.add_parser("compare", help="Flag stages that got slower between two reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown (0.1 = 10%%)")
+    compare_parser.add_argument("--min-seconds", type=float, default=0.001, help="Ignore slowdowns smaller than this")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "run":
+        report = run(args.sizes, args.repeats, args.stages, args.seed)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    rows = compare(before, after, args.threshold, args.min_seconds)
+    for stage, devices, old, new, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{stage:>16} {devices:>9,}  {old * 1000:10.2f} ms -> {new * 1000:10.2f} ms  x{ratio:5.2f}  {flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{regressions} regression(s) in {len(rows)} comparisons.", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
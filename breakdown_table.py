@@ -0,0 +1,51 @@
+"""Filtering, sorting and paging for the Cost Breakdown table.
+
+Only the rows of the visible page are handed to the table; number formats are
+applied by the table's column configuration rather than by rendering every
+cell through a pandas Styler.
+"""
+import math
+
+import numpy as np
+
+# Annual cost bands offered as a filter: label -> [low, high)
+COST_BANDS = {
+    "All": (-math.inf, math.inf),
+    "Under £10": (-math.inf, 10.0),
+    "£10 to £100": (10.0, 100.0),
+    "£100 to £1,000": (100.0, 1000.0),
+    "£1,000 and over": (1000.0, math.inf),
+}
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def filter_rows(table_df, name_query="", band="All", cost_column="Annual Cost"):
+    """Rows whose name contains name_query (case-insensitive) and whose cost falls in band."""
+    mask = np.ones(len(table_df), dtype=bool)
+    if name_query:
+        names = table_df["Name"].astype(str)
+        mask &= names.str.contains(name_query, case=False, regex=False).to_numpy()
+    low, high = COST_BANDS[band]
+    if band != "All":
+        costs = table_df[cost_column].to_numpy(dtype=np.float64)
+        mask &= (costs >= low) & (costs < high)
+    return table_df[mask] if not mask.all() else table_df
+
+
+def sort_rows(table_df, column=None, descending=False):
+    # Stable sort so that ties keep list order
+    if column is None or column not in table_df.columns:
+        return table_df
+    return table_df.sort_values(column, ascending=not descending, kind="stable", na_position="last")
+
+
+def page_count(n_rows, page_size):
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def page_rows(table_df, page, page_size):
+    """The 1-based page of rows, clamped to the pages that exist."""
+    page = min(max(int(page), 1), page_count(len(table_df), page_size))
+    start = (page - 1) * page_size
+    return table_df.iloc[start:start + page_size]
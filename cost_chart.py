@@ -0,0 +1,50 @@
+"""Pre-aggregated data for the annual cost pie chart.
+
+Devices with the same name are summed into one slice, and slices below a
+minimum share of the total (or beyond max_slices) are folded into "Other", so
+the chart stays the same small size however long the device list is.
+"""
+import numpy as np
+import pandas as pd
+
+OTHER_LABEL = "Other"
+
+
+def chart_key(names, costs):
+    # Content hash of the (Name, Annual Cost) pairs, used to reuse a built chart
+    frame = pd.DataFrame({"Name": np.asarray(names, dtype=object).astype(str),
+                          "Annual Cost": np.asarray(costs, dtype=np.float64)})
+    return int(pd.util.hash_pandas_object(frame, index=False).sum())
+
+
+def aggregate_slices(names, costs, min_share=0.02, max_slices=20):
+    """One row per slice, largest first, with anything small folded into "Other".
+
+    Non-positive and non-finite costs are left out, as a pie cannot show them.
+    """
+    frame = pd.DataFrame({"Name": np.asarray(names, dtype=object).astype(str),
+                          "Annual Cost": np.asarray(costs, dtype=np.float64)})
+    frame = frame[np.isfinite(frame["Annual Cost"]) & (frame["Annual Cost"] > 0)]
+    slices = frame.groupby("Name", sort=False)["Annual Cost"].sum().sort_values(ascending=False)
+    total = slices.sum()
+    if total <= 0:
+        return pd.DataFrame(columns=["Name", "Annual Cost"])
+
+    # A device actually named "Other" joins the folded slice
+    keep = slices[(slices / total >= min_share) & (slices.index != OTHER_LABEL)]
+    if len(keep) > max_slices or (len(keep) == max_slices and len(keep) < len(slices)):
+        keep = keep.iloc[:max_slices - 1]
+    other = total - keep.sum()
+    result = keep.reset_index()
+    if len(keep) < len(slices) and other > 0:
+        result = pd.concat([result, pd.DataFrame({"Name": [OTHER_LABEL], "Annual Cost": [other]})], ignore_index=True)
+    return result
+
+
+def pie_figure(slices, height=600):
+    # graph_objects rather than plotly.express, which is far slower to import
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Pie(labels=slices["Name"], values=slices["Annual Cost"], sort=False))
+    fig.update_layout(title="Share of Total Annual Cost", height=height)
+    return fig
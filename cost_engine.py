@@ -0,0 +1,383 @@
+import numpy as np
+import pandas as pd
+
+# Calendar constants used throughout the app
+DAYS_PER_MONTH = 30.4167
+DAYS_PER_YEAR = 365.0
+
+COST_COLUMNS = ["Daily Cost", "Monthly Cost", "Annual Cost", "Daily kWh"]
+
+# Every column a row's cost depends on
+INPUT_COLUMNS = [
+    "Power Heavy", "Power Light", "Alloc Heavy", "Alloc Light",
+    "Hours Peak", "Hours Low", "Days", "Weeks", "Count",
+]
+
+# Columns that may be missing from older saved lists, with the value assumed for every row
+COLUMN_DEFAULTS = {
+    "Include": True,
+    "Count": 1,
+    "Days": 7.0,
+    "Weeks": 52.0,
+}
+
+
+def numeric_column(devices_df, column, positions=None):
+    """One input column as float64, for every row or only the given row positions.
+
+    A missing column falls back to its COLUMN_DEFAULTS value (NaN when it has
+    none); cells that cannot be parsed as numbers become NaN.
+    """
+    n = len(devices_df) if positions is None else len(positions)
+    if column in devices_df.columns:
+        values = devices_df[column].to_numpy()
+        if positions is not None:
+            values = values[positions]
+        if values.dtype.kind not in "fiub":
+            values = pd.to_numeric(values, errors="coerce")
+        return np.asarray(values, dtype=np.float64)
+    if column in COLUMN_DEFAULTS:
+        return np.full(n, COLUMN_DEFAULTS[column], dtype=np.float64)
+    return np.full(n, np.nan, dtype=np.float64)
+
+
+def unit_profile(devices_df, positions=None):
+    """(average kW, effective daily peak hours, effective daily off-peak hours, count) for each row.
+
+    Hours are scaled by Days/7 and Weeks/52; rows with bad inputs give NaN.
+    """
+    def column(name):
+        return numeric_column(devices_df, name, positions)
+
+    p_heavy = column("Power Heavy")
+    p_light = column("Power Light")
+    a_heavy = column("Alloc Heavy") / 100.0
+    a_light = column("Alloc Light") / 100.0
+
+    # Average Power in kW
+    avg_kw = ((p_heavy * a_heavy) + (p_light * a_light)) / 1000.0
+
+    # Frequency Scaling
+    scaling_factor = (column("Days") / 7.0) * (column("Weeks") / 52.0)
+
+    # Effective Daily Hours
+    h_peak = column("Hours Peak") * scaling_factor
+    h_low = column("Hours Low") * scaling_factor
+
+    return avg_kw, h_peak, h_low, column("Count")
+
+
+# Spellings of the Include flag accepted from text, as CSV reading accepts True/False in any case
+_INCLUDE_WORDS = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+
+
+def parse_include(values):
+    """Include flags as a bool array: missing values are included, text is read as a word.
+
+    Booleans and numbers are taken as they are; strings must be one of
+    true/false, yes/no or 1/0 in any case, anything else raises ValueError.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    if pd.api.types.is_bool_dtype(values.dtype) or pd.api.types.is_numeric_dtype(values.dtype):
+        return values.fillna(True).astype(bool).to_numpy()
+    cells = values.astype(object).reset_index(drop=True)
+    flags = np.ones(len(cells), dtype=bool)
+    is_text = cells.map(lambda value: isinstance(value, str)).to_numpy(dtype=bool)
+    other = ~is_text & cells.notna().to_numpy()
+    flags[other] = [bool(value) for value in cells[other]]
+    if is_text.any():
+        text = cells[is_text]
+        words = text.str.strip().str.lower().map(_INCLUDE_WORDS)
+        if words.isna().any():
+            raise ValueError(f"Include must be true or false, got {text[words.isna()].iloc[0]!r}")
+        flags[is_text] = words.to_numpy(dtype=bool)
+    return flags
+
+
+def included_mask(devices_df, positions=None):
+    """Boolean mask of the rows counted in totals, for every row or only the given row positions.
+
+    A missing Include column or an empty cell counts as included; text is read
+    by parse_include, so "False", "no" or "0" leave a row out.
+    """
+    n = len(devices_df) if positions is None else len(positions)
+    if "Include" not in devices_df.columns:
+        return np.ones(n, dtype=bool)
+    include = devices_df["Include"]
+    if positions is not None:
+        include = include.iloc[positions]
+    return parse_include(include)
+
+
+def price_rows(devices_df, rate_peak, rate_low, positions=None):
+    """Vectorized core of compute_costs.
+
+    Returns an (n, 4) float64 array with the COST_COLUMNS in order, for every
+    row or only the given row positions.
+    """
+    avg_kw, h_peak, h_low, count = unit_profile(devices_df, positions)
+
+    # Per Unit, then scaled by Count
+    unit_daily_kwh = (h_peak * avg_kw) + (h_low * avg_kw)
+    unit_daily_cost = (h_peak * avg_kw * float(rate_peak)) + (h_low * avg_kw * float(rate_low))
+
+    daily_kwh = unit_daily_kwh * count
+    daily_cost = unit_daily_cost * count
+
+    # A bad row zeroes every output in that row
+    bad = ~(np.isfinite(daily_cost) & np.isfinite(daily_kwh))
+    daily_cost[bad] = 0.0
+    daily_kwh[bad] = 0.0
+
+    return np.column_stack([daily_cost, daily_cost * DAYS_PER_MONTH, daily_cost * DAYS_PER_YEAR, daily_kwh])
+
+
+def band_kwh(devices_df):
+    """Daily peak and off-peak kWh per row, scaled by frequency and count.
+
+    Any rate pair prices a row as peak_kwh * rate_peak + low_kwh * rate_low.
+    Rows with missing or non-numeric inputs use no energy.
+    """
+    avg_kw, h_peak, h_low, count = unit_profile(devices_df)
+    peak_kwh = h_peak * avg_kw * count
+    low_kwh = h_low * avg_kw * count
+    bad = ~(np.isfinite(peak_kwh) & np.isfinite(low_kwh))
+    peak_kwh[bad] = 0.0
+    low_kwh[bad] = 0.0
+    return peak_kwh, low_kwh
+
+
+def compute_costs(devices_df, rate_peak, rate_low):
+    """Price every device row in one vectorized pass.
+
+    Follows the same order of operations as the original per-row Decimal loop,
+    so results agree with it to the penny. Rows with missing or non-numeric
+    inputs are priced at zero. The returned frame shares the input's index.
+    """
+    costs = price_rows(devices_df, rate_peak, rate_low)
+    # The frame wraps the freshly priced array rather than copying it
+    return pd.DataFrame(costs, index=devices_df.index, columns=COST_COLUMNS, copy=False)
+
+
+def round_half_even(values, places=2):
+    """Round like Decimal formatting does (half to even), ignoring float noise.
+
+    Values are snapped to a micro-unit grid first so that a float sitting a
+    hair either side of an exact half (e.g. 0.065 stored as 0.06500000000000000222)
+    rounds the same way the Decimal value would.
+    """
+    scale = 10.0 ** places
+    scaled = np.round(np.asarray(values, dtype=np.float64) * scale, 6)
+    return np.round(scaled) / scale
+
+
+# --- Exact fixed-point mode ---
+#
+# Inputs are held as int64 on fixed grids:
+#   power       milliwatts               (W * 1000)
+#   allocation  basis points             (% * 100)
+#   hours       minutes                  (h * 60)
+#   rates       hundredths of a penny    (£/kWh * 10000)
+#   days, weeks, count as whole numbers
+#
+# One unit's daily cost in pence is then exactly
+#     P * F * (min_peak * rate_peak + min_low * rate_low) / FIXED_DENOM
+# with P = mW * bp summed over both load states and F = days * weeks, and
+# FIXED_DENOM = 1e4 (bp) * 1e6 (mW -> kW) * 60 (min) * 364 (7 * 52) * 1e4 (rate) / 100 (pence).
+# Every value is carried as a (quotient, remainder) pair over FIXED_DENOM and is
+# only rounded (half to even, like Decimal formatting) once the final figure is known.
+#
+# Overflow bound: the remainder is always < FIXED_DENOM (~2.2e16) and is only ever
+# multiplied by factors below MUL_BASE, so each partial product stays under 2.8e18
+# and the sum of two under 5.6e18 < 2**63. Everything else is checked per row before
+# any integer arithmetic: every grid input, every product of grid inputs (P, F, P * F,
+# the minute and rate sums) and every result, including the monthly figure's
+# multiplication by MONTH_NUMERATOR, must stay below FIXED_LIMIT (2**61). A row that
+# does not is priced as bad (zero), like a row with a missing input. Quotients are
+# accumulated in _mul_frac as at most twice the final value, so this leaves them
+# room; the limit on a row's daily cost is about 7.6e12 pence (£76 billion).
+FIXED_DENOM = 364 * 60 * 10**12
+MUL_BASE = 128
+FIXED_LIMIT = 2**61
+# Base-MUL_BASE digits in a non-negative int64
+MUL_DIGITS = 9
+
+# DAYS_PER_MONTH as an exact ratio
+MONTH_NUMERATOR, MONTH_DIVISOR = 304167, 10000
+
+
+def _to_grid(values, scale):
+    # Callers zero any value whose scaled magnitude is not below FIXED_LIMIT first
+    return np.rint(values * scale).astype(np.int64)
+
+
+def _mul_frac(q, r, k):
+    # (q + r/D) * k for non-negative int64 k, one base-MUL_BASE digit at a time
+    k = np.asarray(k, dtype=np.int64)
+    if (k < 0).any():
+        raise ValueError("_mul_frac needs non-negative multipliers")
+    digits = []
+    rest = np.broadcast_to(k, q.shape).copy()
+    # A non-negative int64 has at most MUL_DIGITS digits, so the loop always ends
+    for _ in range(MUL_DIGITS):
+        rest, digit = np.divmod(rest, MUL_BASE)
+        digits.append(digit)
+        if not rest.any():
+            break
+    acc_q = np.zeros_like(q)
+    acc_r = np.zeros_like(r)
+    for digit in reversed(digits):
+        acc_q, acc_r = _add_frac(acc_q * MUL_BASE, acc_r * MUL_BASE, q * digit, r * digit)
+    return acc_q, acc_r
+
+
+def _add_frac(q1, r1, q2, r2):
+    carry, r = np.divmod(r1 + r2, FIXED_DENOM)
+    return q1 + q2 + carry, r
+
+
+def _round_frac(q, r, divisor=1):
+    # Round (q + r/D) / divisor half to even; divisor is 1 or an even integer
+    if divisor == 1:
+        twice = 2 * r
+        up = (twice > FIXED_DENOM) | ((twice == FIXED_DENOM) & (q % 2 == 1))
+        return q + up
+    whole, below = np.divmod(q, divisor)
+    half = divisor // 2
+    tie = (below == half) & (r == 0)
+    up = (below > half) | ((below == half) & (r > 0)) | (tie & (whole % 2 == 1))
+    return whole + up
+
+
+def _out_of_range(raw, scales, rates):
+    # Rows with a missing input, or whose grid inputs, products or results would not stay below
+    # FIXED_LIMIT; magnitudes are estimated in float64, far more precisely than the factor of
+    # four between FIXED_LIMIT and int64 overflow needs
+    bad = np.zeros(len(raw["Count"]), dtype=bool)
+    for values in raw.values():
+        bad |= ~np.isfinite(values)
+    with np.errstate(over="ignore", invalid="ignore"):
+        g = {col: np.abs(values) * scales[col] for col, values in raw.items()}
+        rate_peak, rate_low = abs(rates[0]), abs(rates[1])
+        power = g["Power Heavy"] * g["Alloc Heavy"] + g["Power Light"] * g["Alloc Light"]
+        frequency = g["Days"] * g["Weeks"]
+        base = power * frequency
+        minute_cost = g["Hours Peak"] * rate_peak + g["Hours Low"] * rate_low
+        minutes = (g["Hours Peak"] + g["Hours Low"]) * 100000
+        units = base * g["Count"] / FIXED_DENOM
+        checked = list(g.values()) + [
+            power, frequency, base, minute_cost, minutes, units,
+            units * minute_cost * MONTH_NUMERATOR, units * minutes * MONTH_NUMERATOR,
+        ]
+        for values in checked:
+            # NaN compares False, so a product of huge values is caught too
+            bad |= ~(values < FIXED_LIMIT)
+    if not (np.isfinite(rate_peak) and np.isfinite(rate_low)
+            and rate_peak < FIXED_LIMIT and rate_low < FIXED_LIMIT):
+        bad[:] = True
+    return bad
+
+
+def _fixed_point_daily(devices_df, rate_peak, rate_low):
+    # Exact daily cost (pence) and energy (Wh) per row as (quotient, remainder) pairs
+    columns = {
+        "Power Heavy": 1000, "Power Light": 1000,
+        "Alloc Heavy": 100, "Alloc Light": 100,
+        "Hours Peak": 60, "Hours Low": 60,
+        "Days": 1, "Weeks": 1, "Count": 1,
+    }
+    raw = {col: numeric_column(devices_df, col) for col in columns}
+    rates = (float(rate_peak) * 10000, float(rate_low) * 10000)
+    bad = _out_of_range(raw, columns, rates)
+    grid = {col: _to_grid(np.where(bad, 0.0, raw[col]), scale) for col, scale in columns.items()}
+
+    # Rates that cannot be held on the grid leave every row bad, and are not used
+    r_peak, r_low = (int(round(rate)) if np.isfinite(rate) and abs(rate) < FIXED_LIMIT else 0 for rate in rates)
+
+    power = grid["Power Heavy"] * grid["Alloc Heavy"] + grid["Power Light"] * grid["Alloc Light"]
+    base = power * (grid["Days"] * grid["Weeks"])
+    minute_cost = grid["Hours Peak"] * r_peak + grid["Hours Low"] * r_low
+    minutes = grid["Hours Peak"] + grid["Hours Low"]
+    count = grid["Count"]
+
+    # Work on magnitudes so remainders stay non-negative; signs are applied after rounding
+    cost_sign = np.sign(base) * np.sign(minute_cost) * np.sign(count)
+    kwh_sign = np.sign(base) * np.sign(minutes) * np.sign(count)
+
+    q, r = np.divmod(np.abs(base), FIXED_DENOM)
+    q, r = _mul_frac(q, r, np.abs(count))
+    cost_q, cost_r = _mul_frac(q, r, np.abs(minute_cost))
+    # FIXED_DENOM / 1e5 is the energy denominator for Wh
+    kwh_q, kwh_r = _mul_frac(q, r, np.abs(minutes) * 100000)
+    return (cost_q, cost_r, cost_sign), (kwh_q, kwh_r, kwh_sign)
+
+
+def compute_costs_exact(devices_df, rate_peak, rate_low):
+    """Price every device row with exact int64 fixed-point arithmetic.
+
+    Same columns and index as compute_costs, but each figure is the exact
+    value rounded half to even to pence (kWh to three places), so it formats
+    identically to the Decimal calculation. The only exception is a value lying
+    exactly on a half-penny when the hours are a recurring fraction (e.g. 20
+    minutes stored as 0.3333333333333333): Decimal rounds the truncated input
+    and lands just below the tie, while this rounds the true value.
+
+    Inputs are snapped to the fixed-point grid described above; rows with
+    missing or non-numeric inputs are priced at zero.
+    """
+    (cost_q, cost_r, cost_sign), (kwh_q, kwh_r, kwh_sign) = _fixed_point_daily(devices_df, rate_peak, rate_low)
+
+    monthly_q, monthly_r = _mul_frac(cost_q, cost_r, MONTH_NUMERATOR)
+    annual_q, annual_r = _mul_frac(cost_q, cost_r, 365)
+
+    return pd.DataFrame({
+        "Daily Cost": cost_sign * _round_frac(cost_q, cost_r) / 100.0,
+        "Monthly Cost": cost_sign * _round_frac(monthly_q, monthly_r, MONTH_DIVISOR) / 100.0,
+        "Annual Cost": cost_sign * _round_frac(annual_q, annual_r) / 100.0,
+        "Daily kWh": kwh_sign * _round_frac(kwh_q, kwh_r) / 1000.0,
+    }, index=devices_df.index)
+
+
+def _exact_sum(q, r, sign):
+    # Sum signed (quotient, remainder) pairs as one exact Python fraction numerator
+    # Both halves are split at 2**32 so that no int64 sum overflows, however many rows there are
+    parts = []
+    for s in (1, -1):
+        mask = sign == s
+        q_hi, q_lo = np.divmod(q[mask], 2**32)
+        r_hi, r_lo = np.divmod(r[mask], 2**32)
+        quotient = int(q_hi.sum()) * 2**32 + int(q_lo.sum())
+        parts.append(s * (quotient * FIXED_DENOM + int(r_hi.sum()) * 2**32 + int(r_lo.sum())))
+    return parts[0] + parts[1]
+
+
+def _round_numerator(numerator, divisor):
+    # Round numerator / divisor half to even using Python integers
+    whole, rem = divmod(abs(numerator), divisor)
+    if 2 * rem > divisor or (2 * rem == divisor and whole % 2 == 1):
+        whole += 1
+    return whole if numerator >= 0 else -whole
+
+
+def exact_totals(devices_df, rate_peak, rate_low):
+    """Totals over included rows, summed exactly and rounded once at the end.
+
+    Returns a dict with "Daily Cost", "Monthly Cost", "Annual Cost" (£ to the
+    penny) and "Daily kWh", "Monthly kWh", "Annual kWh" (to two places).
+    """
+    (cost_q, cost_r, cost_sign), (kwh_q, kwh_r, kwh_sign) = _fixed_point_daily(devices_df, rate_peak, rate_low)
+    active = included_mask(devices_df)
+
+    # Numerators over FIXED_DENOM: pence for cost, Wh for energy
+    pence = _exact_sum(cost_q[active], cost_r[active], cost_sign[active])
+    wh = _exact_sum(kwh_q[active], kwh_r[active], kwh_sign[active])
+    month_denom = FIXED_DENOM * MONTH_DIVISOR
+    # kWh totals are rounded to hundredths (10 Wh), as the totals display them
+    return {
+        "Daily Cost": _round_numerator(pence, FIXED_DENOM) / 100.0,
+        "Monthly Cost": _round_numerator(pence * MONTH_NUMERATOR, month_denom) / 100.0,
+        "Annual Cost": _round_numerator(pence * 365, FIXED_DENOM) / 100.0,
+        "Daily kWh": _round_numerator(wh, FIXED_DENOM * 10) / 100.0,
+        "Monthly kWh": _round_numerator(wh * MONTH_NUMERATOR, month_denom * 10) / 100.0,
+        "Annual kWh": _round_numerator(wh * 365, FIXED_DENOM * 10) / 100.0,
+    }
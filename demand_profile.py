@@ -0,0 +1,187 @@
+"""Minute-by-minute household demand on a day when every device is used.
+
+Averages are enough for cost, but a fuse or an EV charger has to carry the
+highest demand of the day. Each device runs its off-peak hours as one block
+from the start of the off-peak window and its peak hours as one block from
+the usual start time of its type (or its Start Time column). While running it
+cycles between its heavy and light power: the cycle length and the number of
+heavy bursts in each cycle come from its type's duty-cycle profile, and the
+share of each cycle spent heavy is its Alloc Heavy, so the day's energy
+matches the two-state model (exactly when a block is a whole number of
+cycles; a cut-off last cycle keeps its heavy burst first).
+
+Days and Weeks are not applied: the curve is for a day on which every
+included device runs, times its Count. Every run and burst is a weighted
+interval of minutes, and the curve is two running sums over the interval
+ends, so its cost grows with the number of devices, not devices x minutes.
+"""
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import included_mask, numeric_column
+from device_defaults import device_types
+from tou_tariff import DEFAULT_OFF_PEAK_END, DEFAULT_OFF_PEAK_START, MINUTES_PER_DAY
+
+# Optional per-device column with the time its peak-hours block starts: a time, or text such as
+# "07:30" (CSV) or "07:30:00" (a household reopened from a portfolio)
+START_TIME_COLUMN = "Start Time"
+START_TIME_FORMATS = ("%H:%M", "%H:%M:%S")
+
+# Duty cycle of each device type as (cycle minutes, heavy bursts per cycle)
+DEFAULT_DUTY_CYCLE = (60.0, 1)
+DUTY_CYCLES = {
+    "Washing Machine": (30.0, 2),  # heating the water, then the spin
+    "Dishwasher": (45.0, 2),  # wash heat, then drying heat
+    "Tumble Dryer": (15.0, 1),
+    "Electric Oven (Fan)": (10.0, 1),  # thermostat holding temperature
+    "Electric Oven (Conventional)": (10.0, 1),
+    "Electric Radiator": (20.0, 1),
+    "Fan Heater": (20.0, 1),
+}
+
+# Usual start of the peak-hours block, matched on the start of the type name
+USUAL_START_TIMES = [
+    ("Television", time(19, 0)),
+    ("Light", time(17, 0)),
+    ("Electric Oven", time(17, 30)),
+    ("Induction Hob", time(17, 30)),
+    ("Washing Machine", time(9, 0)),
+    ("Tumble Dryer", time(10, 0)),
+    ("Dishwasher", time(19, 30)),
+    ("Electric Radiator", time(17, 0)),
+    ("Fan Heater", time(18, 0)),
+    ("Air Conditioner", time(13, 0)),
+]
+
+UK_SUPPLY_VOLTS = 230.0
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _start_minutes(devices_df, types, default):
+    # Peak-block start of each row: its Start Time, else its type's usual start, else the default
+    by_type = {}
+    for t in set(types):
+        by_type[t] = next((_minutes(start) for prefix, start in USUAL_START_TIMES if t.startswith(prefix)), default)
+    starts = np.array([by_type[t] for t in types], dtype=np.float64)
+    if START_TIME_COLUMN in devices_df.columns:
+        given = _given_minutes(devices_df[START_TIME_COLUMN])
+        starts = np.where(np.isnan(given), starts, given)
+    return starts
+
+
+def _given_minutes(values):
+    # Minutes after midnight of each Start Time cell, NaN where it is empty; text that is not a time is an error
+    cells = pd.Series(values.to_numpy(dtype=object))
+    minutes = np.full(len(cells), np.nan)
+    is_time = cells.map(lambda v: isinstance(v, time)).to_numpy(dtype=bool)
+    minutes[is_time] = [_minutes(t) for t in cells[is_time]]
+    text = cells[~is_time & cells.notna().to_numpy()].astype(str).str.strip()
+    text = text[text != ""]
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    for fmt in START_TIME_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(text, format=fmt, errors="coerce"))
+    if parsed.isna().any():
+        bad = text[parsed.isna()]
+        raise ValueError(f"{START_TIME_COLUMN} must be a time such as 07:30; got {bad.iloc[0]!r} "
+                         f"({len(bad)} row(s))")
+    minutes[text.index.to_numpy()] = (parsed.dt.hour * 60 + parsed.dt.minute).to_numpy(dtype=np.float64)
+    return minutes
+
+
+def _intervals(devices_df, off_peak_start, off_peak_end):
+    """(row, start, end, kW) of every interval a device draws power, in minutes from midnight.
+
+    Each device contributes its light power over each running block and the
+    extra heavy-minus-light power over each heavy burst inside it. Ends may
+    run past midnight (up to 2880), to be folded back onto the day.
+    """
+    def column(name):
+        return numeric_column(devices_df, name)
+
+    types = device_types(devices_df)
+    cycles = np.array([DUTY_CYCLES.get(t, DEFAULT_DUTY_CYCLE) for t in types], dtype=np.float64).reshape(-1, 2)
+    spacing = cycles[:, 0] / cycles[:, 1]
+    count = column("Count")
+    light = column("Power Light") / 1000.0 * count
+    extra = (column("Power Heavy") - column("Power Light")) / 1000.0 * count
+    heavy = np.clip(column("Alloc Heavy") / 100.0, 0.0, 1.0) * spacing
+    # Rows that cannot be priced draw nothing
+    bad = ~np.isfinite(light + extra + heavy + column("Hours Peak") + column("Hours Low"))
+
+    rows, starts, ends, kws = [], [], [], []
+    n = len(devices_df)
+    for block_start, hours in ((_start_minutes(devices_df, types, float(_minutes(off_peak_end))), column("Hours Peak")),
+                               (np.full(n, float(_minutes(off_peak_start))), column("Hours Low"))):
+        length = np.where(bad, 0.0, np.clip(np.nan_to_num(hours), 0.0, 24.0) * 60.0)
+        end = block_start + length
+        rows.append(np.arange(n))
+        starts.append(block_start)
+        ends.append(end)
+        kws.append(np.where(bad, 0.0, light))
+        # Heavy bursts every `spacing` minutes from the block start, cut off at the block end
+        bursts = np.ceil(length / spacing).astype(np.int64)
+        row = np.repeat(np.arange(n), bursts)
+        burst_start = block_start[row] + spacing[row] * (np.arange(len(row)) - np.repeat(np.cumsum(bursts) - bursts, bursts))
+        rows.append(row)
+        starts.append(burst_start)
+        ends.append(np.minimum(burst_start + heavy[row], end[row]))
+        kws.append(extra[row])
+    return np.concatenate(rows), np.concatenate(starts), np.concatenate(ends), np.concatenate(kws)
+
+
+def _fold(two_days):
+    # Minutes after midnight of the next day are the same minutes of this day
+    return two_days[:MINUTES_PER_DAY] + two_days[MINUTES_PER_DAY:]
+
+
+def _sum_intervals(start, end, kw):
+    # kW in each minute of the day from weighted [start, end) intervals with fractional ends.
+    # The energy drawn up to minute t is sum(kw * (t - b)) over breakpoints b < t (+kw at starts,
+    # -kw at ends), i.e. t * A(t) - B(t) with A and B running sums over the breakpoints.
+    axis = 2 * MINUTES_PER_DAY
+    points = np.concatenate([start, end])
+    weights = np.concatenate([kw, -kw])
+    keep = (end > start) & (kw != 0)
+    points, weights = points[np.tile(keep, 2)], weights[np.tile(keep, 2)]
+    bins = np.clip(np.floor(points).astype(np.int64) + 1, 0, axis + 1)
+    slope = np.cumsum(np.bincount(bins, weights=weights, minlength=axis + 2))[:axis + 1]
+    offset = np.cumsum(np.bincount(bins, weights=weights * points, minlength=axis + 2))[:axis + 1]
+    energy = np.arange(axis + 1) * slope - offset
+    return _fold(np.diff(energy))
+
+
+def demand_curve(devices_df, off_peak_start=DEFAULT_OFF_PEAK_START, off_peak_end=DEFAULT_OFF_PEAK_END):
+    """Household kW in each minute of a usage day (length 1440), over the included devices."""
+    included = devices_df[included_mask(devices_df)]
+    _, start, end, kw = _intervals(included, off_peak_start, off_peak_end)
+    return _sum_intervals(start, end, kw)
+
+
+def demand_at(devices_df, minute, off_peak_start=DEFAULT_OFF_PEAK_START, off_peak_end=DEFAULT_OFF_PEAK_END):
+    """Each device's average kW during one minute of the day (Count included)."""
+    row, start, end, kw = _intervals(devices_df, off_peak_start, off_peak_end)
+    overlap = np.zeros(len(row))
+    for shift in (0, MINUTES_PER_DAY):
+        lo = minute + shift
+        overlap += np.clip(np.minimum(end, lo + 1) - np.maximum(start, lo), 0.0, 1.0)
+    return np.bincount(row, weights=overlap * kw, minlength=len(devices_df))
+
+
+def peak_demand(curve):
+    """(peak kW, minute of the day it first occurs) of a 1440-minute curve."""
+    minute = int(np.argmax(curve))
+    return float(curve[minute]), minute
+
+
+def minute_label(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def fuse_kw(amps, volts=UK_SUPPLY_VOLTS):
+    """Continuous kW a supply fuse carries."""
+    return amps * volts / 1000.0
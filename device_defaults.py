@@ -0,0 +1,264 @@
+"""Default usage profiles offered by the "Device Type" selector.
+
+Kept out of app.py so the table is built once per process rather than on every
+script run. device_types gives the profile each row of a device list belongs to.
+"""
+
+DEVICE_DEFAULTS = {
+    "Other": {
+        "Power Heavy": 100.0, "Power Light": 10.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 0.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (LED) 32 inch": {
+        "Power Heavy": 45.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (LED) 55 inch": {
+        "Power Heavy": 80.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (LED) 65 inch": {
+        "Power Heavy": 110.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (LED) 75 inch": {
+        "Power Heavy": 145.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (OLED) 32 inch": {
+        "Power Heavy": 55.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (OLED) 55 inch": {
+        "Power Heavy": 100.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (OLED) 65 inch": {
+        "Power Heavy": 160.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (OLED) 75 inch": {
+        "Power Heavy": 220.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (Micro LED) 32 inch": {
+        "Power Heavy": 50.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (Micro LED) 55 inch": {
+        "Power Heavy": 90.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (Micro LED) 65 inch": {
+        "Power Heavy": 140.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Television (Micro LED) 75 inch": {
+        "Power Heavy": 190.0, "Power Light": 1.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 3.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Computer (Gaming)": {
+        "Power Heavy": 400.0, "Power Light": 50.0,
+        "Alloc Heavy": 80.0, "Alloc Light": 20.0,
+        "Hours Peak": 8.0, "Hours Low": 1.0,
+        "Days": 5.0, "Weeks": 52.0
+    },
+    "Computer (Mac Mini M4)": {
+        "Power Heavy": 30.0, "Power Light": 5.0,
+        "Alloc Heavy": 10.0, "Alloc Light": 90.0,
+        "Hours Peak": 8.0, "Hours Low": 1.0,
+        "Days": 5.0, "Weeks": 52.0
+    },
+    "Computer (Desktop)": {
+        "Power Heavy": 200.0, "Power Light": 50.0,
+        "Alloc Heavy": 10.0, "Alloc Light": 90.0,
+        "Hours Peak": 8.0, "Hours Low": 1.0,
+        "Days": 5.0, "Weeks": 52.0
+    },
+    "Light (Incandescent)": {
+        "Power Heavy": 60.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 5.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Light (Halogen)": {
+        "Power Heavy": 45.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 5.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Light (LED Spotlight)": {
+        "Power Heavy": 5.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 5.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Light (LED Bulb)": {
+        "Power Heavy": 9.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 5.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Light (LED ceiling light)": {
+        "Power Heavy": 18.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 5.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Electric Radiator": {
+        "Power Heavy": 1500.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 4.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 26.0
+    },
+    "Fan Heater": {
+        "Power Heavy": 2000.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 2.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 20.0
+    },
+    "Air Conditioner (Heating)": {
+        "Power Heavy": 1200.0, "Power Light": 10.0,
+        "Alloc Heavy": 80.0, "Alloc Light": 20.0,
+        "Hours Peak": 4.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 20.0
+    },
+    "Air Conditioner (Cooling)": {
+        "Power Heavy": 1200.0, "Power Light": 10.0,
+        "Alloc Heavy": 80.0, "Alloc Light": 20.0,
+        "Hours Peak": 4.0, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 12.0
+    },
+    "Air Source Heat Pump (Low Annual)": {
+        "Power Heavy": 460.0, "Power Light": 10.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 11.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Air Source Heat Pump (High Annual)": {
+        "Power Heavy": 910.0, "Power Light": 10.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 11.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Air Source Heat Pump (Winter -3 to 0 C)": {
+        "Power Heavy": 2500.0, "Power Light": 10.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 11.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 4.0
+    },
+    "Air Source Heat Pump (Winter 0 to 7 C)": {
+        "Power Heavy": 1500.0, "Power Light": 10.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 11.0, "Hours Low": 1.0,
+        "Days": 7.0, "Weeks": 8.0
+    },
+    "Sky Q box": {
+        "Power Heavy": 21.0, "Power Light": 17.0,
+        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
+        "Hours Peak": 5.0, "Hours Low": 19.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Sky Q mini": {
+        "Power Heavy": 11.0, "Power Light": 4.0,
+        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
+        "Hours Peak": 5.0, "Hours Low": 19.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Sky Stream Puck": {
+        "Power Heavy": 4.0, "Power Light": 0.5,
+        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
+        "Hours Peak": 5.0, "Hours Low": 19.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Virgin Media 360 Box": {
+        "Power Heavy": 12.0, "Power Light": 1.6,
+        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
+        "Hours Peak": 5.0, "Hours Low": 19.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Apple TV": {
+        "Power Heavy": 5.0, "Power Light": 0.5,
+        "Alloc Heavy": 40.0, "Alloc Light": 60.0,
+        "Hours Peak": 4.0, "Hours Low": 20.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Induction Hob": {
+        "Power Heavy": 2000.0, "Power Light": 0.0,
+        "Alloc Heavy": 100.0, "Alloc Light": 0.0,
+        "Hours Peak": 0.5, "Hours Low": 0.0,
+        "Days": 7.0, "Weeks": 52.0
+    },
+    "Electric Oven (Fan)": {
+        "Power Heavy": 2500.0, "Power Light": 0.0,
+        "Alloc Heavy": 30.0, "Alloc Light": 70.0,
+        "Hours Peak": 0.7, "Hours Low": 0.0,
+        "Days": 5.0, "Weeks": 52.0
+    },
+    "Electric Oven (Conventional)": {
+        "Power Heavy": 2500.0, "Power Light": 0.0,
+        "Alloc Heavy": 45.0, "Alloc Light": 55.0,
+        "Hours Peak": 0.8, "Hours Low": 0,
+        "Days": 5.0, "Weeks": 52.0
+    },
+    "Washing Machine": {
+        "Power Heavy": 2000.0, "Power Light": 200.0,
+        "Alloc Heavy": 20.0, "Alloc Light": 80.0,
+        "Hours Peak": 0.5, "Hours Low": 0.5,
+        "Days": 3.0, "Weeks": 52.0
+    },
+    "Tumble Dryer": {
+        "Power Heavy": 2500.0, "Power Light": 200.0,
+        "Alloc Heavy": 90.0, "Alloc Light": 10.0,
+        "Hours Peak": 1.0, "Hours Low": 0.0,
+        "Days": 3.0, "Weeks": 40.0
+    },
+    "Dishwasher": {
+        "Power Heavy": 1800.0, "Power Light": 100.0,
+        "Alloc Heavy": 30.0, "Alloc Light": 70.0,
+        "Hours Peak": 0.0, "Hours Low": 1.5,
+        "Days": 5.0, "Weeks": 52.0
+    }
+}
+
+# Selector order: alphabetical, with "Other" last
+DEVICE_TYPES = sorted(k for k in DEVICE_DEFAULTS if k != "Other") + ["Other"]
+
+# Optional per-device column naming the row's profile
+TYPE_COLUMN = "Device Type"
+
+
+def device_types(devices_df):
+    """Profile of each row: its Device Type where set, else the default profile its name matches, else "Other"."""
+    if TYPE_COLUMN in devices_df.columns:
+        types = devices_df[TYPE_COLUMN].astype(object).where(devices_df[TYPE_COLUMN].notna(), None).tolist()
+    else:
+        types = [None] * len(devices_df)
+    names = devices_df["Name"].astype(str).str.strip().tolist()
+    return [str(t) if t else (name if name in DEVICE_DEFAULTS else "Other") for t, name in zip(types, names)]
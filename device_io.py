@@ -0,0 +1,166 @@
+import gzip
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import COLUMN_DEFAULTS, INPUT_COLUMNS, parse_include
+
+# Rates used when a saved list does not carry its own
+DEFAULT_RATE_PEAK = 0.2361
+DEFAULT_RATE_LOW = 0.07
+
+RATE_COLUMNS = ["Rate Peak", "Rate Low"]
+REQUIRED_COLUMNS = ["Name", "Power Heavy", "Power Light", "Alloc Heavy", "Alloc Light", "Hours Peak", "Hours Low"]
+
+# Saved list formats, with the file extension and MIME type used for downloads
+SAVE_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+}
+DEVICE_LIST_EXTENSIONS = tuple(ext for ext, _ in SAVE_FORMATS.values())
+
+# Binary formats carry the rates once, as schema metadata, instead of a column per row
+RATES_METADATA_KEY = b"energy_cost_calculator.rates"
+
+# Rows serialized at a time when writing CSV
+CHUNK_ROWS = 10_000
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_MAGIC = b"ARROW1"
+
+
+def split_rates(loaded_df):
+    """Strip the embedded rate columns from a saved list.
+
+    Returns (devices_df, rates) where rates is (peak, low) taken from the
+    first row, or None if the file has no rate columns.
+    """
+    if all(col in loaded_df.columns for col in RATE_COLUMNS):
+        rates = (float(loaded_df["Rate Peak"].iloc[0]), float(loaded_df["Rate Low"].iloc[0]))
+        return loaded_df.drop(columns=RATE_COLUMNS), rates
+    return loaded_df, None
+
+
+def apply_column_defaults(devices_df):
+    # Fill columns that older saved lists do not have
+    for col, default in COLUMN_DEFAULTS.items():
+        if col not in devices_df.columns:
+            devices_df[col] = default
+    return devices_df
+
+
+def detect_format(head):
+    # Parquet and Arrow IPC files start with a magic number; anything else is read as CSV
+    if head.startswith(_PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(_ARROW_MAGIC):
+        return "arrow"
+    return "csv"
+
+
+def _typed_columns(devices_df):
+    # Numeric columns as float64 (Count as int64 when whole), Include as bool, Name as string
+    typed = devices_df.copy()
+    for col in INPUT_COLUMNS:
+        if col in typed.columns:
+            typed[col] = pd.to_numeric(typed[col], errors="coerce").astype(np.float64)
+    if "Count" in typed.columns and typed["Count"].notna().all() and (typed["Count"] % 1 == 0).all():
+        typed["Count"] = typed["Count"].astype(np.int64)
+    if "Include" in typed.columns:
+        typed["Include"] = parse_include(typed["Include"])
+    if "Name" in typed.columns:
+        typed["Name"] = typed["Name"].astype("string")
+    return typed
+
+
+def write_devices(devices_df, rate_peak, rate_low, sink, fmt="csv", chunk_rows=CHUNK_ROWS):
+    """Write the device list to a binary file-like sink in one of SAVE_FORMATS.
+
+    CSV repeats the rates on every row, as older versions expect, and is
+    written chunk_rows rows at a time so only one chunk is ever copied;
+    Parquet and Arrow store the rates once in the schema metadata.
+    """
+    if fmt == "csv":
+        for start in range(0, max(len(devices_df), 1), chunk_rows):
+            chunk = devices_df.iloc[start:start + chunk_rows].assign(**{"Rate Peak": rate_peak, "Rate Low": rate_low})
+            sink.write(chunk.to_csv(index=False, header=start == 0).encode("utf-8"))
+        return
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(_typed_columns(devices_df.drop(columns=RATE_COLUMNS, errors="ignore")),
+                                 preserve_index=False)
+    rates = json.dumps({"Rate Peak": float(rate_peak), "Rate Low": float(rate_low)}).encode("utf-8")
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), RATES_METADATA_KEY: rates})
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, row_group_size=chunk_rows)
+    elif fmt == "arrow":
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=chunk_rows)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def serialize_devices(devices_df, rate_peak, rate_low, fmt="csv"):
+    """The device list as file bytes in one of SAVE_FORMATS (see write_devices)."""
+    sink = io.BytesIO()
+    write_devices(devices_df, rate_peak, rate_low, sink, fmt)
+    return sink.getvalue()
+
+
+def read_devices(source):
+    """Read a saved list in any of SAVE_FORMATS, detected from the file content.
+
+    source is a path, bytes or a binary file-like object, optionally
+    gzip-compressed. Returns (devices_df, rates) as split_rates does.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    elif hasattr(source, "read"):
+        data = source.read()
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    if data.startswith(_GZIP_MAGIC):
+        data = gzip.decompress(data)
+
+    fmt = detect_format(data[:8])
+    if fmt == "csv":
+        return split_rates(pd.read_csv(io.BytesIO(data)))
+
+    import pyarrow as pa
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(pa.BufferReader(data))
+    else:
+        table = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    devices_df = table.to_pandas()
+    if "Name" in devices_df.columns:
+        devices_df["Name"] = devices_df["Name"].astype(object)
+    metadata = table.schema.metadata or {}
+    if RATES_METADATA_KEY in metadata:
+        stored = json.loads(metadata[RATES_METADATA_KEY])
+        return devices_df.drop(columns=RATE_COLUMNS, errors="ignore"), (float(stored["Rate Peak"]), float(stored["Rate Low"]))
+    return split_rates(devices_df)
+
+
+def read_device_list(source, rate_peak=DEFAULT_RATE_PEAK, rate_low=DEFAULT_RATE_LOW):
+    """Read a list saved by "Save List", in CSV, Parquet or Arrow format.
+
+    Returns (devices_df, rate_peak, rate_low); the given rates are only used
+    when the file does not embed its own. Raises ValueError if device columns
+    are missing.
+    """
+    devices_df, rates = read_devices(source)
+    missing = [col for col in REQUIRED_COLUMNS if col not in devices_df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if rates is not None:
+        rate_peak, rate_low = rates
+    return apply_column_defaults(devices_df), rate_peak, rate_low
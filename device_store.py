@@ -0,0 +1,91 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import parse_include
+from device_io import apply_column_defaults
+
+# Whole-number columns narrowed when every value fits; the editor keeps Days and Weeks within these bounds
+SMALL_INT_COLUMNS = {"Days": np.int8, "Weeks": np.int8, "Count": np.int32}
+MAX_COUNT = np.iinfo(np.int32).max
+
+
+def _python_strings(dtype):
+    # Columns whose cells are separate Python strings: object, or a string dtype with Python storage.
+    # pandas 3 reads text into Arrow-backed strings, which already hold every name in one buffer.
+    return dtype == object or (isinstance(dtype, pd.StringDtype) and dtype.storage == "python")
+
+
+def compact_devices(devices_df):
+    """Narrow a device list's dtypes without changing any value.
+
+    Whole-number Days, Weeks and Count become small integers and Include
+    becomes bool, with text such as "no" read by parse_include. Power, allocation and hours stay float64: a float32 column
+    would round values typed into the editor and change the prices. Names held
+    as Python strings (object or Python-backed string columns) are interned,
+    so a name repeated down the list (or across sessions) is stored once;
+    Arrow-backed string columns are left as they are.
+    """
+    for col, dtype in SMALL_INT_COLUMNS.items():
+        if col not in devices_df.columns or devices_df[col].dtype == dtype:
+            continue
+        values = pd.to_numeric(devices_df[col], errors="coerce").to_numpy(dtype=np.float64)
+        info = np.iinfo(dtype)
+        if np.isfinite(values).all() and (values % 1 == 0).all() and (values >= info.min).all() and (values <= info.max).all():
+            devices_df[col] = values.astype(dtype)
+    if "Include" in devices_df.columns and devices_df["Include"].dtype != bool:
+        devices_df["Include"] = parse_include(devices_df["Include"])
+    if "Name" in devices_df.columns and _python_strings(devices_df["Name"].dtype):
+        names = [sys.intern(name) if isinstance(name, str) else name for name in devices_df["Name"]]
+        # Built with the column's own dtype, which a plain list would not keep
+        devices_df["Name"] = pd.Series(names, index=devices_df.index, dtype=devices_df["Name"].dtype)
+    return devices_df
+
+
+class DeviceStore:
+    """The session's device list, held as one versioned DataFrame.
+
+    `base` is the committed list that is handed to the data editor. It only
+    changes (and `version` only increases) when devices are added or a list
+    is loaded, so the editor keeps its identity while the user edits and its
+    deltas accumulate against the same base. `current` is the latest edited
+    list and `dirty` says whether it differs from `base`; an edit therefore
+    never needs a second script run to be committed.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.base = pd.DataFrame()
+        self.current = self.base
+        self.dirty = False
+        self._editor_frame = None
+
+    def __len__(self):
+        return len(self.current)
+
+    def replace(self, devices_df):
+        # A new base invalidates the editor, so pending edits must already be folded in
+        self.base = compact_devices(apply_column_defaults(devices_df.reset_index(drop=True)))
+        self.current = self.base
+        self.dirty = False
+        self.version += 1
+        self._editor_frame = None
+
+    def append(self, record):
+        if self.current.empty:
+            self.replace(pd.DataFrame([record]))
+        else:
+            self.replace(pd.concat([self.current, pd.DataFrame([record])], ignore_index=True))
+
+    def editor_frame(self, prepare):
+        # Built once per version; prepare adds the editor-only columns to a shallow copy of base,
+        # which shares base's column data rather than duplicating it
+        if self._editor_frame is None:
+            self._editor_frame = prepare(self.base.copy(deep=False))
+        return self._editor_frame
+
+    def update(self, storage_df, dirty):
+        # Record the editor's output; base is left alone so the editor's deltas stay valid
+        self.current = storage_df if dirty else self.base
+        self.dirty = dirty
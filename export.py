@@ -0,0 +1,104 @@
+"""Downloads built only when the user asks for them.
+
+Each export is a zero-argument callable for st.download_button, so nothing is
+serialized while the page reruns; on click the file is written chunk by chunk
+into a spooled temporary file, optionally through gzip, and its bytes are
+handed to Streamlit to send (download_button does not accept file objects
+other than in-memory buffers).
+"""
+import gzip
+import tempfile
+
+import pandas as pd
+
+from device_io import CHUNK_ROWS, SAVE_FORMATS, write_devices
+
+# Exports larger than this spill from memory to a temporary file on disk
+SPOOL_BYTES = 8 * 1024 * 1024
+
+GZIP_MIME = "application/gzip"
+
+
+def export_file(write, compress=False):
+    """Run write(sink) into a spooled temporary file and return what was written as bytes."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    if compress:
+        # mtime=0 keeps the bytes the same for the same list
+        with gzip.GzipFile(fileobj=spool, mode="wb", mtime=0) as sink:
+            write(sink)
+    else:
+        write(spool)
+    spool.seek(0)
+    with spool:
+        return spool.read()
+
+
+def download_name(stem, extension, mime, compress=False):
+    # (file name, MIME type) for a download, with .gz added when compressed
+    if compress:
+        return stem + extension + ".gz", GZIP_MIME
+    return stem + extension, mime
+
+
+def write_cost_report(report_df, totals, sink, chunk_rows=CHUNK_ROWS):
+    """The Cost Breakdown table as CSV, chunk_rows rows at a time, followed by one row per total.
+
+    totals maps a label, placed in the Name column, to a {column: value} dict
+    of the cost columns it fills.
+    """
+    for start in range(0, max(len(report_df), 1), chunk_rows):
+        chunk = report_df.iloc[start:start + chunk_rows]
+        sink.write(chunk.to_csv(index_label="Row", header=start == 0).encode("utf-8"))
+    # Totals rows have no row number and leave the device columns blank
+    totals_df = pd.DataFrame([{"Name": label, **values} for label, values in totals.items()],
+                             columns=report_df.columns, index=[""] * len(totals))
+    sink.write(totals_df.to_csv(header=False).encode("utf-8"))
+
+
+def device_list_export(devices_df, rate_peak, rate_low, fmt="csv", compress=False):
+    """(callable, file name, MIME type) for the device list download."""
+    extension, mime = SAVE_FORMATS[fmt]
+    file_name, mime = download_name("devices", extension, mime, compress)
+    return (lambda: export_file(lambda sink: write_devices(devices_df, rate_peak, rate_low, sink, fmt), compress),
+            file_name, mime)
+
+
+def cost_report_export(report_df, totals, compress=False):
+    """(callable, file name, MIME type) for the cost report download."""
+    file_name, mime = download_name("cost_report", ".csv", "text/csv", compress)
+    return lambda: export_file(lambda sink: write_cost_report(report_df, totals, sink), compress), file_name, mime
+
+
+def check_exports():
+    """Push every export of a default household through Streamlit's download conversion.
+
+    Raises if Streamlit would refuse what a callable returns, or if a saved
+    list does not load back with the same rows. Run as `python export.py`.
+    """
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+    from cost_engine import compute_costs
+    from device_defaults import DEVICE_DEFAULTS
+    from device_io import DEFAULT_RATE_LOW, DEFAULT_RATE_PEAK, read_devices
+
+    devices_df = pd.DataFrame.from_dict(DEVICE_DEFAULTS, orient="index").rename_axis("Name").reset_index()
+    report_df = pd.concat([devices_df, compute_costs(devices_df, DEFAULT_RATE_PEAK, DEFAULT_RATE_LOW)], axis=1)
+    totals = {"Total": {"Annual Cost": float(report_df["Annual Cost"].sum())}}
+    checked = []
+    for compress in (False, True):
+        exports = [device_list_export(devices_df, DEFAULT_RATE_PEAK, DEFAULT_RATE_LOW, fmt, compress)
+                   for fmt in SAVE_FORMATS]
+        exports.append(cost_report_export(report_df, totals, compress))
+        for build, file_name, _ in exports:
+            data, _ = convert_data_to_bytes_and_infer_mime(build(), TypeError(f"{file_name}: unsupported data"))
+            if file_name.startswith("devices"):
+                loaded_df, _ = read_devices(data)
+                if len(loaded_df) != len(devices_df):
+                    raise ValueError(f"{file_name}: loaded {len(loaded_df)} of {len(devices_df)} rows")
+            checked.append((file_name, len(data)))
+    return checked
+
+
+if __name__ == "__main__":
+    for name, size in check_exports():
+        print(f"{name}: {size:,} bytes")
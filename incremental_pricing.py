@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+from cost_engine import COST_COLUMNS, INPUT_COLUMNS, included_mask, numeric_column, price_rows
+
+
+class PricedDevices:
+    """Costs for one version of the device list.
+
+    costs has one row per device with the COST_COLUMNS in order; totals holds
+    the raw (unrounded) sums of those columns over included devices.
+    """
+
+    def __init__(self, costs, included, totals, rates):
+        self.costs = costs
+        self.included = included
+        self.totals = totals
+        self.rates = rates
+
+    def __len__(self):
+        return len(self.costs)
+
+    def cost_df(self, index):
+        # A view of costs, which is never modified in place once priced
+        return pd.DataFrame(self.costs, index=index, columns=COST_COLUMNS, copy=False)
+
+    def totals_dict(self):
+        return dict(zip(COST_COLUMNS, self.totals))
+
+
+def has_row_changes(editor_state):
+    return bool(editor_state) and any(
+        editor_state.get(field) for field in ("edited_rows", "added_rows", "deleted_rows")
+    )
+
+
+def _edit_positions(editor_state, n):
+    # Edited rows that survive deletion (positions before and after deleting), deleted rows, added row count
+    edited = sorted(int(pos) for pos in (editor_state.get("edited_rows") or {}) if int(pos) < n)
+    deleted = np.array(sorted(set(int(pos) for pos in editor_state.get("deleted_rows") or [] if int(pos) < n)), dtype=np.intp)
+    deleted_set = set(deleted.tolist())
+    edited = np.array([pos for pos in edited if pos not in deleted_set], dtype=np.intp)
+    new_pos = edited - np.searchsorted(deleted, edited)
+    return edited, new_pos, deleted, len(editor_state.get("added_rows") or [])
+
+
+def changed_positions(editor_state, n):
+    """Positions in the edited frame of rows the editor changed or added, given a base of n rows."""
+    if not has_row_changes(editor_state):
+        return np.empty(0, dtype=np.intp)
+    _, new_pos, deleted, n_added = _edit_positions(editor_state, n)
+    start = n - len(deleted)
+    return np.concatenate([new_pos, np.arange(start, start + n_added)])
+
+
+def _row_keys(devices_df, positions, rates):
+    # A row's result depends only on its numeric pricing inputs and the rates; the key packs
+    # them into one bytes object, a fraction of the size of a tuple of Python floats
+    values = np.column_stack([numeric_column(devices_df, col, positions) for col in INPUT_COLUMNS])
+    prefix = np.asarray(rates, dtype=np.float64).tobytes()
+    return [prefix + row.tobytes() for row in values]
+
+
+class IncrementalPricer:
+    """Re-prices only the rows a data_editor edit touched.
+
+    The pricer keeps the costs of the committed device list (identified by a
+    version number) and, given the editor's edited/added/deleted row deltas,
+    derives the costs of the edited list from it. Only changed rows are priced,
+    and the totals are adjusted by the difference. Results for individual rows
+    are also cached on the row's inputs plus the rates, so flipping a value
+    back and forth does not price it again.
+    """
+
+    def __init__(self, max_cache_size=100_000):
+        self.max_cache_size = max_cache_size
+        self._base = None
+        self._base_version = None
+        self._cache = {}
+
+    def _full(self, devices_df, rates):
+        costs = price_rows(devices_df, *rates)
+        included = included_mask(devices_df)
+        return PricedDevices(costs, included, costs[included].sum(axis=0), rates)
+
+    def _lookup(self, devices_df, positions, rates):
+        # Cached results where available; misses priced together in one vectorized pass
+        keys = _row_keys(devices_df, positions, rates)
+        costs = np.empty((len(positions), len(COST_COLUMNS)))
+        missing = []
+        for i, key in enumerate(keys):
+            hit = self._cache.get(key)
+            if hit is None:
+                missing.append(i)
+            else:
+                costs[i] = hit
+        if missing:
+            priced = price_rows(devices_df, *rates, positions=positions[missing])
+            costs[missing] = priced
+            if len(self._cache) + len(missing) > self.max_cache_size:
+                self._cache.clear()
+            for i, row_costs in zip(missing, priced):
+                self._cache[keys[i]] = row_costs
+        return costs
+
+    def _apply(self, base, devices_df, editor_state):
+        # Mirrors Streamlit's own order: cell edits, then deletions, then additions
+        n = len(base)
+        edited, new_pos, deleted, n_added = _edit_positions(editor_state, n)
+        if n - len(deleted) + n_added != len(devices_df):
+            return None
+
+        costs = base.costs.copy()
+        included = base.included.copy()
+        totals = base.totals.copy()
+
+        # Take deleted rows out of the totals
+        gone = deleted[base.included[deleted]] if len(deleted) else deleted
+        totals -= costs[gone].sum(axis=0)
+
+        if len(edited):
+            new_costs = self._lookup(devices_df, new_pos, base.rates)
+            new_included = included_mask(devices_df, new_pos)
+            totals -= costs[edited][included[edited]].sum(axis=0)
+            totals += new_costs[new_included].sum(axis=0)
+            costs[edited] = new_costs
+            included[edited] = new_included
+
+        if len(deleted):
+            costs = np.delete(costs, deleted, axis=0)
+            included = np.delete(included, deleted)
+
+        if n_added:
+            new_pos = np.arange(len(costs), len(devices_df))
+            new_costs = self._lookup(devices_df, new_pos, base.rates)
+            new_included = included_mask(devices_df, new_pos)
+            totals += new_costs[new_included].sum(axis=0)
+            costs = np.concatenate([costs, new_costs])
+            included = np.concatenate([included, new_included])
+
+        return PricedDevices(costs, included, totals, base.rates)
+
+    def price(self, devices_df, rate_peak, rate_low, version, editor_state=None, base_df=None):
+        """Costs for devices_df, which is the committed list `version` with editor_state applied.
+
+        base_df is that committed list; when given, a stale base (new version or
+        new rates) is re-priced from it so that pending edits still apply
+        incrementally on later reruns.
+        """
+        rates = (float(rate_peak), float(rate_low))
+        base = self._base
+        if base is None or self._base_version != version or base.rates != rates:
+            base = None
+
+        has_edits = has_row_changes(editor_state)
+        if base is None and has_edits and base_df is not None:
+            base = self._full(base_df, rates)
+            self.commit(base, version)
+
+        if base is not None and has_edits:
+            priced = self._apply(base, devices_df, editor_state)
+            if priced is not None:
+                return priced
+        elif base is not None and len(base) == len(devices_df):
+            return base
+
+        # No usable base: price everything and make it the base for this version
+        priced = self._full(devices_df, rates)
+        if not has_edits:
+            self.commit(priced, version)
+        return priced
+
+    def commit(self, priced, version):
+        # priced holds the costs of the committed list `version`
+        self._base = priced
+        self._base_version = version
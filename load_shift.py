@@ -0,0 +1,130 @@
+"""Cheapest split of each device's hours between peak and off-peak.
+
+Each device keeps its total daily hours (capped at 24) and may move them
+between bands subject to a minimum peak share and, optionally, the length of
+the off-peak window. Cost is linear in the hours, so the optimum puts as many
+hours as the constraints allow into the cheaper band; that vertex is found for
+every device at once, and a portfolio of households is solved as one batch.
+"""
+import numpy as np
+import pandas as pd
+
+from cost_engine import DAYS_PER_YEAR, included_mask, numeric_column, unit_profile
+
+HOURS_PER_DAY = 24.0
+
+# Optional per-device column overriding the minimum peak share (0-1)
+MIN_PEAK_SHARE_COLUMN = "Min Peak Share"
+
+SHIFT_COLUMNS = [
+    "Name", "Hours Peak", "Hours Low", "New Hours Peak", "New Hours Low",
+    "Annual Cost", "New Annual Cost", "Annual Saving",
+]
+
+
+def optimal_hours(hours_peak, hours_low, rate_peak, rate_low, min_peak_share=0.0, off_peak_hours=None):
+    """Peak and off-peak hours that minimise cost for each device.
+
+    All arguments broadcast, so rates and shares may be per device. Total hours
+    are kept (capped at 24); at least min_peak_share of them stay at peak; with
+    off_peak_hours given, off-peak hours fit inside that window and peak hours
+    in the rest of the day. Equal rates keep the current split, clipped to the
+    constraints. Rows with missing hours are returned unchanged. A device whose
+    current split breaks the window limit is moved inside it, which can cost more.
+    """
+    hours_peak = np.asarray(hours_peak, dtype=np.float64)
+    hours_low = np.asarray(hours_low, dtype=np.float64)
+    rate_peak = np.asarray(rate_peak, dtype=np.float64)
+    rate_low = np.asarray(rate_low, dtype=np.float64)
+    share = np.clip(np.asarray(min_peak_share, dtype=np.float64), 0.0, 1.0)
+
+    total = np.minimum(hours_peak + hours_low, HOURS_PER_DAY)
+    if off_peak_hours is None:
+        low_cap, peak_cap = HOURS_PER_DAY, HOURS_PER_DAY
+    else:
+        low_cap = np.clip(np.asarray(off_peak_hours, dtype=np.float64), 0.0, HOURS_PER_DAY)
+        peak_cap = HOURS_PER_DAY - low_cap
+
+    # Feasible peak hours lie in [lo, hi]; if the share forces more than the cap, the share wins
+    lo = np.maximum(share * total, total - low_cap)
+    hi = np.maximum(np.minimum(total, peak_cap), lo)
+
+    new_peak = np.where(rate_low < rate_peak, lo, np.where(rate_low > rate_peak, hi, np.clip(hours_peak, lo, hi)))
+    bad = ~(np.isfinite(new_peak) & np.isfinite(total))
+    new_peak = np.where(bad, hours_peak, new_peak)
+    new_low = np.where(bad, hours_low, total - new_peak)
+    return new_peak, new_low
+
+
+def _energy_per_hour(devices_df):
+    # Daily kWh drawn per raw hour of use, after frequency scaling and count
+    avg_kw, _, _, count = unit_profile(devices_df)
+    scaling = (numeric_column(devices_df, "Days") / 7.0) * (numeric_column(devices_df, "Weeks") / 52.0)
+    kw = avg_kw * scaling * count
+    return np.where(np.isfinite(kw), kw, 0.0)
+
+
+def _min_peak_share(devices_df, default):
+    if MIN_PEAK_SHARE_COLUMN not in devices_df.columns:
+        return np.full(len(devices_df), float(default))
+    share = numeric_column(devices_df, MIN_PEAK_SHARE_COLUMN)
+    return np.where(np.isfinite(share), share, float(default))
+
+
+def shift_load(devices_df, rate_peak, rate_low, min_peak_share=0.0, off_peak_hours=None):
+    """Per-device optimal hours and annual saving, on devices_df's index.
+
+    rate_peak and rate_low may be scalars or per-row arrays. A "Min Peak Share"
+    column, where present, overrides min_peak_share row by row.
+    """
+    hours_peak = numeric_column(devices_df, "Hours Peak")
+    hours_low = numeric_column(devices_df, "Hours Low")
+    new_peak, new_low = optimal_hours(hours_peak, hours_low, rate_peak, rate_low,
+                                      _min_peak_share(devices_df, min_peak_share), off_peak_hours)
+
+    kw = _energy_per_hour(devices_df)
+    rate_peak = np.asarray(rate_peak, dtype=np.float64)
+    rate_low = np.asarray(rate_low, dtype=np.float64)
+    before = kw * (np.nan_to_num(hours_peak) * rate_peak + np.nan_to_num(hours_low) * rate_low) * DAYS_PER_YEAR
+    after = kw * (np.nan_to_num(new_peak) * rate_peak + np.nan_to_num(new_low) * rate_low) * DAYS_PER_YEAR
+
+    names = devices_df["Name"] if "Name" in devices_df.columns else pd.Series("", index=devices_df.index)
+    return pd.DataFrame({
+        "Name": names.to_numpy(),
+        "Hours Peak": hours_peak,
+        "Hours Low": hours_low,
+        "New Hours Peak": new_peak,
+        "New Hours Low": new_low,
+        "Annual Cost": before,
+        "New Annual Cost": after,
+        "Annual Saving": before - after,
+    }, index=devices_df.index, columns=SHIFT_COLUMNS)
+
+
+def shift_portfolio(households, min_peak_share=0.0, off_peak_hours=None):
+    """Optimise many households in one batch.
+
+    households maps a household name to (devices_df, rate_peak, rate_low).
+    Returns (devices, summary): every device with a "Household" column, and one
+    row per household with its included annual cost before and after shifting.
+    """
+    frames, peaks, lows = [], [], []
+    for name, (devices_df, rate_peak, rate_low) in households.items():
+        frame = devices_df.reset_index(drop=True)
+        frame.insert(0, "Household", name)
+        frames.append(frame)
+        peaks.append(np.full(len(frame), float(rate_peak)))
+        lows.append(np.full(len(frame), float(rate_low)))
+    if not frames:
+        empty = pd.DataFrame(columns=["Household"] + SHIFT_COLUMNS)
+        return empty, pd.DataFrame(columns=["Household", "Annual Cost", "New Annual Cost", "Annual Saving"])
+
+    combined = pd.concat(frames, ignore_index=True)
+    devices = shift_load(combined, np.concatenate(peaks), np.concatenate(lows), min_peak_share, off_peak_hours)
+    devices.insert(0, "Household", combined["Household"].to_numpy())
+    summary = (devices[included_mask(combined)]
+               .groupby("Household", sort=False)[["Annual Cost", "New Annual Cost", "Annual Saving"]]
+               .sum()
+               .reindex(list(households), fill_value=0.0)
+               .reset_index())
+    return devices, summary
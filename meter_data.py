@@ -0,0 +1,286 @@
+"""Half-hourly smart meter readings: ingestion, on-disk storage and pricing.
+
+Meter CSV exports (one row per meter per half-hour) are read in chunks into a
+MeterStore: a directory holding a float32 memory-mapped matrix with one row
+per meter and one column per half-hour of the year, plus a small JSON index.
+Pricing walks the matrix a block of meters at a time, so the full data set is
+never loaded into memory.
+
+    python meter_data.py ingest store/ exports/*.csv --start 2025-01-01
+    python meter_data.py price store/ -o meter_costs.csv
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from batch_price import expand_inputs
+from device_io import DEFAULT_RATE_LOW, DEFAULT_RATE_PEAK
+from tou_tariff import (DEFAULT_OFF_PEAK_END, DEFAULT_OFF_PEAK_START, SLOTS_PER_DAY, read_slot_prices,
+                        two_band_prices, window_mask)
+
+DAYS_PER_STORE = 365
+
+# Column names in the meter exports
+METER_COLUMN = "Meter"
+TIME_COLUMN = "Start"
+KWH_COLUMN = "Consumption (kWh)"
+
+# Stamps with a UTC offset are moved to this zone's wall-clock time, which the tariff slots follow
+LOCAL_TIMEZONE = "Europe/London"
+
+_READINGS_FILE = "readings.f32"
+_INDEX_FILE = "meters.json"
+
+
+def parse_stamps(values, timezone=LOCAL_TIMEZONE):
+    """Reading start times as naive local wall-clock times (NaT where unreadable).
+
+    Stamps ending in Z or a +hh:mm offset may mix GMT and BST; they are read
+    as instants and converted to local time. Stamps without an offset are
+    taken to be local time already.
+    """
+    values = pd.Series(values)
+    aware = values.astype(str).str.contains(r"(?:Z|[+-]\d{2}:?\d{2})$", regex=True)
+    naive = pd.to_datetime(values.where(~aware), errors="coerce")
+    if not aware.any():
+        return naive
+    local = pd.to_datetime(values.where(aware), errors="coerce", utc=True).dt.tz_convert(timezone)
+    return naive.where(~aware, local.dt.tz_localize(None))
+
+
+def _parse_chunk(chunk, start, days, meter_col, time_col, kwh_col):
+    # Meter ids, slot-of-year positions and kWh for the readings that fall inside the store's year
+    stamps = parse_stamps(chunk[time_col])
+    kwh = pd.to_numeric(chunk[kwh_col], errors="coerce").to_numpy(dtype=np.float32)
+    day = (stamps.dt.normalize() - pd.Timestamp(start)).dt.days.to_numpy()
+    slot = ((stamps.dt.hour * 60 + stamps.dt.minute) // (1440 // SLOTS_PER_DAY)).to_numpy()
+    valid = stamps.notna().to_numpy() & np.isfinite(kwh) & (day >= 0) & (day < days)
+    position = day[valid].astype(np.int64) * SLOTS_PER_DAY + slot[valid].astype(np.int64)
+    return chunk[meter_col].astype(str).to_numpy()[valid], position, kwh[valid]
+
+
+class MeterStore:
+    """Half-hourly readings for many meters, memory-mapped from disk.
+
+    Row i of `readings` holds meter `meters[i]`; column d * 48 + s is slot s
+    of day d counted from `start`. Slots without a reading are NaN.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, _INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+        self.start = date.fromisoformat(index["start"])
+        self.days = index["days"]
+        self.meters = index["meters"]
+        self.capacity = index["capacity"]
+        self._rows = {meter: i for i, meter in enumerate(self.meters)}
+
+    @classmethod
+    def create(cls, path, start, days=DAYS_PER_STORE):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, _INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({"start": start.isoformat(), "days": days, "meters": [], "capacity": 0}, f)
+        open(os.path.join(path, _READINGS_FILE), "wb").close()
+        return cls(path)
+
+    @property
+    def slots(self):
+        return self.days * SLOTS_PER_DAY
+
+    def __len__(self):
+        return len(self.meters)
+
+    def _memmap(self, mode, rows=None):
+        rows = self.capacity if rows is None else rows
+        return np.memmap(os.path.join(self.path, _READINGS_FILE), dtype=np.float32, mode=mode,
+                         shape=(rows, self.slots))
+
+    def _save_index(self):
+        with open(os.path.join(self.path, _INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({"start": self.start.isoformat(), "days": self.days,
+                       "meters": self.meters, "capacity": self.capacity}, f)
+
+    def _grow(self, needed):
+        # Extend the file geometrically; new rows start as missing (NaN)
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, 2 * self.capacity, 64)
+        with open(os.path.join(self.path, _READINGS_FILE), "r+b") as f:
+            f.truncate(new_capacity * self.slots * 4)
+        readings = self._memmap("r+", new_capacity)
+        readings[self.capacity:] = np.nan
+        readings.flush()
+        self.capacity = new_capacity
+
+    def ingest_csv(self, source, meter_col=METER_COLUMN, time_col=TIME_COLUMN, kwh_col=KWH_COLUMN,
+                   chunksize=500_000):
+        """Add the readings in a meter CSV export, reading it chunksize rows at a time.
+
+        New meters are appended; a reading for a slot that already has one
+        replaces it. Returns the number of readings stored.
+        """
+        stored = 0
+        for chunk in pd.read_csv(source, chunksize=chunksize, usecols=[meter_col, time_col, kwh_col]):
+            meter_ids, position, kwh = _parse_chunk(chunk, self.start, self.days, meter_col, time_col, kwh_col)
+            for meter in pd.unique(meter_ids):
+                if meter not in self._rows:
+                    self._rows[meter] = len(self.meters)
+                    self.meters.append(meter)
+            self._grow(len(self.meters))
+            rows = np.array([self._rows[m] for m in meter_ids], dtype=np.int64)
+            readings = self._memmap("r+")
+            readings[rows, position] = kwh
+            readings.flush()
+            del readings
+            stored += len(kwh)
+        self._save_index()
+        return stored
+
+    def readings(self):
+        # Read-only view of the stored meters; a new store has an empty file, which cannot be mapped
+        if self.capacity == 0:
+            return np.empty((0, self.slots), dtype=np.float32)
+        return self._memmap("r")[:len(self.meters)]
+
+    def iter_blocks(self, block_size=1024):
+        readings = self.readings()
+        for lo in range(0, len(self.meters), block_size):
+            yield self.meters[lo:lo + block_size], np.asarray(readings[lo:lo + block_size])
+
+
+def slot_totals(readings):
+    """kWh per slot of the day summed over every day, plus the count of missing readings.
+
+    readings is (meters, days * 48); returns ((meters, 48), (meters,)).
+    """
+    by_day = readings.reshape(len(readings), -1, SLOTS_PER_DAY)
+    return np.nansum(by_day, axis=1, dtype=np.float64), np.isnan(by_day).sum(axis=(1, 2))
+
+
+def day_prices(prices):
+    # Slot prices at half-hour resolution; per-minute prices are averaged over each half-hour
+    prices = np.asarray(prices, dtype=np.float64)
+    return prices.reshape(SLOTS_PER_DAY, -1).mean(axis=1)
+
+
+def price_store(store, prices, block_size=1024):
+    """Cost and kWh for every meter in the store against a slot price vector.
+
+    Costs cover the stored days; "Annual Cost" and "Annual kWh" scale them up to
+    a full year from the slots that have readings.
+    """
+    prices = day_prices(prices)
+    frames = []
+    for meters, block in store.iter_blocks(block_size):
+        totals, missing = slot_totals(block)
+        coverage = 1.0 - missing / block.shape[1]
+        kwh = totals.sum(axis=1)
+        cost = totals @ prices
+        scale = np.divide(DAYS_PER_STORE / store.days, coverage, out=np.zeros_like(coverage), where=coverage > 0)
+        frames.append(pd.DataFrame({
+            "Meter": meters,
+            "kWh": kwh,
+            "Cost": cost,
+            "Missing Readings": missing,
+            "Annual kWh": kwh * scale,
+            "Annual Cost": cost * scale,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=["Meter", "kWh", "Cost", "Missing Readings", "Annual kWh", "Annual Cost"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_meter_profile(source, meter_col=METER_COLUMN, time_col=TIME_COLUMN, kwh_col=KWH_COLUMN,
+                       chunksize=500_000):
+    """One household's readings summed into kWh per slot of the day.
+
+    All meters in the file are added together, which suits a single household
+    export. Returns (slot_kwh (48,), days_covered) where days_covered is the
+    number of half-hours with a reading divided by 48.
+    """
+    totals = np.zeros(SLOTS_PER_DAY)
+    seen = set()
+    for chunk in pd.read_csv(source, chunksize=chunksize, usecols=[meter_col, time_col, kwh_col]):
+        # Positions are taken against a far-back start so any date is accepted
+        meter_ids, position, kwh = _parse_chunk(chunk, date(1970, 1, 1), 10**6, meter_col, time_col, kwh_col)
+        np.add.at(totals, position % SLOTS_PER_DAY, kwh)
+        seen.update(position.tolist())
+    return totals, len(seen) / SLOTS_PER_DAY
+
+
+def annual_metered_cost(slot_kwh, days_covered, prices):
+    # Annualised kWh and cost from a household profile
+    if days_covered <= 0:
+        return 0.0, 0.0
+    scale = DAYS_PER_STORE / days_covered
+    return float(slot_kwh.sum() * scale), float(slot_kwh @ day_prices(prices) * scale)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest and price half-hourly smart meter readings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Add meter CSV exports to a store")
+    ingest.add_argument("store", help="Store directory (created if missing)")
+    ingest.add_argument("inputs", nargs="+", help="Meter CSV files, directories or glob patterns")
+    ingest.add_argument("--start", type=date.fromisoformat, help="First day of a new store (YYYY-MM-DD)")
+    ingest.add_argument("--days", type=int, default=DAYS_PER_STORE, help="Days covered by a new store")
+    ingest.add_argument("--meter-column", default=METER_COLUMN)
+    ingest.add_argument("--time-column", default=TIME_COLUMN)
+    ingest.add_argument("--kwh-column", default=KWH_COLUMN)
+    ingest.add_argument("--chunksize", type=int, default=500_000, help="CSV rows read at a time")
+
+    price = commands.add_parser("price", help="Price every meter in a store")
+    price.add_argument("store", help="Store directory")
+    price.add_argument("-o", "--output", required=True, help="CSV file to write")
+    price.add_argument("--rate-peak", type=float, default=DEFAULT_RATE_PEAK)
+    price.add_argument("--rate-low", type=float, default=DEFAULT_RATE_LOW)
+    price.add_argument("--prices", help="Slot price CSV (48 or 1440 rows) instead of the two rates")
+    price.add_argument("--block-size", type=int, default=1024, help="Meters priced at a time")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start_time = time.perf_counter()
+
+    if args.command == "ingest":
+        if os.path.exists(os.path.join(args.store, _INDEX_FILE)):
+            store = MeterStore(args.store)
+        elif args.start is None:
+            print("A new store needs --start.", file=sys.stderr)
+            return 1
+        else:
+            store = MeterStore.create(args.store, args.start, args.days)
+        stored = 0
+        for path in expand_inputs(args.inputs, extensions=(".csv",)):
+            try:
+                stored += store.ingest_csv(path, args.meter_column, args.time_column, args.kwh_column, args.chunksize)
+            except Exception as e:
+                print(f"Skipped {path}: {type(e).__name__}: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - start_time
+        print(f"Stored {stored} readings for {len(store)} meters in {elapsed:.2f}s.", file=sys.stderr)
+        return 0
+
+    store = MeterStore(args.store)
+    if args.prices:
+        prices = read_slot_prices(args.prices)
+    else:
+        prices = two_band_prices(args.rate_peak, args.rate_low,
+                                 window_mask(DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END))
+    result = price_store(store, prices, args.block_size)
+    result.to_csv(args.output, index=False)
+    elapsed = time.perf_counter() - start_time
+    print(f"Priced {len(result)} meters in {elapsed:.2f}s.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Monte Carlo bands (P10/P50/P90) for a household's annual cost.
+
+Power, the heavy-load allocation and hours per day are treated as random
+around the entered values, and every draw has the entered value as its mean,
+so the bands are centred on the deterministic cost:
+
+  - power is scaled by a lognormal factor with mean 1;
+  - the heavy share of the allocation is drawn from a Beta distribution on
+    [0, 1] with the entered share as its mean, the light share taking up the
+    difference;
+  - hours are drawn as the share of the day in use (a Beta on [0, 1], so the
+    day never exceeds 24 hours) and the peak part of it (another Beta).
+
+A bounded share cannot vary more than its distance from the bounds allows, so
+a device entered at 100% heavy load or 24 hours a day keeps that value, and
+spreads near a bound are narrowed rather than clipped.
+
+Samples are drawn in chunks of at most max_elements (samples x devices), each
+from its own seed spawned from the run's seed, so memory stays bounded and the
+result does not depend on how many worker processes are used.
+
+    python monte_carlo.py devices.csv --samples 500000 --workers 4
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DAYS_PER_YEAR, included_mask, numeric_column
+
+PERCENTILES = (10, 50, 90)
+BAND_COLUMNS = [f"P{p}" for p in PERCENTILES]
+
+# Default spread: relative for power and hours, percentage points for allocation
+POWER_SD = 0.15
+ALLOC_SD = 10.0
+HOURS_SD = 0.25
+
+
+class MonteCarloResult:
+    """Percentile bands of simulated annual cost.
+
+    total_bands maps "P10"/"P50"/"P90" to the household's included annual cost;
+    device_bands has one row per device with the same columns, taken from the
+    first device_samples samples.
+    """
+
+    def __init__(self, total_bands, device_bands, n_samples, device_samples):
+        self.total_bands = total_bands
+        self.device_bands = device_bands
+        self.n_samples = n_samples
+        self.device_samples = device_samples
+
+
+def _profile(devices_df):
+    # Per-device inputs as float arrays; rows that cannot be priced contribute nothing
+    def column(name):
+        return numeric_column(devices_df, name)
+
+    profile = {
+        "p_heavy": column("Power Heavy"),
+        "p_light": column("Power Light"),
+        "a_heavy": column("Alloc Heavy"),
+        "a_light": column("Alloc Light"),
+        "h_peak": column("Hours Peak"),
+        "h_low": column("Hours Low"),
+        "factor": (column("Days") / 7.0) * (column("Weeks") / 52.0) * column("Count") * DAYS_PER_YEAR,
+    }
+    bad = ~np.logical_and.reduce([np.isfinite(values) for values in profile.values()])
+    return {name: np.where(bad, 0.0, values) for name, values in profile.items()}
+
+
+def _scale_factor(rng, shape, sd):
+    # Lognormal factor with mean 1 and standard deviation sd
+    sigma = np.sqrt(np.log1p(sd * sd))
+    return np.exp(sigma * rng.standard_normal(shape) - sigma * sigma / 2.0)
+
+
+def _share_draws(rng, shape, mean, sd):
+    """Draws on [0, 1] with the given per-device mean and (at most) standard deviation sd.
+
+    Beta(mean * k, (1 - mean) * k) has variance mean * (1 - mean) / (k + 1); k is
+    floored at 1 where sd is too wide for the bounds. Means at 0 or 1 are returned as is.
+    """
+    mean = np.clip(np.nan_to_num(mean), 0.0, 1.0)
+    sd = np.broadcast_to(sd, mean.shape)
+    inner = (mean > 0.0) & (mean < 1.0) & (sd > 0.0)
+    draws = np.broadcast_to(mean, shape).copy()
+    m, v = mean[inner], sd[inner] ** 2
+    k = np.maximum(m * (1.0 - m) / v - 1.0, 1.0)
+    # Only the devices that can vary are drawn
+    draws[:, inner] = rng.beta(m * k, (1.0 - m) * k, (shape[0], len(m)))
+    return draws
+
+
+def simulate_chunk(profile, rates, n, seed, power_sd=POWER_SD, alloc_sd=ALLOC_SD, hours_sd=HOURS_SD):
+    """Annual cost of every device for n samples: an (n, devices) array."""
+    rng = np.random.default_rng(seed)
+    shape = (n, len(profile["factor"]))
+    rate_peak, rate_low = rates
+
+    power = _scale_factor(rng, shape, power_sd)
+    alloc_total = profile["a_heavy"] + profile["a_light"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        heavy_share = _share_draws(rng, shape, profile["a_heavy"] / alloc_total, alloc_sd / alloc_total)
+    avg_kw = power * alloc_total * (profile["p_heavy"] * heavy_share
+                                    + profile["p_light"] * (1.0 - heavy_share)) / 100_000.0
+    del power, heavy_share
+
+    # Hours as the share of the day in use and the peak part of it; peak and off-peak hours varying
+    # independently by hours_sd give a peak share spread of about sqrt(2) * hours_sd * q * (1 - q)
+    hours = profile["h_peak"] + profile["h_low"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peak_share = np.where(hours > 0, profile["h_peak"] / hours, 0.0)
+    day_share = _share_draws(rng, shape, hours / 24.0, hours_sd * hours / 24.0)
+    peak_share = _share_draws(rng, shape, peak_share, np.sqrt(2.0) * hours_sd * peak_share * (1.0 - peak_share))
+    cost = avg_kw * 24.0 * day_share * (peak_share * rate_peak + (1.0 - peak_share) * rate_low)
+    cost *= profile["factor"]
+    return cost
+
+
+def _run_chunk(args):
+    # Worker entry point: totals for the chunk plus the device samples it is asked to keep
+    profile, rates, n, seed, keep, spreads = args
+    cost = simulate_chunk(profile, rates, n, seed, *spreads)
+    return cost @ profile["included"], cost[:keep].astype(np.float32)
+
+
+def simulate(devices_df, rate_peak, rate_low, n_samples=100_000, seed=0, power_sd=POWER_SD,
+             alloc_sd=ALLOC_SD, hours_sd=HOURS_SD, max_elements=1_000_000, device_samples=20_000,
+             workers=None):
+    """Simulate annual cost and return a MonteCarloResult.
+
+    workers=None runs in this process; a number runs chunks on that many
+    worker processes. Per-device bands use at most device_samples samples,
+    further limited so they fit in max_elements * 10 values.
+    """
+    profile = _profile(devices_df)
+    profile["included"] = included_mask(devices_df).astype(np.float64)
+    n_devices = len(devices_df)
+    rates = (float(rate_peak), float(rate_low))
+    spreads = (power_sd, alloc_sd, hours_sd)
+
+    chunk = max(1, max_elements // max(n_devices, 1))
+    sizes = [min(chunk, n_samples - lo) for lo in range(0, n_samples, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    keep_total = min(n_samples, device_samples, max(1, max_elements * 10 // max(n_devices, 1)))
+    tasks = []
+    kept = 0
+    for size, chunk_seed in zip(sizes, seeds):
+        keep = min(size, keep_total - kept)
+        kept += keep
+        tasks.append((profile, rates, size, chunk_seed, keep, spreads))
+
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_chunk, tasks))
+    else:
+        results = [_run_chunk(task) for task in tasks]
+
+    totals = np.concatenate([total for total, _ in results])
+    device_costs = np.concatenate([costs for _, costs in results])
+    total_bands = dict(zip(BAND_COLUMNS, np.percentile(totals, PERCENTILES)))
+    device_bands = pd.DataFrame(
+        np.percentile(device_costs, PERCENTILES, axis=0).T if len(device_costs) else np.zeros((n_devices, 3)),
+        index=devices_df.index, columns=BAND_COLUMNS,
+    )
+    if "Name" in devices_df.columns:
+        device_bands.insert(0, "Name", devices_df["Name"].to_numpy())
+    return MonteCarloResult(total_bands, device_bands, n_samples, keep_total)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo bands for a saved device list's annual cost.")
+    parser.add_argument("input", help="Saved device list (CSV, Parquet or Arrow)")
+    parser.add_argument("--samples", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: run in-process)")
+    parser.add_argument("--power-sd", type=float, default=POWER_SD, help="Relative spread of power")
+    parser.add_argument("--alloc-sd", type=float, default=ALLOC_SD, help="Spread of the heavy allocation (points)")
+    parser.add_argument("--hours-sd", type=float, default=HOURS_SD, help="Relative spread of hours")
+    parser.add_argument("-o", "--output", help="CSV file for the per-device bands")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from device_io import read_device_list
+    from validation import valid_devices
+
+    args = parse_args(argv)
+    devices_df, rate_peak, rate_low = read_device_list(args.input)
+    devices_df, invalid = valid_devices(devices_df)
+    if invalid:
+        print(f"{invalid} device(s) with invalid values left out.", file=sys.stderr)
+    start = time.perf_counter()
+    result = simulate(devices_df, rate_peak, rate_low, args.samples, args.seed, args.power_sd,
+                      args.alloc_sd, args.hours_sd, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(", ".join(f"{name} £{value:,.2f}" for name, value in result.total_bands.items()))
+    if args.output:
+        result.device_bands.to_csv(args.output, index=False)
+    print(f"Simulated {result.n_samples} samples of {len(devices_df)} devices in {elapsed:.2f}s.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
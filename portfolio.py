@@ -0,0 +1,377 @@
+"""A SQLite library of saved households.
+
+Each household's devices are stored with their rates and priced once on the
+way in, so portfolio-wide questions (cost by device type, the biggest
+consumers, households above a usage threshold) are answered by SQL over
+indexed columns instead of reading every saved list back into pandas:
+
+    python portfolio.py import portfolio.db households/ "archive/*.csv"
+    python portfolio.py by-type portfolio.db
+    python portfolio.py top portfolio.db -n 20 --by kwh
+    python portfolio.py over portfolio.db 5000
+
+A device's type is its "Device Type" column when the list has one, otherwise
+the Add Device profile its name matches, otherwise "Other". Columns of a list
+that have no place in the devices table (Device Type, Season, Start Time, ...)
+are kept with the household, so a list loads back as it was stored.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import DAYS_PER_YEAR, compute_costs, included_mask, numeric_column, parse_include
+from device_defaults import device_types
+from device_io import DEFAULT_RATE_LOW, DEFAULT_RATE_PEAK, read_device_list
+from validation import check_rows, zero_invalid
+
+# Device list column -> devices table column
+DEVICE_COLUMNS = {
+    "Name": "name",
+    "Count": "count",
+    "Power Heavy": "power_heavy",
+    "Power Light": "power_light",
+    "Alloc Heavy": "alloc_heavy",
+    "Alloc Light": "alloc_light",
+    "Hours Peak": "hours_peak",
+    "Hours Low": "hours_low",
+    "Days": "days",
+    "Weeks": "weeks",
+    "Include": "include",
+    "Min Peak Share": "min_peak_share",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS households (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT,
+    rate_peak REAL NOT NULL,
+    rate_low REAL NOT NULL,
+    devices INTEGER NOT NULL,
+    daily_cost REAL NOT NULL,
+    annual_cost REAL NOT NULL,
+    daily_kwh REAL NOT NULL,
+    imported_at TEXT NOT NULL,
+    extra_columns TEXT
+);
+CREATE INDEX IF NOT EXISTS households_daily_kwh ON households (daily_kwh);
+
+CREATE TABLE IF NOT EXISTS devices (
+    household_id INTEGER NOT NULL REFERENCES households (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    device_type TEXT NOT NULL,
+    count REAL,
+    power_heavy REAL,
+    power_light REAL,
+    alloc_heavy REAL,
+    alloc_light REAL,
+    hours_peak REAL,
+    hours_low REAL,
+    days REAL,
+    weeks REAL,
+    include INTEGER NOT NULL,
+    min_peak_share REAL,
+    daily_cost REAL NOT NULL,
+    annual_cost REAL NOT NULL,
+    daily_kwh REAL NOT NULL,
+    PRIMARY KEY (household_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS devices_name ON devices (name);
+-- Covers the by-type totals, so they are summed from the index alone
+CREATE INDEX IF NOT EXISTS devices_type ON devices (device_type, include, count, annual_cost, daily_kwh);
+CREATE INDEX IF NOT EXISTS devices_top_kwh ON devices (daily_kwh DESC) WHERE include = 1;
+CREATE INDEX IF NOT EXISTS devices_top_cost ON devices (annual_cost DESC) WHERE include = 1;
+"""
+
+# Numeric device columns, in devices table order
+NUMERIC_COLUMNS = ["Count", "Power Heavy", "Power Light", "Alloc Heavy", "Alloc Light",
+                   "Hours Peak", "Hours Low", "Days", "Weeks"]
+
+# Added to households after the first release; older databases gain it when opened for writing
+EXTRA_COLUMNS_FIELD = "extra_columns"
+
+# Ranking column for each top_consumers measure
+TOP_MEASURES = {"kwh": "daily_kwh", "cost": "annual_cost"}
+
+
+def _extra_columns(devices_df):
+    # The list's column order and the values of the columns the devices table has no place for, as JSON
+    extra = [col for col in devices_df.columns if col not in DEVICE_COLUMNS]
+    values = {col: devices_df[col].astype(object).where(devices_df[col].notna(), None).tolist() for col in extra}
+    return json.dumps({"columns": [str(col) for col in devices_df.columns], "values": values}, default=str)
+
+
+def _restore_columns(devices_df, stored):
+    # Inverse of _extra_columns: add the kept columns back and restore the list's column order
+    if not stored:
+        return devices_df
+    stored = json.loads(stored)
+    for col, values in stored["values"].items():
+        devices_df[col] = pd.Series(values, index=devices_df.index, dtype=object).infer_objects()
+    return devices_df[[col for col in stored["columns"] if col in devices_df.columns]]
+
+
+def _column(devices_df, name):
+    # A device column as a list of Python values, with NaN stored as NULL
+    values = numeric_column(devices_df, name)
+    cells = values.astype(object)
+    cells[np.isnan(values)] = None
+    return cells.tolist()
+
+
+class PortfolioStore:
+    """A portfolio database; use as a context manager or call close()."""
+
+    def __init__(self, path, read_only=False):
+        """Open (creating if needed) the database at path.
+
+        read_only opens an existing file without writing to it: no schema is
+        created, and a missing file or one that is not a portfolio fails on use.
+        """
+        self.path = path
+        if read_only:
+            self.conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+            return
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        if EXTRA_COLUMNS_FIELD not in self._household_fields():
+            self.conn.execute(f"ALTER TABLE households ADD COLUMN {EXTRA_COLUMNS_FIELD} TEXT")
+            self.conn.commit()
+
+    def _household_fields(self):
+        return {row[1] for row in self.conn.execute("PRAGMA table_info(households)")}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.conn.close()
+
+    def add_household(self, name, devices_df, rate_peak, rate_low, source=None, commit=True, valid=None):
+        """Store (or replace) one household's list, priced at its rates. Returns its id.
+
+        Devices that fail validation (valid, from validation.check_rows, is
+        worked out when not given) are stored as they are but cost nothing, as
+        in the app. Raises ValueError if a device has no name.
+        """
+        if "Name" not in devices_df.columns or devices_df["Name"].isna().any():
+            raise ValueError("Every device needs a name.")
+        if valid is None:
+            valid, _ = check_rows(devices_df)
+        cost_df = zero_invalid(compute_costs(devices_df, rate_peak, rate_low), valid)
+        included = included_mask(devices_df)
+        daily_cost, annual_cost, daily_kwh = (
+            float(cost_df[col].to_numpy()[included & valid].sum()) for col in ("Daily Cost", "Annual Cost", "Daily kWh")
+        )
+        self.conn.execute("DELETE FROM households WHERE name = ?", (name,))
+        household_id = self.conn.execute(
+            "INSERT INTO households (name, source, rate_peak, rate_low, devices, daily_cost, annual_cost, daily_kwh,"
+            " imported_at, extra_columns) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, source, float(rate_peak), float(rate_low), len(devices_df), daily_cost, annual_cost, daily_kwh,
+             datetime.now(timezone.utc).isoformat(timespec="seconds"), _extra_columns(devices_df)),
+        ).lastrowid
+        rows = zip(
+            [household_id] * len(devices_df),
+            range(len(devices_df)),
+            devices_df["Name"].astype(str).tolist(),
+            device_types(devices_df),
+            *(_column(devices_df, col) for col in NUMERIC_COLUMNS),
+            included.astype(int).tolist(),
+            _column(devices_df, "Min Peak Share"),
+            cost_df["Daily Cost"].tolist(),
+            cost_df["Annual Cost"].tolist(),
+            cost_df["Daily kWh"].tolist(),
+        )
+        self.conn.executemany(
+            "INSERT INTO devices (household_id, position, name, device_type, count, power_heavy, power_light,"
+            " alloc_heavy, alloc_light, hours_peak, hours_low, days, weeks, include, min_peak_share, daily_cost,"
+            " annual_cost, daily_kwh) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        if commit:
+            self.conn.commit()
+        return household_id
+
+    def import_files(self, paths, rate_peak=DEFAULT_RATE_PEAK, rate_low=DEFAULT_RATE_LOW):
+        """Add saved lists named after their files, in one transaction.
+
+        Returns (imported, errors, invalid): errors is a list of (path, message)
+        for files that could not be read or stored, invalid a list of (path,
+        devices) for files stored with devices that failed validation.
+        """
+        imported = 0
+        errors = []
+        invalid = []
+        with self.conn:
+            for path in paths:
+                try:
+                    devices_df, file_peak, file_low = read_device_list(path, rate_peak, rate_low)
+                    name = os.path.splitext(os.path.basename(path))[0]
+                    valid, _ = check_rows(devices_df)
+                    self.add_household(name, devices_df, file_peak, file_low, source=path, commit=False, valid=valid)
+                except Exception as e:
+                    errors.append((path, f"{type(e).__name__}: {e}"))
+                    continue
+                imported += 1
+                if not valid.all():
+                    invalid.append((path, int((~valid).sum())))
+        return imported, errors, invalid
+
+    def remove_household(self, name):
+        with self.conn:
+            return self.conn.execute("DELETE FROM households WHERE name = ?", (name,)).rowcount > 0
+
+    def household_names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM households ORDER BY name")]
+
+    def load_household(self, name):
+        """(devices_df, rate_peak, rate_low) for a stored household, as read_device_list returns.
+
+        Raises KeyError if there is no household of that name.
+        """
+        # Databases from before extra columns were kept (opened read-only, so not upgraded) lack the field
+        extra = EXTRA_COLUMNS_FIELD if EXTRA_COLUMNS_FIELD in self._household_fields() else "NULL"
+        row = self.conn.execute(f"SELECT id, rate_peak, rate_low, {extra} FROM households WHERE name = ?",
+                                (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        household_id, rate_peak, rate_low, stored = row
+        columns = ", ".join(DEVICE_COLUMNS.values())
+        devices_df = pd.read_sql_query(
+            f"SELECT {columns} FROM devices WHERE household_id = ? ORDER BY position", self.conn, params=(household_id,)
+        )
+        devices_df.columns = list(DEVICE_COLUMNS)
+        devices_df["Include"] = parse_include(devices_df["Include"])
+        if stored is None and devices_df["Min Peak Share"].isna().all():
+            devices_df = devices_df.drop(columns=["Min Peak Share"])
+        return _restore_columns(devices_df, stored), rate_peak, rate_low
+
+    def cost_by_type(self):
+        # Included devices only, as in the app's totals
+        return pd.read_sql_query(
+            'SELECT device_type AS "Device Type", COUNT(*) AS "Devices", SUM(count) AS "Units",'
+            ' SUM(annual_cost) AS "Annual Cost", SUM(daily_kwh) * ? AS "Annual kWh"'
+            ' FROM devices WHERE include = 1 GROUP BY device_type ORDER BY "Annual Cost" DESC',
+            self.conn, params=(DAYS_PER_YEAR,),
+        )
+
+    def top_consumers(self, n=10, by="kwh"):
+        """The n included devices with the highest annual kWh (by="kwh") or annual cost (by="cost")."""
+        column = TOP_MEASURES[by]
+        return pd.read_sql_query(
+            'SELECT h.name AS "Household", d.name AS "Name", d.device_type AS "Device Type", d.count AS "Count",'
+            ' d.daily_kwh * ? AS "Annual kWh", d.annual_cost AS "Annual Cost"'
+            ' FROM devices AS d JOIN households AS h ON h.id = d.household_id'
+            f' WHERE d.include = 1 ORDER BY d.{column} DESC LIMIT ?',
+            self.conn, params=(DAYS_PER_YEAR, int(n)),
+        )
+
+    def households_over(self, annual_kwh):
+        """Households whose included devices use more than annual_kwh a year, largest first."""
+        return pd.read_sql_query(
+            'SELECT name AS "Household", devices AS "Devices", daily_kwh * ? AS "Annual kWh",'
+            ' annual_cost AS "Annual Cost", rate_peak AS "Rate Peak", rate_low AS "Rate Low"'
+            ' FROM households WHERE daily_kwh > ? ORDER BY daily_kwh DESC',
+            self.conn, params=(DAYS_PER_YEAR, float(annual_kwh) / DAYS_PER_YEAR),
+        )
+
+    def households_with(self, device_name):
+        """Households holding a device of exactly this name, with how many units they have."""
+        return pd.read_sql_query(
+            'SELECT h.name AS "Household", SUM(d.count) AS "Units", SUM(d.annual_cost) AS "Annual Cost"'
+            ' FROM devices AS d JOIN households AS h ON h.id = d.household_id'
+            ' WHERE d.name = ? GROUP BY h.id ORDER BY "Annual Cost" DESC',
+            self.conn, params=(device_name,),
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Store saved households in SQLite and query the portfolio.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Add saved device lists, named after their files")
+    import_parser.add_argument("database")
+    import_parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of saved device lists")
+    import_parser.add_argument("--recursive", action="store_true", help="Search directories and ** globs recursively")
+    import_parser.add_argument("--rate-peak", type=float, default=DEFAULT_RATE_PEAK, help="Peak rate for files without embedded rates")
+    import_parser.add_argument("--rate-low", type=float, default=DEFAULT_RATE_LOW, help="Off-peak rate for files without embedded rates")
+
+    list_parser = commands.add_parser("list", help="Household names")
+    list_parser.add_argument("database")
+
+    type_parser = commands.add_parser("by-type", help="Annual cost and kWh by device type")
+    type_parser.add_argument("database")
+
+    top_parser = commands.add_parser("top", help="The largest consuming devices")
+    top_parser.add_argument("database")
+    top_parser.add_argument("-n", type=int, default=10)
+    top_parser.add_argument("--by", choices=list(TOP_MEASURES), default="kwh")
+
+    over_parser = commands.add_parser("over", help="Households above an annual kWh threshold")
+    over_parser.add_argument("database")
+    over_parser.add_argument("annual_kwh", type=float)
+
+    with_parser = commands.add_parser("with", help="Households holding a device of this name")
+    with_parser.add_argument("database")
+    with_parser.add_argument("name")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Only import writes; queries never create or alter a database
+    with PortfolioStore(args.database, read_only=args.command != "import") as portfolio:
+        if args.command == "import":
+            from batch_price import expand_inputs
+
+            paths = expand_inputs(args.inputs, recursive=args.recursive)
+            if not paths:
+                print("No saved device lists matched the inputs.", file=sys.stderr)
+                return 1
+            start = time.perf_counter()
+            imported, errors, invalid = portfolio.import_files(paths, args.rate_peak, args.rate_low)
+            elapsed = time.perf_counter() - start
+            for path, error in errors:
+                print(f"Skipped {path}: {error}", file=sys.stderr)
+            for path, count in invalid:
+                print(f"{path}: {count} device(s) with invalid values stored at no cost", file=sys.stderr)
+            rate = imported / elapsed if elapsed > 0 else float("inf")
+            print(f"Imported {imported} households in {elapsed:.2f}s, {rate:,.1f} households/s; "
+                  f"skipped {len(errors)}.", file=sys.stderr)
+            return 0
+
+        start = time.perf_counter()
+        if args.command == "list":
+            print("\n".join(portfolio.household_names()))
+            result = None
+        elif args.command == "by-type":
+            result = portfolio.cost_by_type()
+        elif args.command == "top":
+            result = portfolio.top_consumers(args.n, args.by)
+        elif args.command == "over":
+            result = portfolio.households_over(args.annual_kwh)
+        else:
+            result = portfolio.households_with(args.name)
+        elapsed = time.perf_counter() - start
+        if result is not None:
+            print(result.to_string(index=False))
+            print(f"{len(result)} rows in {elapsed * 1000:.1f} ms.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,480 @@
+"""Local HTTP API for the app's cost calculation.
+
+POST /price takes a device list and returns per-device costs and household
+totals, worked out exactly as the app does: rates, Count, the Days/Weeks
+scaling, the Include flag, 30.4167 days a month and 365 a year. The body is
+either JSON, an object {"devices": [...], "rate_peak": ..., "rate_low": ...,
+"exact": false} or a bare list of device records, or a saved list in any of
+the app's save formats (CSV, Parquet or Arrow). Rates may also come from the
+query string (?rate_peak=0.25&rate_low=0.08), which wins over the body; a list
+with no rates is priced at the app's default rates.
+
+Requests that arrive together are priced together: handler threads queue
+their lists for one batching thread, which waits up to max_wait for more and
+prices every queued list with the same rates in a single vectorized call.
+Values that are not finite or outside the app's limits are rejected with 400
+before a list is queued, and a request whose batch is not priced within
+price_timeout gets 503 rather than waiting for ever.
+
+    python pricing_api.py serve --port 8765
+    curl -s -X POST --data-binary @devices.csv -H "Content-Type: text/csv" localhost:8765/price
+    python pricing_api.py loadtest --requests 5000 --concurrency 32 --devices 20
+
+GET /health, GET /stats (request and batch counts) and GET /constants are
+also served.
+"""
+import argparse
+import json
+import math
+import queue
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from batch_price import device_breakdown, household_totals
+from cost_engine import (COST_COLUMNS, DAYS_PER_MONTH, DAYS_PER_YEAR, FIXED_LIMIT, INPUT_COLUMNS,
+                         compute_costs_exact, parse_include, price_rows)
+from device_io import (
+    DEFAULT_RATE_LOW, DEFAULT_RATE_PEAK, REQUIRED_COLUMNS, apply_column_defaults, read_devices, split_rates,
+)
+from validation import (check_rows, describe, error_records, invalid_rows, price_valid, validate_devices,
+                        zero_invalid)
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Seconds a request waits for its batch before it gets 503
+PRICE_TIMEOUT = 30.0
+
+# Errors that reject a request outright; the other rules leave the row out of the totals, as in the app
+REJECTED_RULES = ("not_a_number", "negative", "too_small", "too_large")
+
+
+class _Job:
+    __slots__ = ("devices_df", "rates", "exact", "valid", "future")
+
+    def __init__(self, devices_df, rates, exact, valid=None):
+        self.devices_df = devices_df
+        self.rates = rates
+        self.exact = exact
+        # Rows that pass validation; only these reach the exact engine
+        self.valid = valid
+        self.future = Future()
+
+
+class PricingBatcher:
+    """Prices device lists from many threads in shared vectorized batches.
+
+    price() blocks until the list's costs are ready. The batching thread takes
+    the first waiting list, collects whatever else arrives within max_wait (up
+    to max_rows devices) and prices each group of lists that share rates and
+    mode with one call.
+    """
+
+    def __init__(self, max_wait=0.002, max_rows=200_000, price_timeout=PRICE_TIMEOUT):
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self.price_timeout = price_timeout
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="pricing-batcher", daemon=True)
+        self._thread.start()
+
+    def price(self, devices_df, rate_peak, rate_low, exact=False, valid=None):
+        """Cost frame (COST_COLUMNS, same index as devices_df), as compute_costs returns.
+
+        valid is the list's mask from validation.check_rows, worked out here
+        for exact pricing when not given. Raises TimeoutError if the list is not
+        priced within price_timeout seconds.
+        """
+        job = _Job(devices_df, (float(rate_peak), float(rate_low)), bool(exact), valid)
+        self._queue.put(job)
+        return job.future.result(timeout=self.price_timeout)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "devices": self.rows,
+            "mean_batch_requests": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            rows = len(job.devices_df)
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_rows:
+                remaining = deadline - time.perf_counter()
+                try:
+                    job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    # Finish this batch, then stop
+                    self._queue.put(None)
+                    break
+                batch.append(job)
+                rows += len(job.devices_df)
+            self._price_batch(batch)
+            self.requests += len(batch)
+            self.batches += 1
+            self.rows += rows
+
+    def _price_batch(self, batch):
+        groups = {}
+        for job in batch:
+            groups.setdefault((job.rates, job.exact), []).append(job)
+        for (rates, exact), jobs in groups.items():
+            try:
+                _price_group(jobs, rates, exact)
+            except Exception as exc:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(exc)
+
+
+def _price_group(jobs, rates, exact):
+    # One pricing call over the concatenated lists, split back by row offsets
+    frames = [job.devices_df[INPUT_COLUMNS] for job in jobs]
+    combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if exact:
+        # Only rows that pass validation reach the exact engine
+        valid = np.concatenate([check_rows(job.devices_df)[0] if job.valid is None else job.valid for job in jobs])
+        costs = price_valid(compute_costs_exact, combined, valid, *rates).to_numpy()
+    else:
+        costs = price_rows(combined, *rates)
+    bounds = np.cumsum([0] + [len(frame) for frame in frames])
+    for job, lo, hi in zip(jobs, bounds[:-1], bounds[1:]):
+        job.future.set_result(pd.DataFrame(costs[lo:hi], index=job.devices_df.index, columns=COST_COLUMNS))
+
+
+def price_devices(devices_df, rate_peak, rate_low, exact=False, valid=None):
+    # Price one list on the calling thread, as the unbatched server does
+    job = _Job(devices_df, (float(rate_peak), float(rate_low)), bool(exact), valid)
+    _price_group([job], job.rates, job.exact)
+    return job.future.result()
+
+
+def _rate(value, name):
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number") from None
+    if not math.isfinite(rate) or rate < 0:
+        raise ValueError(f"{name} must be a non-negative number")
+    if rate * 10000 >= FIXED_LIMIT:
+        raise ValueError(f"{name} is out of range")
+    return rate
+
+
+def _reject_out_of_range(errors):
+    # Values the engines cannot price are refused before the list is queued
+    rejected = errors[errors["Rule"].isin(REJECTED_RULES)]
+    if not rejected.empty:
+        first = rejected.iloc[:1]
+        raise ValueError(f"Row {int(first['Row'].iloc[0])}: {describe(first)[0]}"
+                         + (f" ({len(rejected)} values are out of range)" if len(rejected) > 1 else ""))
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def parse_price_request(body, content_type="", query=""):
+    """Turn a POST /price request into (devices_df, rate_peak, rate_low, exact, errors).
+
+    errors is the list's validate_devices result, for price_response.
+
+    Raises ValueError with a message for the client when the body cannot be
+    read, holds no devices, misses device columns, has an Include flag that
+    is not true or false, or holds a value that is not a finite number within
+    the app's limits (or a rate outside the exact engine's range).
+    """
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    options = {}
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type == "application/json" or (not content_type and body.lstrip()[:1] in (b"{", b"[")):
+        try:
+            payload = json.loads(body)
+        except ValueError as exc:
+            raise ValueError(f"Invalid JSON: {exc}") from None
+        if isinstance(payload, dict):
+            options = payload
+            payload = payload.get("devices")
+        if not isinstance(payload, list) or not all(isinstance(record, dict) for record in payload):
+            raise ValueError('Expected a list of device records, or an object with a "devices" list')
+        devices_df, rates = split_rates(pd.DataFrame.from_records(payload))
+    else:
+        try:
+            devices_df, rates = read_devices(body)
+        except Exception as exc:
+            raise ValueError(f"Could not read device list: {exc}") from None
+
+    # Anything unreadable as a list tends to come back as an empty frame with stray columns
+    if devices_df.empty:
+        raise ValueError("The request has no devices")
+    missing = [col for col in REQUIRED_COLUMNS if col not in devices_df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if "Include" in devices_df.columns:
+        devices_df["Include"] = parse_include(devices_df["Include"])
+
+    rate_peak, rate_low = rates if rates is not None else (DEFAULT_RATE_PEAK, DEFAULT_RATE_LOW)
+    rate_peak = _rate(params.get("rate_peak", options.get("rate_peak", rate_peak)), "rate_peak")
+    rate_low = _rate(params.get("rate_low", options.get("rate_low", rate_low)), "rate_low")
+    exact = _flag(params.get("exact", options.get("exact", False)))
+    devices_df = apply_column_defaults(devices_df)
+    errors = validate_devices(devices_df)
+    _reject_out_of_range(errors)
+    return devices_df, rate_peak, rate_low, exact, errors
+
+
+def price_response(devices_df, cost_df, rate_peak, rate_low, exact=False, errors=None):
+    """The JSON document returned by POST /price.
+
+    Rows that fail validation cost nothing and are left out of the totals, as
+    in the app; "invalid" lists their errors. errors is validate_devices'
+    result when the caller already has it.
+    """
+    if errors is None:
+        valid, errors = check_rows(devices_df)
+    else:
+        valid = ~invalid_rows(errors, len(devices_df))
+    cost_df = zero_invalid(cost_df, valid)
+    return {
+        "rates": {"Rate Peak": rate_peak, "Rate Low": rate_low},
+        "exact": exact,
+        "constants": constants(),
+        "devices": len(devices_df),
+        "invalid_devices": int((~valid).sum()),
+        "totals": household_totals(devices_df, cost_df, rate_peak, rate_low, exact, valid),
+        "breakdown": device_breakdown(devices_df, cost_df, valid),
+        "invalid": error_records(errors),
+    }
+
+
+def constants():
+    return {"Days Per Month": DAYS_PER_MONTH, "Days Per Year": DAYS_PER_YEAR}
+
+
+class PricingHandler(BaseHTTPRequestHandler):
+    server_version = "EnergyPricing/1.0"
+    # Keep-alive, so clients can send many requests over one connection
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self._send(200, {"status": "ok"})
+        elif path == "/stats":
+            self._send(200, self.server.batcher.stats() if self.server.batcher else {"batching": False})
+        elif path == "/constants":
+            self._send(200, constants())
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Reading a negative length would wait for the client to close the connection
+            self.close_connection = True
+            self._send(400, {"error": "Invalid Content-Length"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send(413, {"error": "Request body too large"})
+            return
+        body = self.rfile.read(length)
+        if url.path != "/price":
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            devices_df, rate_peak, rate_low, exact, errors = parse_price_request(
+                body, self.headers.get("Content-Type", ""), url.query)
+        except ValueError as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        valid = ~invalid_rows(errors, len(devices_df))
+        if self.server.batcher:
+            try:
+                cost_df = self.server.batcher.price(devices_df, rate_peak, rate_low, exact, valid)
+            except TimeoutError:
+                self._send(503, {"error": "Pricing is taking too long; try again later"})
+                return
+        else:
+            cost_df = price_devices(devices_df, rate_peak, rate_low, exact, valid)
+        self._send(200, price_response(devices_df, cost_df, rate_peak, rate_low, exact, errors))
+
+    def _send(self, status, document):
+        data = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PricingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, batching=True, max_wait=0.002, max_rows=200_000, verbose=False,
+                 price_timeout=PRICE_TIMEOUT):
+        super().__init__(address, PricingHandler)
+        self.batcher = PricingBatcher(max_wait, max_rows, price_timeout) if batching else None
+        self.verbose = verbose
+
+    def server_close(self):
+        super().server_close()
+        if self.batcher:
+            self.batcher.close()
+
+
+def _percentile_ms(latencies, q):
+    return float(np.percentile(latencies, q) * 1000.0) if latencies else 0.0
+
+
+def load_test(n_requests=2000, concurrency=16, n_devices=20, batching=True, max_wait=0.002, seed=0):
+    """Start a server on a free local port, post n_requests lists from concurrency clients.
+
+    Returns throughput and latency figures for the run.
+    """
+    import http.client
+    from benchmark import synthetic_household
+
+    payload = json.dumps({
+        "devices": json.loads(synthetic_household(n_devices, seed).to_json(orient="records")),
+        "rate_peak": DEFAULT_RATE_PEAK, "rate_low": DEFAULT_RATE_LOW,
+    }).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    server = PricingServer(("127.0.0.1", 0), batching=batching, max_wait=max_wait)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    counts = iter(range(n_requests))
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        latencies = []
+        failures = 0
+        while True:
+            with lock:
+                if next(counts, None) is None:
+                    break
+            start = time.perf_counter()
+            conn.request("POST", "/price", payload, headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            failures += response.status != 200
+        conn.close()
+        return latencies, failures
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: client(), range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = server.batcher.stats() if server.batcher else None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    latencies = [latency for run, _ in results for latency in run]
+    report = {
+        "batching": batching,
+        "requests": len(latencies),
+        "failures": sum(failures for _, failures in results),
+        "concurrency": concurrency,
+        "devices_per_request": n_devices,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "devices_per_second": len(latencies) * n_devices / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000.0 if latencies else 0.0,
+        "p50_ms": _percentile_ms(latencies, 50),
+        "p95_ms": _percentile_ms(latencies, 95),
+        "p99_ms": _percentile_ms(latencies, 99),
+    }
+    if stats:
+        report["mean_batch_requests"] = stats["mean_batch_requests"]
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API for pricing device lists.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Serve POST /price")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--max-wait-ms", type=float, default=2.0, help="How long a batch waits for more requests")
+    serve_parser.add_argument("--max-rows", type=int, default=200_000, help="Devices per batch")
+    serve_parser.add_argument("--no-batching", action="store_true", help="Price each request on its own thread")
+    serve_parser.add_argument("--timeout", type=float, default=PRICE_TIMEOUT,
+                              help="Seconds a request waits for its batch before getting 503")
+    serve_parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+    load_parser = commands.add_parser("loadtest", help="Measure throughput and latency against a local server")
+    load_parser.add_argument("--requests", type=int, default=2000)
+    load_parser.add_argument("--concurrency", type=int, default=16)
+    load_parser.add_argument("--devices", type=int, default=20, help="Devices per request")
+    load_parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    load_parser.add_argument("-o", "--output", help="JSON file for the results")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        server = PricingServer((args.host, args.port), not args.no_batching, args.max_wait_ms / 1000.0,
+                               args.max_rows, args.verbose, args.timeout)
+        print(f"Serving pricing API on http://{args.host}:{server.server_address[1]}/price", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    # The same load with and without batching, so the two can be compared
+    reports = [load_test(args.requests, args.concurrency, args.devices, batching, args.max_wait_ms / 1000.0)
+               for batching in (False, True)]
+    for report in reports:
+        mode = "batched" if report["batching"] else "unbatched"
+        print(f"{mode:>9}: {report['requests_per_second']:8.0f} req/s  {report['devices_per_second']:10.0f} devices/s  "
+              f"p50 {report['p50_ms']:6.2f} ms  p95 {report['p95_ms']:6.2f} ms  p99 {report['p99_ms']:6.2f} ms",
+              file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
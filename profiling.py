@@ -0,0 +1,110 @@
+"""Per-rerun stage timings for the Streamlit script.
+
+Wrap each stage of a run in `profiler.span(name, rows)`. While the profiler
+is disabled, span() hands back one shared no-op context manager, so the
+instrumentation costs a method call per stage. While enabled, each finished run
+is kept in a short history for the sidebar panel and, if a log path is set,
+appended as one JSON line:
+
+    {"time": "...", "run": 12, "total_ms": 84.1, "stopped": false,
+     "stages": [{"name": "pricing", "ms": 3.2, "rows": 1000}, ...]}
+"""
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# Setting this environment variable turns profiling on and names the JSON log file
+LOG_ENV_VAR = "ENERGY_APP_PROFILE_LOG"
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_stages", "_name", "_rows", "_start")
+
+    def __init__(self, stages, name, rows):
+        self._stages = stages
+        self._name = name
+        self._rows = rows
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Recorded even when the stage ends in st.stop() or st.rerun()
+        self._stages.append((self._name, time.perf_counter() - self._start, self._rows))
+        return False
+
+
+class RunProfiler:
+    """Stage timings for the current run plus the last `history` runs."""
+
+    def __init__(self, history=20, log_path=None):
+        self.enabled = False
+        self.log_path = log_path
+        self.runs = deque(maxlen=history)
+        self._run_number = 0
+        self._stages = None
+        self._start = None
+
+    def begin(self, enabled):
+        # A run that never reached finish() (st.stop, st.rerun, an exception) is closed here
+        if self._stages is not None:
+            self._close(stopped=True)
+        self.enabled = enabled
+        if enabled:
+            self._run_number += 1
+            self._stages = []
+            self._start = time.perf_counter()
+
+    def span(self, name, rows=None):
+        if self._stages is None:
+            return _NULL_SPAN
+        return _Span(self._stages, name, rows)
+
+    def finish(self):
+        if self._stages is not None:
+            self._close(stopped=False)
+
+    def _close(self, stopped):
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "run": self._run_number,
+            "total_ms": (time.perf_counter() - self._start) * 1000.0,
+            "stopped": stopped,
+            "stages": [{"name": name, "ms": seconds * 1000.0, "rows": rows} for name, seconds, rows in self._stages],
+        }
+        self._stages = None
+        self.runs.append(record)
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def history_frame(self):
+        """Recent runs as a DataFrame: one row per run with its row count and milliseconds per stage."""
+        import pandas as pd
+
+        rows = []
+        for record in self.runs:
+            counts = [stage["rows"] for stage in record["stages"] if stage["rows"] is not None]
+            row = {"Run": record["run"], "Rows": max(counts) if counts else 0, "Total (ms)": record["total_ms"]}
+            for stage in record["stages"]:
+                row[stage["name"]] = row.get(stage["name"], 0.0) + stage["ms"]
+            rows.append(row)
+        return pd.DataFrame(rows).set_index("Run") if rows else pd.DataFrame()
+
+
+def log_path_from_env():
+    return os.environ.get(LOG_ENV_VAR) or None
@@ -0,0 +1,168 @@
+"""Daily usage and cost across a 365-day year, with each device's weeks placed by season.
+
+The cost engine spreads a device used for W weeks a year evenly over every
+day, as Weeks / 52 of its daily use. Here those weeks form one block of the
+calendar centred on the device's season (winter for heaters, summer for
+cooling), so the same annual total lands in the months it is really spent.
+A day at the edge of a block is counted by the share of it the block covers,
+which keeps every device's year total equal to its annual cost.
+
+Devices only differ in where their weeks fall through (season, weeks), and
+few such pairs exist however long the list is; each pair's 365-day shape is
+built once and devices or households are sums of those shapes.
+"""
+import numpy as np
+import pandas as pd
+
+from cost_engine import band_kwh, included_mask, numeric_column
+from device_defaults import device_types
+
+DAYS_PER_CALENDAR_YEAR = 365
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+MONTH_STARTS = np.concatenate([[0], np.cumsum(MONTH_DAYS)[:-1]])
+
+# Optional per-device column naming one of SEASON_CENTRES
+SEASON_COLUMN = "Season"
+
+# Middle of each season as a day of the year (0 = 1 January); None spreads the weeks evenly
+SEASON_CENTRES = {
+    "All Year": None,
+    "Winter": 15.0,
+    "Spring": 105.0,
+    "Summer": 196.0,
+    "Autumn": 288.0,
+}
+SEASONS = list(SEASON_CENTRES)
+
+# Season of each default device profile that is not used all year round
+DEVICE_SEASONS = {
+    "Electric Radiator": "Winter",
+    "Fan Heater": "Winter",
+    "Air Conditioner (Heating)": "Winter",
+    "Air Source Heat Pump (Winter -3 to 0 C)": "Winter",
+    "Air Source Heat Pump (Winter 0 to 7 C)": "Winter",
+    "Air Conditioner (Cooling)": "Summer",
+}
+
+
+def device_seasons(devices_df):
+    """Season of each row: its Season column when set to a known season, else its device type's."""
+    types, names = pd.factorize(np.asarray(device_types(devices_df), dtype=object))
+    by_type = np.asarray([DEVICE_SEASONS.get(name, "All Year") for name in names], dtype=object)[types]
+    if SEASON_COLUMN not in devices_df.columns:
+        return by_type
+    given = devices_df[SEASON_COLUMN].astype(object).to_numpy()
+    return np.where(np.isin(given, SEASONS), given, by_type)
+
+
+def week_shares(devices_df):
+    """Weeks / 52 per row, clipped to a whole year; missing weeks count as none."""
+    weeks = numeric_column(devices_df, "Weeks")
+    return np.clip(np.nan_to_num(weeks, nan=0.0), 0.0, 52.0) / 52.0
+
+
+def season_shapes(seasons, shares):
+    """Distinct (season, share) pairs and the share of each calendar day they cover.
+
+    Returns (shapes, inverse): shapes is (k, 365) float64 with each row summing
+    to share * 365, and inverse maps every input row to its row of shapes.
+    """
+    # share is at most 1, so 2 * season code + share identifies the pair in one float
+    codes = pd.Categorical(seasons, categories=SEASONS).codes
+    inverse, keys = pd.factorize(2.0 * codes + np.asarray(shares, dtype=np.float64))
+    day = np.arange(DAYS_PER_CALENDAR_YEAR, dtype=np.float64)
+    shapes = np.empty((len(keys), DAYS_PER_CALENDAR_YEAR), dtype=np.float64)
+    for i, key in enumerate(keys):
+        code = int(key // 2.0)
+        share = key - 2.0 * code
+        centre = SEASON_CENTRES[SEASONS[code]]
+        if centre is None:
+            shapes[i] = share
+            continue
+        # A block of share * 365 days around the centre, wrapping over the new year
+        start = centre - share * DAYS_PER_CALENDAR_YEAR / 2.0
+        end = start + share * DAYS_PER_CALENDAR_YEAR
+        covered = np.zeros(DAYS_PER_CALENDAR_YEAR)
+        for shift in (-DAYS_PER_CALENDAR_YEAR, 0, DAYS_PER_CALENDAR_YEAR):
+            covered += np.clip(np.minimum(day + 1, end + shift) - np.maximum(day, start + shift), 0.0, 1.0)
+        shapes[i] = covered
+    return shapes, inverse
+
+
+def _active_day(values, shares):
+    # Daily average over the year -> use on each day of an active week
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(shares > 0, values / shares, 0.0)
+
+
+def calendar_matrix(daily_kwh, daily_cost, seasons, shares):
+    """Per-device daily kWh and cost for each day of the year, as two (n, 365) float32 arrays.
+
+    daily_kwh and daily_cost are the engine's yearly-average daily figures
+    (any pricing mode); each row of the result sums to 365 times them.
+    """
+    shapes, inverse = season_shapes(seasons, shares)
+    shapes = shapes.astype(np.float32)
+    kwh = _active_day(np.asarray(daily_kwh, dtype=np.float64), shares).astype(np.float32)
+    cost = _active_day(np.asarray(daily_cost, dtype=np.float64), shares).astype(np.float32)
+    return shapes[inverse] * kwh[:, None], shapes[inverse] * cost[:, None]
+
+
+def daily_totals(daily_kwh, daily_cost, seasons, shares, groups=None, n_groups=None):
+    """Daily kWh and cost summed per group (household) without building the per-device matrix.
+
+    groups holds a 0-based group number per row (all rows form one group when
+    None). Returns two (n_groups, 365) float64 arrays.
+    """
+    shapes, inverse = season_shapes(seasons, shares)
+    k = len(shapes)
+    if groups is None:
+        groups, n_groups = np.zeros(len(inverse), dtype=np.int64), 1
+    elif n_groups is None:
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+    cell = np.asarray(groups, dtype=np.int64) * k + inverse
+    totals = []
+    for values in (daily_kwh, daily_cost):
+        weights = np.bincount(cell, weights=_active_day(np.asarray(values, dtype=np.float64), shares),
+                              minlength=n_groups * k)
+        totals.append(weights.reshape(n_groups, k) @ shapes)
+    return totals[0], totals[1]
+
+
+def household_calendar(devices_df, rate_peak, rate_low, groups=None, n_groups=None):
+    """Daily kWh and cost of the included devices of one or many households.
+
+    For many households, concatenate their lists and pass each row's household
+    number as groups; rate_peak and rate_low may then be per-row arrays.
+    """
+    peak_kwh, low_kwh = band_kwh(devices_df)
+    included = included_mask(devices_df)
+    daily_kwh = np.where(included, peak_kwh + low_kwh, 0.0)
+    daily_cost = np.where(included, peak_kwh * rate_peak + low_kwh * rate_low, 0.0)
+    return daily_totals(daily_kwh, daily_cost, device_seasons(devices_df), week_shares(devices_df), groups, n_groups)
+
+
+def monthly_totals(daily):
+    """Sum a (..., 365) daily array into (..., 12) calendar months."""
+    return np.add.reduceat(np.asarray(daily), MONTH_STARTS, axis=-1)
+
+
+def calendar_dates(year):
+    """The DAYS_PER_CALENDAR_YEAR dates of year that the daily arrays stand for; 29 February is left out."""
+    dates = pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="D")
+    return dates[~((dates.month == 2) & (dates.day == 29))]
+
+
+def device_month_totals(daily_kwh, daily_cost, seasons, shares):
+    """Per-device kWh and cost in each month, as two (n, 12) arrays, from the month sums of each shape."""
+    shapes, inverse = season_shapes(seasons, shares)
+    month_shapes = monthly_totals(shapes)[inverse]
+    kwh = _active_day(np.asarray(daily_kwh, dtype=np.float64), shares)
+    cost = _active_day(np.asarray(daily_cost, dtype=np.float64), shares)
+    return month_shapes * kwh[:, None], month_shapes * cost[:, None]
+
+
+def month_frame(month_kwh, month_cost):
+    """One household's monthly totals as a frame indexed by month name."""
+    return pd.DataFrame({"kWh": month_kwh, "Cost": month_cost}, index=pd.Index(MONTH_NAMES, name="Month"))
@@ -0,0 +1,83 @@
+"""Approximate memory held by one session's state.
+
+Sizes follow references the way the garbage collector would see them: a
+NumPy buffer, Arrow buffer or Python object shared by several entries (a
+frame and its shallow copy, device names that are the same string) is only
+counted for the first entry that reaches it, so the readout shows what the
+session really keeps alive rather than what each entry would cost on its own.
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Containers nested deeper than this are counted by their own size only
+MAX_DEPTH = 8
+
+
+def _array_bytes(values, seen):
+    # The root buffer of a view is counted once, however many columns or frames view it
+    root = values
+    while isinstance(root.base, np.ndarray):
+        root = root.base
+    total = 0
+    if id(root) not in seen:
+        seen.add(id(root))
+        total += root.nbytes
+    if values.dtype == object:
+        total += sum(object_bytes(item, seen, MAX_DEPTH) for item in values.ravel())
+    return total
+
+
+def _frame_bytes(frame, seen, depth):
+    columns = [frame[col] for col in frame.columns] if isinstance(frame, pd.DataFrame) else [frame]
+    total = sys.getsizeof(frame.index) if id(frame.index) not in seen else 0
+    seen.add(id(frame.index))
+    for column in columns:
+        array = column.array
+        if hasattr(array, "__arrow_array__"):
+            for chunk in array.__arrow_array__().chunks:
+                for buffer in chunk.buffers():
+                    if buffer is not None and buffer.address not in seen:
+                        seen.add(buffer.address)
+                        total += buffer.size
+        else:
+            total += _array_bytes(column.to_numpy(), seen)
+    return total
+
+
+def object_bytes(obj, seen=None, depth=0):
+    """Bytes reachable from obj that are not already in seen (a set of ids, updated in place)."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return _frame_bytes(obj, seen, depth)
+    if isinstance(obj, np.ndarray):
+        seen.discard(id(obj))
+        return _array_bytes(obj, seen)
+    total = sys.getsizeof(obj)
+    if depth >= MAX_DEPTH or isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return total
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            total += object_bytes(key, seen, depth + 1) + object_bytes(value, seen, depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            total += object_bytes(item, seen, depth + 1)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        total += object_bytes(vars(obj), seen, depth + 1)
+    if hasattr(type(obj), "__slots__"):
+        for name in type(obj).__slots__:
+            total += object_bytes(getattr(obj, name, None), seen, depth + 1)
+    return total
+
+
+def session_memory_frame(items):
+    """One row per (name, object) pair, largest first, with the kilobytes each adds."""
+    seen = set()
+    rows = [(name, object_bytes(obj, seen) / 1024.0) for name, obj in items]
+    frame = pd.DataFrame(rows, columns=["Item", "KB"]).sort_values("KB", ascending=False, kind="stable")
+    return frame.set_index("Item")
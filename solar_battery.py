@@ -0,0 +1,275 @@
+"""Solar panels and a home battery, simulated half-hour by half-hour for a year.
+
+Each household's demand is its device list spread over the day the way the
+half-hourly tariff spreads it (peak hours outside the off-peak window,
+off-peak hours inside it), scaled day by day by the seasonal calendar so
+heating falls in winter. Generation is a clear-sky shape for the latitude
+scaled to a typical annual yield per kWp, or any (365, 48) kWh-per-kWp array.
+
+The battery is dispatched by fixed rules, slot by slot:
+
+  1. Solar serves demand first; any surplus charges the battery, and what
+     the battery cannot take is exported.
+  2. In peak slots the battery covers what solar cannot, while it holds charge.
+  3. In off-peak slots demand is imported, and if peak energy stored at the
+     off-peak rate is worth it after losses, the battery is also charged
+     from the grid up to the day's expected peak shortfall.
+
+The state of charge depends on the slot before, so slots run in order, but
+each step works on every household at once: one year is 17,520 steps over
+arrays with one entry per household, however many households there are.
+
+    python solar_battery.py households/ "archive/*.csv" -o solar.csv --pv-kwp 4 --battery-kwh 10
+"""
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from batch_price import expand_inputs
+from cost_engine import band_kwh, included_mask, round_half_even
+from device_io import DEFAULT_RATE_LOW, DEFAULT_RATE_PEAK, read_device_list
+from seasonal_calendar import DAYS_PER_CALENDAR_YEAR, household_calendar
+from tou_tariff import DEFAULT_OFF_PEAK_END, DEFAULT_OFF_PEAK_START, SLOTS_PER_DAY, band_slot_shares, window_mask
+from validation import valid_devices
+
+SLOT_HOURS = 24.0 / SLOTS_PER_DAY
+
+# Typical UK defaults
+LATITUDE = 52.0
+ANNUAL_YIELD_PER_KWP = 950.0
+ROUND_TRIP_EFFICIENCY = 0.9
+EXPORT_RATE = 0.15
+
+SOLAR_COLUMNS = [
+    "Demand kWh", "PV kWh", "Import kWh", "Export kWh", "Self-Consumption %",
+    "Baseline Cost", "PV Only Cost", "PV + Battery Cost", "PV Saving", "Battery Saving", "Total Saving",
+]
+
+
+def pv_profile(latitude=LATITUDE, annual_yield=ANNUAL_YIELD_PER_KWP):
+    """kWh per kWp in each half-hour of a year, as a (365, 48) array summing to annual_yield.
+
+    Clear-sky shape: generation follows the sine of the sun's elevation at
+    the middle of each slot, with solar noon at 12:00.
+    """
+    day = np.arange(DAYS_PER_CALENDAR_YEAR)
+    declination = np.radians(23.44) * np.sin(2.0 * np.pi * (284 + day + 1) / DAYS_PER_CALENDAR_YEAR)
+    hour_angle = np.radians(15.0 * ((np.arange(SLOTS_PER_DAY) + 0.5) * SLOT_HOURS - 12.0))
+    lat = np.radians(latitude)
+    elevation = (np.sin(lat) * np.sin(declination)[:, None]
+                 + np.cos(lat) * np.cos(declination)[:, None] * np.cos(hour_angle)[None, :])
+    shape = np.maximum(elevation, 0.0)
+    return shape * (annual_yield / shape.sum())
+
+
+def read_pv_profile(source):
+    """kWh per kWp per half-hour from a CSV with one row per slot of the year (17,520 rows).
+
+    Uses a "kWh" column if present, otherwise the last numeric column.
+    """
+    profile_df = pd.read_csv(source)
+    column = profile_df["kWh"] if "kWh" in profile_df.columns else profile_df.select_dtypes("number").iloc[:, -1]
+    values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64)
+    if len(values) != DAYS_PER_CALENDAR_YEAR * SLOTS_PER_DAY or not np.isfinite(values).all():
+        raise ValueError(f"Expected {DAYS_PER_CALENDAR_YEAR * SLOTS_PER_DAY} numeric half-hourly values.")
+    return values.reshape(DAYS_PER_CALENDAR_YEAR, SLOTS_PER_DAY)
+
+
+def household_profile(devices_df):
+    """(daily peak kWh, daily off-peak kWh, day factors) of one household's included devices.
+
+    The day factors (365 values averaging 1) scale each day's use by the
+    seasonal calendar; a household with no use has factors of 1.
+    """
+    peak_kwh, low_kwh = band_kwh(devices_df)
+    included = included_mask(devices_df)
+    day_kwh, _ = household_calendar(devices_df, 0.0, 0.0)
+    mean = day_kwh[0].mean()
+    factors = day_kwh[0] / mean if mean > 0 else np.ones(DAYS_PER_CALENDAR_YEAR)
+    return float(peak_kwh[included].sum()), float(low_kwh[included].sum()), factors
+
+
+def simulate(peak_kwh, low_kwh, day_factors, rate_peak, rate_low, pv_kwp, battery_kwh, battery_kw,
+             pv=None, off_peak_mask=None, efficiency=ROUND_TRIP_EFFICIENCY, export_rate=EXPORT_RATE):
+    """Simulate a year for a batch of households; one row per household with SOLAR_COLUMNS.
+
+    peak_kwh and low_kwh are each household's daily kWh in each band and
+    day_factors its (households, 365) seasonal scaling (None for none).
+    Rates, system sizes and the export rate are scalars or one per household.
+    """
+    peak_kwh = np.atleast_1d(np.asarray(peak_kwh, dtype=np.float64))
+    n = len(peak_kwh)
+
+    def per_household(value):
+        return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy()
+
+    low_kwh = per_household(low_kwh)
+    rate_peak, rate_low, export_rate = per_household(rate_peak), per_household(rate_low), per_household(export_rate)
+    pv_kwp, capacity = per_household(pv_kwp), per_household(battery_kwh)
+    step = per_household(battery_kw) * SLOT_HOURS
+    pv = pv_profile() if pv is None else np.asarray(pv, dtype=np.float64)
+    if off_peak_mask is None:
+        off_peak_mask = window_mask(DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END)
+    off_peak_mask = np.asarray(off_peak_mask, dtype=bool)
+    day_factors = np.ones((n, DAYS_PER_CALENDAR_YEAR)) if day_factors is None else np.asarray(day_factors)
+    eff = math.sqrt(efficiency)
+
+    peak_share, low_share = band_slot_shares(off_peak_mask)
+    # Slots are the leading axis so each step reads contiguous household rows; buffers are reused
+    base = np.ascontiguousarray(np.outer(peak_share, peak_kwh) + np.outer(low_share, low_kwh))
+    factors = np.ascontiguousarray(np.asarray(day_factors, dtype=np.float64).T)
+    in_low, in_peak = off_peak_mask.astype(np.float64), (~off_peak_mask).astype(np.float64)
+    # Grid charging pays when a stored off-peak kWh is worth more at peak after losses
+    arbitrage = rate_peak * efficiency > rate_low
+
+    # Demand, generation and the no-solar bill scale linearly with the day, so they are summed once
+    year_factor = factors.sum(axis=0)
+    totals = {
+        "demand": base.sum(axis=0) * year_factor,
+        "pv": pv_kwp * pv.sum(),
+        "baseline": (in_peak @ base * rate_peak + in_low @ base * rate_low) * year_factor,
+    }
+    for name in ("import", "export", "pv_only", "cost"):
+        totals[name] = np.zeros(n)
+
+    soc = np.zeros(n)
+    deficit, surplus = np.empty((SLOTS_PER_DAY, n)), np.empty((SLOTS_PER_DAY, n))
+    imported, exported = np.empty((SLOTS_PER_DAY, n)), np.empty((SLOTS_PER_DAY, n))
+    flow, room = np.empty(n), np.empty(n)
+    for d in range(DAYS_PER_CALENDAR_YEAR):
+        # Net demand after solar, split into what is bought and what is spare
+        np.multiply(base, factors[d], out=surplus)
+        np.multiply(pv[d][:, None], pv_kwp, out=imported)
+        surplus -= imported
+        np.maximum(surplus, 0.0, out=deficit)
+        np.subtract(deficit, surplus, out=surplus)
+        totals["pv_only"] += (in_peak @ deficit * rate_peak + in_low @ deficit * rate_low
+                              - surplus.sum(axis=0) * export_rate)
+        # Charge from the grid only up to what today's peak slots are expected to need
+        target = np.where(arbitrage, np.minimum(capacity, in_peak @ deficit / eff), 0.0)
+
+        for s in range(SLOTS_PER_DAY):
+            # Solar surplus into the battery, limited by power and the room left
+            np.subtract(capacity, soc, out=room)
+            room /= eff
+            np.minimum(surplus[s], step, out=flow)
+            np.minimum(flow, room, out=flow)
+            np.subtract(surplus[s], flow, out=exported[s])
+            if off_peak_mask[s]:
+                soc += flow * eff
+                # Top up from the grid towards the target with the power left this slot
+                np.subtract(step, flow, out=room)
+                np.subtract(target, soc, out=flow)
+                flow /= eff
+                np.minimum(flow, room, out=flow)
+                np.maximum(flow, 0.0, out=flow)
+                soc += flow * eff
+                np.add(deficit[s], flow, out=imported[s])
+            else:
+                soc += flow * eff
+                np.minimum(deficit[s], step, out=flow)
+                np.minimum(flow, soc * eff, out=flow)
+                soc -= flow / eff
+                np.subtract(deficit[s], flow, out=imported[s])
+        exported_today = exported.sum(axis=0)
+        totals["import"] += imported.sum(axis=0)
+        totals["export"] += exported_today
+        totals["cost"] += in_peak @ imported * rate_peak + in_low @ imported * rate_low - exported_today * export_rate
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        self_consumption = np.where(totals["pv"] > 0, 100.0 * (1.0 - totals["export"] / totals["pv"]), 0.0)
+    return pd.DataFrame({
+        "Demand kWh": totals["demand"],
+        "PV kWh": totals["pv"],
+        "Import kWh": totals["import"],
+        "Export kWh": totals["export"],
+        "Self-Consumption %": self_consumption,
+        "Baseline Cost": totals["baseline"],
+        "PV Only Cost": totals["pv_only"],
+        "PV + Battery Cost": totals["cost"],
+        "PV Saving": totals["baseline"] - totals["pv_only"],
+        "Battery Saving": totals["pv_only"] - totals["cost"],
+        "Total Saving": totals["baseline"] - totals["cost"],
+    })
+
+
+def _household_inputs(path, rate_peak=DEFAULT_RATE_PEAK, rate_low=DEFAULT_RATE_LOW):
+    # Runs in a worker process; the rates are used for files without their own, and rows that fail
+    # validation are left out
+    try:
+        devices_df, rate_peak, rate_low = read_device_list(path, rate_peak, rate_low)
+        devices_df, invalid = valid_devices(devices_df)
+        return path, (*household_profile(devices_df), rate_peak, rate_low), invalid, None
+    except Exception as e:
+        return path, None, 0, f"{type(e).__name__}: {e}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate solar panels and a battery for saved device lists.")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of saved device lists")
+    parser.add_argument("-o", "--output", required=True, help="CSV to write, one row per household")
+    parser.add_argument("--pv-kwp", type=float, default=4.0, help="Solar array size in kWp (default: 4)")
+    parser.add_argument("--battery-kwh", type=float, default=10.0, help="Usable battery capacity (default: 10)")
+    parser.add_argument("--battery-kw", type=float, default=5.0, help="Battery charge/discharge power (default: 5)")
+    parser.add_argument("--efficiency", type=float, default=ROUND_TRIP_EFFICIENCY, help="Battery round-trip efficiency")
+    parser.add_argument("--export-rate", type=float, default=EXPORT_RATE, help="Export payment (£/kWh)")
+    parser.add_argument("--pv-profile", help="CSV of kWh per kWp for each half-hour of the year (default: clear sky)")
+    parser.add_argument("--latitude", type=float, default=LATITUDE, help="Latitude for the clear-sky profile")
+    parser.add_argument("--rate-peak", type=float, default=DEFAULT_RATE_PEAK, help="Peak rate for files without embedded rates")
+    parser.add_argument("--rate-low", type=float, default=DEFAULT_RATE_LOW, help="Off-peak rate for files without embedded rates")
+    parser.add_argument("--recursive", action="store_true", help="Search directories and ** globs recursively")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Files handed to a worker at a time")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = expand_inputs(args.inputs, recursive=args.recursive)
+    if not paths:
+        print("No saved device lists matched the inputs.", file=sys.stderr)
+        return 1
+    pv = read_pv_profile(args.pv_profile) if args.pv_profile else pv_profile(args.latitude)
+
+    start = time.perf_counter()
+    households, inputs = [], []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        worker = partial(_household_inputs, rate_peak=args.rate_peak, rate_low=args.rate_low)
+        for path, values, invalid, error in pool.map(worker, paths, chunksize=args.chunksize):
+            if error is not None:
+                print(f"Skipped {path}: {error}", file=sys.stderr)
+                continue
+            if invalid:
+                print(f"{path}: {invalid} device(s) with invalid values left out", file=sys.stderr)
+            households.append(path)
+            inputs.append(values)
+    if not households:
+        print("No saved device lists could be read.", file=sys.stderr)
+        return 1
+    read_elapsed = time.perf_counter() - start
+
+    peak_kwh, low_kwh, factors, rate_peak, rate_low = (np.asarray(column) for column in zip(*inputs))
+    simulated_at = time.perf_counter()
+    result = simulate(peak_kwh, low_kwh, factors, rate_peak, rate_low, args.pv_kwp, args.battery_kwh,
+                      args.battery_kw, pv=pv, efficiency=args.efficiency, export_rate=args.export_rate)
+    sim_elapsed = time.perf_counter() - simulated_at
+
+    result = result.apply(round_half_even)
+    result.insert(0, "File", households)
+    result.to_csv(args.output, index=False)
+    print(
+        f"Read {len(households)} households in {read_elapsed:.2f}s; simulated a year of half-hours "
+        f"for all of them in {sim_elapsed:.2f}s.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Measure the app's cold start.
+
+Each sample runs in a fresh Python process, as a newly started container
+would: it times importing the app's modules and then the first full script run
+(through Streamlit's AppTest, with an empty session). Prints JSON with the
+median of each:
+
+    python startup_time.py --runs 5
+    python startup_time.py --max-seconds 3.0   # exit 1 if the median first run is slower
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Imported by the app only when a panel or a loaded list needs them; none should load on a cold start
+LAZY_MODULES = (
+    "plotly.express", "pyarrow.parquet", "sqlite3", "monte_carlo", "meter_data", "tariff_sweep",
+    "tariff_timeline", "demand_profile", "solar_battery", "validation", "export", "portfolio", "seasonal_calendar",
+)
+
+_PROBE = """
+import json, sys, time
+LAZY_MODULES = %r
+start = time.perf_counter()
+import streamlit, pandas, numpy
+import cost_engine, device_io, device_store, incremental_pricing, tou_tariff
+import load_shift, cost_chart, breakdown_table, device_defaults, static_assets, profiling
+imported = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+ready = time.perf_counter()
+at.run()
+done = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "first_run_seconds": done - ready,
+    "heavy_modules_loaded": sorted(m for m in LAZY_MODULES if m in sys.modules),
+    "exceptions": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def measure_once(app_path=APP_PATH):
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE % (LAZY_MODULES,), app_path],
+        capture_output=True, text=True, cwd=os.path.dirname(app_path), check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the app's cold start time.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes to time (default: 3)")
+    parser.add_argument("--max-seconds", type=float, help="Fail if the median import + first run exceeds this")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    samples = [measure_once() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_seconds": statistics.median(s["import_seconds"] for s in samples),
+        "first_run_seconds": statistics.median(s["first_run_seconds"] for s in samples),
+        "heavy_modules_loaded": samples[-1]["heavy_modules_loaded"],
+        "exceptions": samples[-1]["exceptions"],
+    }
+    report["total_seconds"] = report["import_seconds"] + report["first_run_seconds"]
+    print(json.dumps(report, indent=2))
+    if report["exceptions"]:
+        return 1
+    if args.max_seconds is not None and report["total_seconds"] > args.max_seconds:
+        print(f"Cold start {report['total_seconds']:.2f}s exceeds {args.max_seconds:.2f}s.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Static HTML and CSS injected by the app.
+
+Built once per process at import time instead of on every script run.
+"""
+
+# Buy Me a Coffee button shown at the top of the sidebar
+COFFEE_BUTTON_HTML = """
+        <div style="transform: scale(0.9); transform-origin: top left;">
+            <script type="text/javascript" src="https://cdnjs.buymeacoffee.com/1.0.0/button.prod.min.js" data-name="bmc-button" data-slug="stevefernandes" data-color="#FFDD00" data-emoji="☕"  data-font="Cookie" data-text="Buy me a coffee" data-outline-color="#000000" data-font-color="#000000" data-coffee-color="#ffffff" ></script>
+        </div>
+        """
+
+# Form box, table header and chart legend styling, followed by the "Add Device"
+# button overrides (injected after the rest to beat Streamlit's defaults)
+APP_CSS = """
+<style>
+    /* 1. Target ONLY the inner vertical block using direct child combinator */
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) {
+        background-color: #cccccc !important;
+        border: 1px solid #888 !important;
+        padding: 20px !important;
+        border-radius: 10px !important;
+        margin-top: 5px !important; /* Small gap from header */
+    }
+    
+    /* Make the inner content wrapper transparent so the grey shows through */
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) > div {
+        background-color: transparent !important;
+    }
+
+    /* Ensure label colors are correct in the box */
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stWidgetLabel"] p,
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] p,
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h1,
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h2,
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h3 {
+        font-weight: bold;
+        color: #000 !important;
+    }
+
+    /* Dark mode support */
+    @media (prefers-color-scheme: dark) {
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) {
+            background-color: #666666 !important; 
+            border: 1px solid #aaa !important;
+        }
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) > div {
+            background-color: transparent !important;
+        }
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stWidgetLabel"] p,
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] p,
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h1,
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h2,
+        div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) [data-testid="stMarkdown"] h3 {
+            color: #ffffff !important;
+        }
+    }
+    
+    /* REMOVE SPACING BETWEEN HEADER AND BOX - Adjusted for cleaner look */
+    /* Remove bottom padding from header but keep margin */
+    div:has(> h2#add-new-device) {
+        padding-bottom: 0 !important;
+    }
+    h2#add-new-device {
+        padding-bottom: 0 !important;
+    }
+    
+    /* Make table headers bold - Aggressive targeting */
+    [data-testid="stDataFrame"] th,
+    [data-testid="stDataEditor"] th,
+    [data-testid="stDataFrame"] [role="columnheader"],
+    [data-testid="stDataEditor"] [role="columnheader"],
+    [data-testid="stDataFrame"] div[class*="header"],
+    [data-testid="stDataEditor"] div[class*="header"] {
+        font-weight: 900 !important;
+        font-family: sans-serif !important;
+        color: black !important; /* ensure visibility in light mode */
+    }
+    
+    /* Dark mode override for headers */
+    @media (prefers-color-scheme: dark) {
+        [data-testid="stDataFrame"] th,
+        [data-testid="stDataEditor"] th,
+        [data-testid="stDataFrame"] [role="columnheader"],
+        [data-testid="stDataEditor"] [role="columnheader"] {
+             color: white !important;
+        }
+    }
+    
+    /* Plotly Legend Scrollbar Fix */
+    g.scrollbar rect.scrollbar-glyph {
+        fill: #888 !important;
+        fill-opacity: 0.8 !important;
+    }
+    g.scrollbar rect.scrollbar-channel {
+        fill: #eee !important;
+        fill-opacity: 0.1 !important;
+    }
+</style>
+<style>
+    /* Target the submit button within the container */
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button {
+        background-color: #007bff !important;
+        color: white !important;
+        border: none !important;
+    }
+    
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button:hover {
+        background-color: #0056b3 !important;
+        color: white !important;
+    }
+
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button:active {
+           background-color: #004494 !important;
+           color: white !important;
+    }
+    
+    /* Ensure text color is white in both light and dark modes for this button */
+    div[data-testid="stVerticalBlock"]:has(> [data-testid="stElementContainer"] .device-box-fix) .stButton button p {
+        color: white !important;
+    }
+</style>
+"""
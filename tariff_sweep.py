@@ -0,0 +1,51 @@
+"""Annual cost across a grid of peak and off-peak rates.
+
+A household's cost is linear in the two rates, so its peak and off-peak kWh
+are summed once and the whole grid is priced with one broadcast:
+cost[i, j] = (peak_kwh * peak_rates[j] + low_kwh * low_rates[i]) * 365.
+"""
+import numpy as np
+
+from cost_engine import DAYS_PER_YEAR, band_kwh, included_mask
+
+
+def household_band_kwh(devices_df):
+    # Daily peak and off-peak kWh summed over included devices
+    peak_kwh, low_kwh = band_kwh(devices_df)
+    included = included_mask(devices_df)
+    return float(peak_kwh[included].sum()), float(low_kwh[included].sum())
+
+
+def annual_cost_surface(peak_kwh, low_kwh, peak_rates, low_rates):
+    """Annual cost for every (low rate, peak rate) pair.
+
+    peak_kwh and low_kwh are daily totals, either scalars for one household or
+    arrays for many. The result has shape peak_kwh.shape + (len(low_rates),
+    len(peak_rates)), so rows follow the off-peak rate and columns the peak rate.
+    """
+    peak_kwh = np.asarray(peak_kwh, dtype=np.float64)[..., None, None]
+    low_kwh = np.asarray(low_kwh, dtype=np.float64)[..., None, None]
+    peak_rates = np.asarray(peak_rates, dtype=np.float64)
+    low_rates = np.asarray(low_rates, dtype=np.float64)[:, None]
+    return (peak_kwh * peak_rates + low_kwh * low_rates) * DAYS_PER_YEAR
+
+
+def sweep_figure(peak_rates, low_rates, surface, break_even_cost=None):
+    """Heatmap of an annual cost surface with the break-even cost drawn as a contour."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        x=peak_rates, y=low_rates, z=surface, colorscale="Viridis",
+        colorbar={"title": "Annual Cost (£)"},
+        hovertemplate="Peak £%{x:.4f}<br>Off-Peak £%{y:.4f}<br>Annual £%{z:,.2f}<extra></extra>",
+    ))
+    if break_even_cost is not None and surface.min() <= break_even_cost <= surface.max():
+        fig.add_trace(go.Contour(
+            x=peak_rates, y=low_rates, z=surface, showscale=False, hoverinfo="skip",
+            contours={"coloring": "none", "start": break_even_cost, "end": break_even_cost, "size": 1,
+                      "showlabels": True, "labelformat": ",.2f"},
+            line={"color": "white", "width": 2, "dash": "dash"},
+            name="Break-even",
+        ))
+    fig.update_layout(xaxis_title="Peak Rate (£/kWh)", yaxis_title="Off-Peak Rate (£/kWh)", height=600)
+    return fig
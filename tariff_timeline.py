@@ -0,0 +1,218 @@
+"""Pricing against a timeline of peak/off-peak rates that change over the year.
+
+A timeline is a table of effective-from dates, each with the peak and off-peak
+rates that apply from that day until the next row (the last row applies from
+then on). Rates change a few times a year, for example quarterly under the
+price cap, so a year is priced by splitting each interval across the rate
+periods it spans:
+
+    cost(a, b) = peak_kwh * R_peak(a, b) + low_kwh * R_low(a, b)
+
+where R is the sum of the daily rate over the days in [a, b). The running sum
+of rate-days is stored at each effective-from date, so R for any interval is
+two binary searches into the timeline rather than a pass over its periods, and
+the rate-days of a year's months are found once however many households are
+priced against them:
+
+    python tariff_timeline.py timeline.csv households/ "archive/*.csv" -o monthly.csv --start 2025-01-01
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_price import expand_inputs
+from cost_engine import round_half_even
+from device_io import read_device_list
+from tariff_sweep import household_band_kwh
+from validation import valid_devices
+
+TIMELINE_COLUMNS = ["Effective From", "Rate Peak", "Rate Low"]
+
+
+class TariffTimeline:
+    """Peak and off-peak rates (£/kWh), each in force from its effective-from date.
+
+    Dates are held as datetime64[D]; rows are sorted by date and a date may
+    appear only once.
+    """
+
+    def __init__(self, effective_from, rate_peak, rate_low):
+        starts = np.asarray(pd.to_datetime(effective_from, errors="coerce"), dtype="datetime64[D]")
+        peak = np.asarray(rate_peak, dtype=np.float64)
+        low = np.asarray(rate_low, dtype=np.float64)
+        if not (len(starts) == len(peak) == len(low)) or len(starts) == 0:
+            raise ValueError("A timeline needs at least one row, each with a date and both rates.")
+        if np.isnat(starts).any():
+            raise ValueError("Every row needs a valid effective-from date.")
+        if not (np.isfinite(peak).all() and np.isfinite(low).all()) or (peak < 0).any() or (low < 0).any():
+            raise ValueError("Every rate must be a number of zero or more.")
+        order = np.argsort(starts, kind="stable")
+        self.starts, self.peak, self.low = starts[order], peak[order], low[order]
+        if (np.diff(self.starts) == np.timedelta64(0, "D")).any():
+            raise ValueError("Two rows share an effective-from date.")
+        # Running rate-days at each effective-from date (0 at the first)
+        days = np.diff(self.starts).astype(np.float64)
+        self._peak_to = np.concatenate([[0.0], np.cumsum(self.peak[:-1] * days)])
+        self._low_to = np.concatenate([[0.0], np.cumsum(self.low[:-1] * days)])
+
+    @classmethod
+    def from_frame(cls, timeline_df):
+        """Build from a frame with the TIMELINE_COLUMNS; blank rows (as left by an editor) are skipped."""
+        missing = [col for col in TIMELINE_COLUMNS if col not in timeline_df.columns]
+        if missing:
+            raise ValueError(f"Timeline is missing columns: {', '.join(missing)}")
+        rows = timeline_df[TIMELINE_COLUMNS].dropna(how="all")
+        return cls(rows["Effective From"],
+                   pd.to_numeric(rows["Rate Peak"], errors="coerce"),
+                   pd.to_numeric(rows["Rate Low"], errors="coerce"))
+
+    def frame(self):
+        return pd.DataFrame({"Effective From": self.starts, "Rate Peak": self.peak, "Rate Low": self.low})
+
+    def period_index(self, dates):
+        """Row of the timeline in force on each date; dates before the first row are an error."""
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        index = np.searchsorted(self.starts, dates, side="right") - 1
+        if (index < 0).any():
+            raise ValueError(f"The timeline starts on {self.starts[0]}; no rates are known before then.")
+        return index
+
+    def rates_on(self, dates):
+        """(peak, low) rates in force on each date."""
+        index = self.period_index(dates)
+        return self.peak[index], self.low[index]
+
+    def _rate_days_to(self, dates):
+        # Rate-days from the first effective-from date up to the start of each date
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        index = self.period_index(dates)
+        since = (dates - self.starts[index]).astype(np.float64)
+        return self._peak_to[index] + self.peak[index] * since, self._low_to[index] + self.low[index] * since
+
+    def rate_days(self, edges):
+        """Summed daily peak and off-peak rates over each interval [edges[i], edges[i + 1])."""
+        peak_to, low_to = self._rate_days_to(edges)
+        return np.diff(peak_to), np.diff(low_to)
+
+
+def read_timeline(source):
+    """Read a timeline CSV with Effective From, Rate Peak and Rate Low columns."""
+    return TariffTimeline.from_frame(pd.read_csv(source))
+
+
+def month_edges(start, months=12):
+    """The months+1 boundaries of the months following start (a date or anything pandas parses)."""
+    first = np.datetime64(pd.Timestamp(start).date(), "D")
+    months_from = first.astype("datetime64[M]") + np.arange(months + 1)
+    # Whole-month steps from start's day of the month, clipped to the month's length
+    day = (first - first.astype("datetime64[M]")).astype(np.int64)
+    lengths = ((months_from + 1).astype("datetime64[D]") - months_from.astype("datetime64[D]")).astype(np.int64)
+    return months_from.astype("datetime64[D]") + np.minimum(day, lengths - 1)
+
+
+def interval_costs(peak_kwh, low_kwh, timeline, edges):
+    """Cost of daily peak/off-peak kWh over each interval between edges.
+
+    peak_kwh and low_kwh are daily figures, scalars for one household or arrays
+    for many; the result has shape peak_kwh.shape + (len(edges) - 1,). The
+    timeline is only looked up once, for the edges.
+    """
+    peak_days, low_days = timeline.rate_days(edges)
+    peak_kwh = np.asarray(peak_kwh, dtype=np.float64)[..., None]
+    low_kwh = np.asarray(low_kwh, dtype=np.float64)[..., None]
+    return peak_kwh * peak_days + low_kwh * low_days
+
+
+def monthly_costs(peak_kwh, low_kwh, timeline, start, months=12):
+    """One household's cost and kWh per month from start, with the average rates each month saw."""
+    edges = month_edges(start, months)
+    peak_days, low_days = timeline.rate_days(edges)
+    days = np.diff(edges).astype(np.float64)
+    return pd.DataFrame({
+        "Month": pd.to_datetime(edges[:-1]).strftime("%b %Y"),
+        "Days": days.astype(np.int64),
+        "Avg Rate Peak": peak_days / days,
+        "Avg Rate Low": low_days / days,
+        "kWh": (peak_kwh + low_kwh) * days,
+        "Cost": peak_kwh * peak_days + low_kwh * low_days,
+    })
+
+
+def _household_kwh(path):
+    # Runs in a worker process; the file's own rates are not used. Rows that fail validation are left out.
+    try:
+        devices_df, _, _ = read_device_list(path)
+        devices_df, invalid = valid_devices(devices_df)
+        return path, household_band_kwh(devices_df), invalid, None
+    except Exception as e:
+        return path, None, 0, f"{type(e).__name__}: {e}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Price saved device lists month by month against a tariff timeline.")
+    parser.add_argument("timeline", help="CSV with Effective From, Rate Peak and Rate Low columns")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of saved device lists")
+    parser.add_argument("-o", "--output", required=True, help="CSV to write, one row per household")
+    parser.add_argument("--start", required=True, help="First day of the priced period (YYYY-MM-DD)")
+    parser.add_argument("--months", type=int, default=12, help="Months to price (default: 12)")
+    parser.add_argument("--recursive", action="store_true", help="Search directories and ** globs recursively")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Files handed to a worker at a time")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    edges = month_edges(args.start, args.months)
+    try:
+        timeline = read_timeline(args.timeline)
+        # Checked before any file is read, so a timeline that starts too late fails fast
+        timeline.period_index(edges[:1])
+    except ValueError as e:
+        print(f"Bad timeline {args.timeline}: {e}", file=sys.stderr)
+        return 1
+    paths = expand_inputs(args.inputs, recursive=args.recursive)
+    if not paths:
+        print("No saved device lists matched the inputs.", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    households, kwh = [], []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for path, band, invalid, error in pool.map(_household_kwh, paths, chunksize=args.chunksize):
+            if error is not None:
+                print(f"Skipped {path}: {error}", file=sys.stderr)
+                continue
+            if invalid:
+                print(f"{path}: {invalid} device(s) with invalid values left out", file=sys.stderr)
+            households.append(path)
+            kwh.append(band)
+    read_elapsed = time.perf_counter() - start
+
+    # Every household against the same month rate-days in one broadcast
+    priced_at = time.perf_counter()
+    band = np.asarray(kwh, dtype=np.float64).reshape(-1, 2)
+    costs = interval_costs(band[:, 0], band[:, 1], timeline, edges)
+    price_elapsed = time.perf_counter() - priced_at
+
+    month_names = list(pd.to_datetime(edges[:-1]).strftime("%Y-%m"))
+    result = pd.DataFrame(round_half_even(costs), columns=month_names)
+    result.insert(0, "File", households)
+    result["Total Cost"] = round_half_even(costs.sum(axis=1))
+    result["Total kWh"] = round_half_even(band.sum(axis=1) * float((edges[-1] - edges[0]).astype(np.int64)))
+    result.to_csv(args.output, index=False)
+
+    print(
+        f"Read {len(households)} households in {read_elapsed:.2f}s; priced {args.months} months against "
+        f"{len(timeline.starts)} rate periods in {price_elapsed * 1000:.1f} ms.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The app's modules sit at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def random_devices(n, seed=0):
+    """A device list with the inputs the app produces: whole minutes, two-decimal watts, whole days and weeks."""
+    rng = np.random.default_rng(seed)
+    alloc_heavy = rng.integers(0, 101, n).astype(float)
+    minutes_peak = rng.integers(0, 24 * 60, n)
+    minutes_low = rng.integers(0, 24 * 60, n) % (24 * 60 - minutes_peak + 1)
+    return pd.DataFrame({
+        "Name": [f"Device {i}" for i in range(n)],
+        "Count": rng.integers(1, 10, n),
+        "Power Heavy": np.round(rng.uniform(0, 3000, n), 2),
+        "Power Light": np.round(rng.uniform(0, 300, n), 2),
+        "Alloc Heavy": alloc_heavy,
+        "Alloc Light": 100 - alloc_heavy,
+        "Hours Peak": minutes_peak / 60.0,
+        "Hours Low": minutes_low / 60.0,
+        "Days": rng.integers(0, 8, n).astype(float),
+        "Weeks": rng.integers(0, 53, n).astype(float),
+        "Include": True,
+    })
+
+
+@pytest.fixture
+def devices():
+    return random_devices(500)
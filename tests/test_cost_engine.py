@@ -0,0 +1,143 @@
+import threading
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import random_devices
+from cost_engine import COST_COLUMNS, compute_costs, compute_costs_exact, exact_totals, included_mask, round_half_even
+
+RATE_PEAK, RATE_LOW = 0.2361, 0.07
+
+# Display precision of each cost column
+PLACES = {"Daily Cost": "0.01", "Monthly Cost": "0.01", "Annual Cost": "0.01", "Daily kWh": "0.001"}
+
+
+def decimal_costs(devices_df, rate_peak, rate_low):
+    # The original per-row Decimal calculation the engines must agree with
+    rows = []
+    for row in devices_df.to_dict("records"):
+        d = {col: Decimal(str(row[col])) for col in (
+            "Power Heavy", "Power Light", "Alloc Heavy", "Alloc Light", "Hours Peak", "Hours Low",
+            "Days", "Weeks", "Count")}
+        avg_kw = (d["Power Heavy"] * d["Alloc Heavy"] / 100 + d["Power Light"] * d["Alloc Light"] / 100) / 1000
+        scaling = (d["Days"] / Decimal("7.0")) * (d["Weeks"] / Decimal("52.0"))
+        h_peak, h_low = d["Hours Peak"] * scaling, d["Hours Low"] * scaling
+        daily_cost = (h_peak * avg_kw * Decimal(str(rate_peak)) + h_low * avg_kw * Decimal(str(rate_low))) * d["Count"]
+        daily_kwh = (h_peak * avg_kw + h_low * avg_kw) * d["Count"]
+        rows.append({"Daily Cost": daily_cost, "Monthly Cost": daily_cost * Decimal("30.4167"),
+                     "Annual Cost": daily_cost * 365, "Daily kWh": daily_kwh})
+    return pd.DataFrame(rows, index=devices_df.index)
+
+
+def rounded(values, places):
+    return np.array([float(v.quantize(Decimal(places), ROUND_HALF_EVEN)) for v in values])
+
+
+def finishes(fn, seconds=10):
+    # Runs fn on a thread and says whether it returned in time, so a hang fails the test instead of the run
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (fn(), done.set()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    return done.is_set()
+
+
+def test_float_engine_matches_decimal_to_display_precision(devices):
+    expected = decimal_costs(devices, RATE_PEAK, RATE_LOW)
+    costs = compute_costs(devices, RATE_PEAK, RATE_LOW)
+    for col, places in PLACES.items():
+        decimals = len(places) - 2
+        np.testing.assert_array_equal(round_half_even(costs[col], decimals), rounded(expected[col], places))
+
+
+def test_exact_engine_matches_decimal_exactly(devices):
+    expected = decimal_costs(devices, RATE_PEAK, RATE_LOW)
+    costs = compute_costs_exact(devices, RATE_PEAK, RATE_LOW)
+    assert list(costs.columns) == COST_COLUMNS
+    for col, places in PLACES.items():
+        np.testing.assert_array_equal(costs[col].to_numpy(), rounded(expected[col], places))
+
+
+def test_exact_totals_round_the_exact_sum_once():
+    devices = random_devices(2000, seed=1)
+    devices.loc[::7, "Include"] = False
+    expected = decimal_costs(devices[devices["Include"]], RATE_PEAK, RATE_LOW)
+    totals = exact_totals(devices, RATE_PEAK, RATE_LOW)
+    assert totals["Daily Cost"] == rounded([expected["Daily Cost"].sum()], "0.01")[0]
+    assert totals["Annual Cost"] == rounded([expected["Annual Cost"].sum()], "0.01")[0]
+    assert totals["Daily kWh"] == rounded([expected["Daily kWh"].sum()], "0.01")[0]
+
+
+@pytest.mark.parametrize("column, value", [
+    ("Count", 1e19),
+    ("Count", -1e19),
+    ("Count", 2.0**62),
+    ("Hours Peak", 1e17),
+    ("Days", 1e19),
+    ("Weeks", 9.3e18),
+    ("Alloc Heavy", 1e18),
+    ("Power Heavy", 1e10),
+])
+def test_exact_engine_prices_overflowing_rows_as_bad(column, value):
+    devices = random_devices(3, seed=2)
+    devices[column] = devices[column].astype(float)
+    devices.loc[1, column] = value
+    result = {}
+    assert finishes(lambda: result.update(costs=compute_costs_exact(devices, RATE_PEAK, RATE_LOW),
+                                          totals=exact_totals(devices, RATE_PEAK, RATE_LOW)))
+    costs = result["costs"]
+    assert (costs.loc[1] == 0.0).all()
+    # The other rows are unaffected, and the totals are theirs
+    expected = compute_costs_exact(devices.drop(index=1), RATE_PEAK, RATE_LOW)
+    pd.testing.assert_frame_equal(costs.drop(index=1), expected)
+    assert result["totals"] == exact_totals(devices.drop(index=1), RATE_PEAK, RATE_LOW)
+
+
+@pytest.mark.parametrize("rate", [1e30, float("inf"), float("nan")])
+def test_exact_engine_with_unusable_rate_prices_nothing(rate):
+    costs = compute_costs_exact(random_devices(5), rate, RATE_LOW)
+    assert (costs.to_numpy() == 0.0).all()
+
+
+def test_float_engine_zeroes_rows_it_cannot_price():
+    devices = random_devices(3)
+    devices["Count"] = devices["Count"].astype(float)
+    devices.loc[1, "Count"] = np.nan
+    devices.loc[2, "Hours Peak"] = np.inf
+    costs = compute_costs(devices, RATE_PEAK, RATE_LOW)
+    assert (costs.loc[[1, 2]] == 0.0).all().all()
+
+
+@pytest.mark.parametrize("flags, expected", [
+    (["False", "no", "0", " NO ", "True", "yes", "1", None], [False, False, False, False, True, True, True, True]),
+    ([True, False, None], [True, False, True]),
+    ([1, 0, np.nan], [True, False, True]),
+])
+def test_included_mask_reads_include_text(flags, expected):
+    devices = pd.DataFrame({"Include": pd.Series(flags, dtype=object)})
+    np.testing.assert_array_equal(included_mask(devices), expected)
+
+
+def test_included_mask_reads_string_dtype():
+    devices = pd.DataFrame({"Include": pd.Series(["False", "no", "yes", None], dtype="string")})
+    np.testing.assert_array_equal(included_mask(devices), [False, False, True, True])
+
+
+def test_included_mask_rejects_other_text():
+    with pytest.raises(ValueError, match="Include must be true or false"):
+        included_mask(pd.DataFrame({"Include": ["maybe"]}))
+
+
+def test_excluded_text_rows_are_left_out_of_every_total():
+    from batch_price import household_summary
+
+    devices = random_devices(6)
+    text = devices.astype({"Include": object})
+    text["Include"] = ["True", "False", "no", "0", "yes", "1"]
+    kept = devices.iloc[[0, 4, 5]]
+    for exact in (False, True):
+        summary = household_summary(text, RATE_PEAK, RATE_LOW, exact=exact)
+        assert summary["Annual Cost"] == household_summary(kept, RATE_PEAK, RATE_LOW, exact=exact)["Annual Cost"]
+    assert exact_totals(text, RATE_PEAK, RATE_LOW) == exact_totals(kept, RATE_PEAK, RATE_LOW)
@@ -0,0 +1,77 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import pricing_api
+from conftest import random_devices
+from pricing_api import PricingServer, parse_price_request
+
+
+def request_body(devices, **options):
+    return json.dumps({"devices": json.loads(devices.to_json(orient="records")), **options}).encode("utf-8")
+
+
+def post(server, body):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=30)
+    conn.request("POST", "/price", body, {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    document = json.loads(response.read())
+    conn.close()
+    return response.status, document
+
+
+@pytest.fixture
+def server(request):
+    server = PricingServer(("127.0.0.1", 0), **getattr(request, "param", {}))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("column, value", [("Count", 1e19), ("Count", 0), ("Hours Peak", 1e17), ("Days", -1)])
+def test_out_of_range_values_are_rejected_before_pricing(column, value):
+    devices = random_devices(3).astype({column: float})
+    devices.loc[1, column] = value
+    with pytest.raises(ValueError, match=f"Row 2: {column}"):
+        parse_price_request(request_body(devices, exact=True), "application/json")
+
+
+def test_infinite_values_are_rejected():
+    # JSON has no infinity, so it comes in through a CSV body
+    devices = random_devices(2).astype({"Power Heavy": float})
+    devices.loc[0, "Power Heavy"] = float("inf")
+    with pytest.raises(ValueError, match="Row 1: Power Heavy"):
+        parse_price_request(devices.to_csv(index=False).encode("utf-8"), "text/csv")
+
+
+def test_rate_outside_the_exact_range_is_rejected():
+    with pytest.raises(ValueError, match="rate_peak is out of range"):
+        parse_price_request(request_body(random_devices(2), rate_peak=1e30), "application/json")
+
+
+def test_exact_request_is_priced(server):
+    status, document = post(server, request_body(random_devices(20), exact=True))
+    assert status == 200
+    assert document["exact"] is True
+    assert document["invalid_devices"] == 0
+
+
+@pytest.mark.parametrize("server", [{"price_timeout": 0.2}], indirect=True)
+def test_stuck_batch_returns_503(server, monkeypatch):
+    release = threading.Event()
+    price_group = pricing_api._price_group
+
+    def stuck(jobs, rates, exact):
+        release.wait(10)
+        price_group(jobs, rates, exact)
+
+    monkeypatch.setattr(pricing_api, "_price_group", stuck)
+    start = time.perf_counter()
+    status, document = post(server, request_body(random_devices(5)))
+    release.set()
+    assert status == 503
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+
+from seasonal_calendar import DAYS_PER_CALENDAR_YEAR, MONTH_STARTS, calendar_dates
+
+
+@pytest.mark.parametrize("year", [2027, 2028])
+def test_calendar_dates_line_up_with_the_months(year):
+    dates = calendar_dates(year)
+    assert len(dates) == DAYS_PER_CALENDAR_YEAR
+    assert (dates.year == year).all()
+    # Each month starts on its first day, in a leap year too
+    np.testing.assert_array_equal(dates[MONTH_STARTS].day, 1)
+    np.testing.assert_array_equal(dates[MONTH_STARTS].month, np.arange(1, 13))
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from conftest import random_devices
+from cost_engine import compute_costs_exact
+from device_store import MAX_COUNT
+from validation import check_rows, price_valid, validate_devices
+
+
+@pytest.mark.parametrize("count, rule", [
+    (0, "too_small"),
+    (-1, "negative"),
+    (1.5, "not_whole"),
+    (MAX_COUNT + 1, "too_large"),
+    (1e19, "too_large"),
+    (np.nan, "missing"),
+])
+def test_count_outside_the_editor_limits_is_invalid(count, rule):
+    devices = random_devices(3).astype({"Count": float})
+    devices.loc[1, "Count"] = count
+    errors = validate_devices(devices)
+    assert errors[["Row", "Column", "Rule"]].values.tolist() == [[2, "Count", rule]]
+
+
+def test_editor_limits_are_valid():
+    devices = random_devices(2)
+    devices["Count"] = [1, MAX_COUNT]
+    assert validate_devices(devices).empty
+
+
+def test_price_valid_leaves_invalid_rows_out_of_the_engine():
+    devices = random_devices(4).astype({"Count": float})
+    devices.loc[2, "Count"] = 1e19
+    valid, _ = check_rows(devices)
+    seen = []
+
+    def price(rows, rate_peak, rate_low):
+        seen.append(len(rows))
+        return compute_costs_exact(rows, rate_peak, rate_low)
+
+    costs = price_valid(price, devices, valid, 0.25, 0.07)
+    assert seen == [3]
+    assert (costs.loc[2] == 0.0).all()
+    np.testing.assert_array_equal(costs.drop(index=2).to_numpy(),
+                                  compute_costs_exact(devices.drop(index=2), 0.25, 0.07).to_numpy())
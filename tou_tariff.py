@@ -0,0 +1,124 @@
+"""Time-of-use pricing with a price for every slot of the day.
+
+A tariff is a vector of prices (£/kWh), one per slot: 48 half-hours for
+Agile-style tariffs or 1440 minutes for finer schedules. Each device's usage is
+a row of the usage matrix holding the kWh it draws in each slot, so pricing a
+whole device list is a single matrix-vector product.
+
+Devices still describe their day as "Hours Peak" and "Hours Low". The
+off-peak window says which slots the off-peak hours fall in; each device's
+hours are spread evenly over the slots of its band. With a two-band price
+vector (one price inside the window, another outside) this reproduces the
+peak/off-peak calculation exactly.
+"""
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import COST_COLUMNS, DAYS_PER_MONTH, DAYS_PER_YEAR, band_kwh
+
+SLOTS_PER_DAY = 48
+MINUTES_PER_DAY = 1440
+
+# Economy 7 style window used when none is given
+DEFAULT_OFF_PEAK_START = time(0, 0)
+DEFAULT_OFF_PEAK_END = time(7, 0)
+
+
+def window_mask(start, end, slots=SLOTS_PER_DAY):
+    """Boolean mask of the slots whose start falls in [start, end), wrapping past midnight."""
+    slot_minutes = MINUTES_PER_DAY // slots
+    starts = np.arange(slots) * slot_minutes
+    lo = start.hour * 60 + start.minute
+    hi = end.hour * 60 + end.minute
+    if lo <= hi:
+        return (starts >= lo) & (starts < hi)
+    return (starts >= lo) | (starts < hi)
+
+
+def two_band_prices(rate_peak, rate_low, off_peak_mask):
+    # The peak/off-peak tariff as a slot price vector
+    return np.where(off_peak_mask, float(rate_low), float(rate_peak))
+
+
+def read_slot_prices(source):
+    """Read slot prices (£/kWh) from a CSV with one price per row.
+
+    Uses a "Price" column if present, otherwise the last numeric column. The
+    file must have 48 (half-hourly) or 1440 (per-minute) rows.
+    """
+    prices_df = pd.read_csv(source)
+    if "Price" in prices_df.columns:
+        column = prices_df["Price"]
+    else:
+        numeric = prices_df.select_dtypes("number")
+        if numeric.empty:
+            raise ValueError("No numeric price column found.")
+        column = numeric.iloc[:, -1]
+    prices = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64)
+    if len(prices) not in (SLOTS_PER_DAY, MINUTES_PER_DAY):
+        raise ValueError(f"Expected {SLOTS_PER_DAY} or {MINUTES_PER_DAY} prices, got {len(prices)}.")
+    if not np.isfinite(prices).all():
+        raise ValueError("Every slot needs a numeric price.")
+    return prices
+
+
+def band_slot_shares(off_peak_mask):
+    """Share of a day's peak and off-peak kWh in each slot, spread evenly over each band's slots.
+
+    A band with no slots (an off-peak window of zero length, or one covering
+    the whole day) is spread over the other band's slots, so no energy is lost.
+    """
+    off_peak_mask = np.asarray(off_peak_mask, dtype=bool)
+    n_low = off_peak_mask.sum()
+    n_peak = len(off_peak_mask) - n_low
+    peak_share = np.where(off_peak_mask, 0.0, 1.0 / n_peak if n_peak else 0.0)
+    low_share = np.where(off_peak_mask, 1.0 / n_low if n_low else 0.0, 0.0)
+    if not n_low:
+        low_share = peak_share
+    if not n_peak:
+        peak_share = low_share
+    return peak_share, low_share
+
+
+def empty_band(off_peak_mask):
+    # Name of the band that has no slots under this window, or None
+    off_peak_mask = np.asarray(off_peak_mask, dtype=bool)
+    if not off_peak_mask.any():
+        return "off-peak"
+    if off_peak_mask.all():
+        return "peak"
+    return None
+
+
+def usage_matrix(devices_df, off_peak_mask, dtype=np.float64):
+    """Daily kWh per device (rows) per slot (columns).
+
+    Peak hours are spread evenly over the slots outside the off-peak window and
+    off-peak hours over the slots inside it (see band_slot_shares for a window
+    that leaves a band without slots).
+    """
+    peak_kwh, low_kwh = band_kwh(devices_df)
+    peak_share, low_share = band_slot_shares(off_peak_mask)
+    usage = np.outer(peak_kwh, peak_share).astype(dtype, copy=False)
+    usage += np.outer(low_kwh, low_share).astype(dtype, copy=False)
+    return usage
+
+
+def compute_costs_tou(devices_df, prices, off_peak_mask=None):
+    """Price every device row against a slot price vector.
+
+    Returns the same columns and index as cost_engine.compute_costs.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if off_peak_mask is None:
+        off_peak_mask = window_mask(DEFAULT_OFF_PEAK_START, DEFAULT_OFF_PEAK_END, len(prices))
+    usage = usage_matrix(devices_df, off_peak_mask)
+    daily_cost = usage @ prices
+    daily_kwh = usage.sum(axis=1)
+    return pd.DataFrame(
+        np.column_stack([daily_cost, daily_cost * DAYS_PER_MONTH, daily_cost * DAYS_PER_YEAR, daily_kwh]),
+        index=devices_df.index,
+        columns=COST_COLUMNS,
+    )
@@ -0,0 +1,187 @@
+"""Checks a device list against every input rule in one vectorized pass.
+
+validate_devices returns one row per problem found (Row, Column, Rule,
+Value), with Row the 1-based position used by the Cost Breakdown table. Rows
+with any problem can then be left out of pricing while the rest are priced
+as usual, instead of a bad cell silently pricing its row at zero.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from cost_engine import COLUMN_DEFAULTS, COST_COLUMNS, INPUT_COLUMNS
+from device_store import MAX_COUNT
+
+ERROR_COLUMNS = ["Row", "Column", "Rule", "Value"]
+
+# Allowed range of each numeric input, inclusive
+LIMITS = {
+    "Power Heavy": (0.0, math.inf),
+    "Power Light": (0.0, math.inf),
+    "Alloc Heavy": (0.0, 100.0),
+    "Alloc Light": (0.0, 100.0),
+    "Hours Peak": (0.0, 24.0),
+    "Hours Low": (0.0, 24.0),
+    "Days": (0.0, 7.0),
+    "Weeks": (0.0, 52.0),
+    # As the editor allows; larger counts do not fit the list's integer column
+    "Count": (1.0, float(MAX_COUNT)),
+}
+
+ALLOC_TOLERANCE = 0.1
+MAX_DAILY_HOURS = 24.0
+
+# What each rule means, for messages shown next to the error table
+RULE_MESSAGES = {
+    "missing_name": "Device name is empty",
+    "missing": "Value is missing",
+    "not_a_number": "Value is not a number",
+    "negative": "Value cannot be negative",
+    "too_small": "Value is below the allowed minimum",
+    "too_large": "Value is above the allowed maximum",
+    "not_whole": "Count must be a whole number",
+    "alloc_sum": "High and low power allocations must sum to 100%",
+    "hours_cap": "Peak and off-peak hours cannot exceed 24 a day",
+}
+
+ALLOC_SUM_COLUMN = "Alloc Heavy + Alloc Light"
+HOURS_SUM_COLUMN = "Hours Peak + Hours Low"
+
+
+def _numeric(devices_df, column):
+    # (values as float64, cell is empty, raw cells) for one input column
+    n = len(devices_df)
+    if column not in devices_df.columns:
+        default = COLUMN_DEFAULTS.get(column, np.nan)
+        return np.full(n, default, dtype=np.float64), np.full(n, column not in COLUMN_DEFAULTS), None
+    raw = devices_df[column].to_numpy()
+    if raw.dtype.kind in "iub":
+        return raw.astype(np.float64), np.zeros(n, dtype=bool), raw
+    if raw.dtype.kind == "f":
+        return raw.astype(np.float64, copy=False), np.isnan(raw), raw
+    empty = pd.isna(raw) | (pd.Series(raw, dtype=object).astype(str).str.strip() == "").to_numpy()
+    return pd.to_numeric(pd.Series(raw, dtype=object), errors="coerce").to_numpy(dtype=np.float64), empty, raw
+
+
+def validate_devices(devices_df, alloc_tolerance=ALLOC_TOLERANCE):
+    """Every rule broken by every row, as a DataFrame with ERROR_COLUMNS.
+
+    Errors are ordered by row, then in the order the rules are checked. An
+    empty frame means the list is valid.
+    """
+    n = len(devices_df)
+    found = []
+
+    def report(mask, column, rule, values):
+        rows = np.flatnonzero(mask)
+        if len(rows):
+            # Only the offending cells are taken out of a Series
+            picked = values.iloc[rows].to_numpy() if isinstance(values, pd.Series) else np.asarray(values)[rows]
+            found.append((rows, column, rule, np.asarray(picked, dtype=object)))
+
+    if "Name" in devices_df.columns:
+        names = devices_df["Name"]
+        report((names.isna() | (names.astype(str).str.strip() == "")).to_numpy(), "Name", "missing_name", names)
+    else:
+        report(np.ones(n, dtype=bool), "Name", "missing_name", np.full(n, None))
+
+    values = {}
+    for column in INPUT_COLUMNS:
+        numbers, empty, raw = _numeric(devices_df, column)
+        cells = raw if raw is not None else np.full(n, None)
+        report(empty, column, "missing", cells)
+        report(~empty & ~np.isfinite(numbers), column, "not_a_number", cells)
+        low, high = LIMITS[column]
+        with np.errstate(invalid="ignore"):
+            report(numbers < 0.0, column, "negative", cells)
+            report((numbers >= 0.0) & (numbers < low), column, "too_small", cells)
+            report(numbers > high, column, "too_large", cells)
+            if column == "Count":
+                report(np.isfinite(numbers) & (numbers % 1 != 0), column, "not_whole", cells)
+        values[column] = numbers
+
+    with np.errstate(invalid="ignore"):
+        alloc_sum = values["Alloc Heavy"] + values["Alloc Light"]
+        report(np.abs(alloc_sum - 100.0) > alloc_tolerance, ALLOC_SUM_COLUMN, "alloc_sum", alloc_sum)
+        hours_sum = values["Hours Peak"] + values["Hours Low"]
+        report(hours_sum > MAX_DAILY_HOURS, HOURS_SUM_COLUMN, "hours_cap", hours_sum)
+
+    if not found:
+        return pd.DataFrame({col: pd.Series(dtype=np.int64 if col == "Row" else object) for col in ERROR_COLUMNS})
+    rows = np.concatenate([rows for rows, _, _, _ in found])
+    order = np.argsort(rows, kind="stable")
+    return pd.DataFrame({
+        "Row": rows[order] + 1,
+        "Column": np.repeat([column for _, column, _, _ in found], [len(r) for r, _, _, _ in found])[order],
+        "Rule": np.repeat([rule for _, _, rule, _ in found], [len(r) for r, _, _, _ in found])[order],
+        "Value": np.concatenate([cells for _, _, _, cells in found])[order],
+    })
+
+
+def invalid_rows(errors, n_rows):
+    """Boolean mask over the n_rows of the validated list, True where a row has any error."""
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[errors["Row"].to_numpy(dtype=np.int64) - 1] = True
+    return mask
+
+
+def check_rows(devices_df):
+    """(valid, errors): a mask of the rows that pass every rule, and the errors of the others.
+
+    Every pricing path leaves the rows that fail out, as the app does, so a
+    list costs the same wherever it is priced.
+    """
+    errors = validate_devices(devices_df)
+    return ~invalid_rows(errors, len(devices_df)), errors
+
+
+def valid_devices(devices_df):
+    """(the rows of devices_df that pass every rule, how many rows were left out)."""
+    valid, _ = check_rows(devices_df)
+    return (devices_df if valid.all() else devices_df[valid]), int((~valid).sum())
+
+
+def zero_invalid(cost_df, valid):
+    """cost_df with the rows that failed validation costing nothing (a new frame; cost_df is not changed)."""
+    if valid.all():
+        return cost_df
+    return pd.DataFrame(np.where(valid[:, None], cost_df.to_numpy(), 0.0), index=cost_df.index, columns=cost_df.columns)
+
+
+def price_valid(price, devices_df, valid, *args):
+    """price(rows, *args) for the rows that pass validation only, on devices_df's index.
+
+    The other rows cost nothing and never reach the pricing function, so an
+    input far out of range cannot slow or break it.
+    """
+    if valid.all():
+        return price(devices_df, *args)
+    costs = np.zeros((len(devices_df), len(COST_COLUMNS)))
+    costs[valid] = price(devices_df[valid], *args)[COST_COLUMNS].to_numpy()
+    return pd.DataFrame(costs, index=devices_df.index, columns=COST_COLUMNS)
+
+
+def error_records(errors):
+    """Errors as JSON-ready records, with non-finite values as None."""
+    records = []
+    for row, column, rule, value in errors[ERROR_COLUMNS].itertuples(index=False):
+        if isinstance(value, (float, np.floating)):
+            value = float(value) if math.isfinite(value) else None
+        elif isinstance(value, (np.integer, np.bool_)):
+            value = value.item()
+        elif value is not None and not isinstance(value, (str, int, bool)):
+            value = None if pd.isna(value) else str(value)
+        records.append({"Row": int(row), "Column": column, "Rule": rule, "Value": value})
+    return records
+
+
+def describe(errors):
+    """One line per error, for short lists such as a single added device."""
+    lines = []
+    for column, rule, value in zip(errors["Column"], errors["Rule"], errors["Value"]):
+        line = f"{column}: {RULE_MESSAGES[rule]}"
+        if rule not in ("missing", "missing_name"):
+            line += f" (got {value:g})" if isinstance(value, float) else f" (got {value})"
+        lines.append(line)
+    return lines